@@ -17,6 +17,15 @@ import markdown
 import os
 import math
 import glob
+import threading
+import hashlib
+import json
+import struct
+import heapq
+import bisect
+import multiprocessing
+from collections import OrderedDict, Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pypinyin import lazy_pinyin
 # 布局类
 from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QGridLayout, QFormLayout
@@ -28,14 +37,1546 @@ from PyQt5.QtWidgets import (
     QInputDialog, QAction, QMenu, QScrollArea, QShortcut, QDialog,
     QDialogButtonBox, QCheckBox, QSpinBox, QDateEdit, QGroupBox,
     QListWidgetItem, QToolBar, QFontComboBox, QToolButton, QButtonGroup,
-    QTableWidget, QTableWidgetItem, QHeaderView, QProgressBar
+    QTableWidget, QTableWidgetItem, QHeaderView, QProgressBar,
+    QListView, QStyledItemDelegate, QAbstractItemView, QProgressDialog
 )
-from PyQt5.QtCore import Qt, QSize, QTimer, QDate, QMimeData, QEvent
-from PyQt5.QtGui import QFont, QIcon, QTextCursor, QKeySequence, QPainter, QColor
+from PyQt5.QtCore import (
+    Qt, QSize, QTimer, QDate, QMimeData, QEvent, QAbstractListModel, QModelIndex,
+    QThread, pyqtSignal
+)
+from PyQt5.QtGui import QFont, QIcon, QTextCursor, QKeySequence, QPainter, QColor, QBrush, QPalette
 from PyQt5.QtChart import QChart, QPieSeries, QChartView
 
 
-class TextManager(QMainWindow):
+class QueryResultCache:
+    """查询结果LRU缓存
+
+    以规范化后的SQL和参数为键，每条结果记录写入时的数据库写入代数；
+    读取时代数不一致说明数据库已被修改，视为未命中。
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (写入代数, 行列表)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(sql, params):
+        return ' '.join(sql.split()), tuple(params)
+
+    def get(self, key, generation):
+        """返回缓存的结果，未命中或已过期时返回None"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != generation:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, generation, rows):
+        self._entries[key] = (generation, rows)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class MarkdownBlockRenderer:
+    """按顶层块缓存的Markdown渲染器
+
+    把文本按空行切分为顶层块（缩进的续行、连续的列表项和引用并入上一块），
+    每块单独渲染并以块内容的哈希为键缓存HTML，修改后只有变化的块需要重新渲染。
+    文本含引用式链接定义（块之间互相依赖）或原始HTML块（可跨越空行）时，
+    整篇作为一块渲染。render()可在后台线程调用。
+    """
+    LIST_ITEM_PATTERN = re.compile(r'\s{0,3}([*+-]|\d+\.)\s')
+    WHOLE_DOCUMENT_PATTERN = re.compile(r'^ {0,3}(\[[^\]]+\]:\s*\S|<[A-Za-z!/?])', re.MULTILINE)
+
+    def __init__(self, max_blocks=2000):
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def split_blocks(self, text):
+        """把Markdown文本切分为可独立渲染的顶层块"""
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        if self.WHOLE_DOCUMENT_PATTERN.search(text):
+            return [text]
+        
+        # 分隔符（连续空行）保留下来，并入上一块时原样拼回，缩进代码块内的空行数不变
+        parts = re.split(r'(\n(?:[ \t]*\n)+)', text)
+        blocks = []
+        for i in range(0, len(parts), 2):
+            chunk = parts[i]
+            if not chunk.strip():
+                continue
+            first_line = chunk.split('\n', 1)[0]
+            if blocks and self.continues_block(blocks[-1], first_line):
+                blocks[-1] += parts[i - 1] + chunk
+            else:
+                blocks.append(chunk)
+        return blocks
+
+    def continues_block(self, block, first_line):
+        """空行之后的一行是否仍属于上一块（缩进续行、列表和引用）"""
+        if first_line[:1] in (' ', '\t'):
+            return True
+        lines = block.split('\n')
+        if self.LIST_ITEM_PATTERN.match(first_line):
+            return any(self.LIST_ITEM_PATTERN.match(line) for line in lines)
+        if first_line.lstrip().startswith('>'):
+            return any(line.lstrip().startswith('>') for line in lines)
+        return False
+
+    def render(self, text, is_cancelled=None):
+        """渲染整篇文本，返回HTML；is_cancelled()为真时中途放弃并返回None"""
+        converter = markdown.Markdown()
+        parts = []
+        for block in self.split_blocks(text):
+            if is_cancelled is not None and is_cancelled():
+                return None
+            key = hashlib.sha1(block.encode('utf-8')).digest()
+            with self._lock:
+                html = self._blocks.get(key)
+                if html is not None:
+                    self._blocks.move_to_end(key)
+                    self.hits += 1
+            if html is None:
+                html = converter.reset().convert(block)
+                with self._lock:
+                    self.misses += 1
+                    self._blocks[key] = html
+                    while len(self._blocks) > self.max_blocks:
+                        self._blocks.popitem(last=False)
+            if html:
+                parts.append(html)
+        return '\n'.join(parts)
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+class LexiconMatcher:
+    """多词典Aho-Corasick匹配器
+
+    把多个词典（情感词、程度副词、否定词等）的全部词条编译进同一个自动机，
+    一次扫描文本即可找出所有词条的出现位置，耗时只与文本长度和命中数有关，
+    与词典大小无关。扫描时统一转为小写；区分大小写的词条命中后再核对原文，
+    boundary为True的词条要求前后不是单词字符（同正则的\\b）。
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self.entry_count = 0
+
+    def add(self, word, category, weight=1.0, order=0, boundary=False, ignore_case=False):
+        """添加词条；order用于同类词条的先后顺序（如按词典顺序取第一个程度副词）"""
+        key = self.lower_text(word)
+        if not key:
+            return
+        node = 0
+        for ch in key:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((word, category, weight, order, boundary, ignore_case))
+        self.entry_count += 1
+
+    def build(self):
+        """按广度优先计算失配指针，并把后缀节点的输出并入当前节点"""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[child] = fail
+                if self._output[fail]:
+                    self._output[child] = self._output[child] + self._output[fail]
+                queue.append(child)
+        return self
+
+    @staticmethod
+    def lower_text(text):
+        """转为小写并保持长度不变（个别字符小写后长度改变时保留原字符）"""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return ''.join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+    def find(self, text):
+        """扫描文本，生成 (起始位置, 结束位置, 词条, 类别, 权重, 顺序)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        lowered = self.lower_text(text)
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not output[node]:
+                continue
+            end = i + 1
+            for word, category, weight, order, boundary, ignore_case in output[node]:
+                start = end - len(word)
+                if not ignore_case and text[start:end] != word:
+                    continue
+                if boundary and ((start > 0 and (text[start - 1].isalnum() or text[start - 1] == '_'))
+                                 or (end < len(text) and (text[end].isalnum() or text[end] == '_'))):
+                    continue
+                yield start, end, word, category, weight, order
+
+
+class PreviewWorker(QThread):
+    """后台Markdown预览渲染线程，结果带序号，过期的结果由界面丢弃"""
+    preview_ready = pyqtSignal(int, str)
+
+    def __init__(self, renderer, generation, text, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.generation = generation
+        self.text = text
+        self._cancelled = False
+
+    def cancel(self):
+        """取消渲染（可在其他线程调用）"""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            html = self.renderer.render(self.text, lambda: self._cancelled)
+        except Exception as e:
+            print(f"[预览] 渲染失败: {str(e)}")
+            return
+        if html is not None and not self._cancelled:
+            self.preview_ready.emit(self.generation, html)
+
+
+class TextListModel(QAbstractListModel):
+    """文本列表模型
+
+    只保存已加载的行，按(排序时间, ID)键集分页：视图滚动到末尾时
+    通过canFetchMore/fetchMore读取下一页，大量文本也能立即打开。
+    """
+    ColorRole = Qt.UserRole + 1
+    PAGE_SIZE = 200
+
+    def __init__(self, fetch_rows, parent=None):
+        super().__init__(parent)
+        self._fetch_rows = fetch_rows  # 执行查询的函数: (sql, params) -> 行列表
+        self._rows = []  # (text_id, 显示文本, 颜色ID)
+        self._sql = None
+        self._params = []
+        self._key_columns = None
+        self._row_builder = None
+        self._last_key = None
+        self._exhausted = True
+
+    def set_query(self, sql, params, key_columns, row_builder):
+        """设置查询并重新加载第一页
+
+        参数:
+            sql: 以WHERE条件结尾、不含ORDER BY的查询，最后两列必须是key_columns的值
+            params: 查询参数
+            key_columns: 分页键列名 (排序时间列, ID列)，按降序排列
+            row_builder: 把一行结果转换为 (text_id, 显示文本, 颜色ID或None)
+        """
+        self.beginResetModel()
+        self._rows = []
+        self._sql = sql
+        self._params = list(params)
+        self._key_columns = key_columns
+        self._row_builder = row_builder
+        self._last_key = None
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def reset_rows(self, row_builder):
+        """清空列表，改为接收后台搜索推送的结果（不再分页读取）"""
+        self.beginResetModel()
+        self._rows = []
+        self._sql = None
+        self._row_builder = row_builder
+        self._last_key = None
+        self._exhausted = True
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """在列表末尾追加一批查询结果"""
+        if not rows:
+            return
+        
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(self._row_builder(row) for row in rows)
+        self.endInsertRows()
+
+    def all_text_ids(self):
+        """返回当前列表对应的全部文本ID（包括尚未分页读取的行）"""
+        if self._exhausted or self._sql is None:
+            return [row[0] for row in self._rows]
+        return [row[0] for row in self._fetch_rows(self._sql, self._params)]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        
+        text_id, label, color_id = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return label
+        if role == Qt.UserRole:
+            return text_id
+        if role == self.ColorRole:
+            return color_id
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        
+        time_column, id_column = self._key_columns
+        sql = self._sql
+        params = list(self._params)
+        if self._last_key is not None:
+            sql += f' AND ({time_column}, {id_column}) < (?, ?)'
+            params.extend(self._last_key)
+        sql += f' ORDER BY {time_column} DESC, {id_column} DESC LIMIT ?'
+        params.append(self.PAGE_SIZE)
+        
+        rows = self._fetch_rows(sql, params)
+        if len(rows) < self.PAGE_SIZE:
+            self._exhausted = True
+        if not rows:
+            return
+        
+        self._last_key = tuple(rows[-1][-2:])
+        self.append_rows(rows)
+
+
+class SearchWorker(QThread):
+    """后台搜索线程
+
+    使用独立的只读连接执行查询并按批次发出结果；cancel()通过
+    sqlite3的interrupt()中断仍在执行的查询。
+    """
+    rows_ready = pyqtSignal(int, list)
+    search_finished = pyqtSignal(int, int)
+    search_failed = pyqtSignal(int, str)
+    BATCH_SIZE = 200
+
+    def __init__(self, db_path, generation, sql, params, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.generation = generation
+        self.sql = sql
+        self.params = list(params)
+        self._conn = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """取消搜索（可在其他线程调用）"""
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA query_only = ON")
+        with self._lock:
+            if self._cancelled:
+                conn.close()
+                return
+            self._conn = conn
+        
+        try:
+            cursor = conn.execute(self.sql, self.params)
+            total = 0
+            while not self._cancelled:
+                rows = cursor.fetchmany(self.BATCH_SIZE)
+                if not rows:
+                    break
+                total += len(rows)
+                self.rows_ready.emit(self.generation, rows)
+            
+            if not self._cancelled:
+                self.search_finished.emit(self.generation, total)
+        except sqlite3.Error as e:
+            # 被interrupt()中断的查询不再上报
+            if not self._cancelled:
+                self.search_failed.emit(self.generation, str(e))
+        finally:
+            with self._lock:
+                self._conn = None
+            conn.close()
+
+
+class AnalysisWorker(QThread):
+    """后台文本分析线程
+
+    使用独立的数据库连接按阶段执行分析（统计、关键词、相似文本、可读性、
+    情感、特征），每完成一个阶段就通过信号发出结果，由界面线程更新对应
+    选项卡。计算复用TextManager中不访问界面的方法；cancel()在阶段之间
+    生效，并通过sqlite3的interrupt()中断仍在执行的查询。
+    """
+    stage_ready = pyqtSignal(int, str, object)
+    progress_changed = pyqtSignal(int, int)
+    analysis_finished = pyqtSignal(int)
+    analysis_failed = pyqtSignal(int, str)
+    STAGES = (
+        ('stats', 20),
+        ('keywords', 35),
+        ('similar', 60),
+        ('readability', 70),
+        ('sentiment', 85),
+        ('features', 100),
+    )
+
+    def __init__(self, manager, generation, content, exclude_id, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.db_path = manager.db_path
+        self.generation = generation
+        self.content = content
+        self.exclude_id = exclude_id
+        self._conn = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """取消分析（可在其他线程调用）"""
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def compute_stage(self, stage, cursor):
+        """计算一个分析阶段的结果"""
+        manager = self.manager
+        content = self.content
+        if stage == 'stats':
+            return manager.compute_basic_stats(content)
+        if stage == 'keywords':
+            return manager.extract_keywords(content, cursor=cursor)
+        if stage == 'similar':
+            return manager.collect_similar_texts(content, self.exclude_id, cursor=cursor)
+        if stage == 'readability':
+            return manager.compute_readability(content)
+        if stage == 'sentiment':
+            return manager.compute_sentiment(content, cursor=cursor)
+        if stage == 'features':
+            return manager.extract_text_features(content, cursor=cursor)
+        raise ValueError(f"未知的分析阶段: {stage}")
+
+    def run(self):
+        # 相似文本阶段会补写特征缓存，因此不使用只读连接
+        conn = sqlite3.connect(self.db_path)
+        with self._lock:
+            if self._cancelled:
+                conn.close()
+                return
+            self._conn = conn
+        
+        try:
+            cursor = conn.cursor()
+            for stage, progress in self.STAGES:
+                if self._cancelled:
+                    return
+                result = self.compute_stage(stage, cursor)
+                if self._cancelled:
+                    return
+                self.stage_ready.emit(self.generation, stage, result)
+                self.progress_changed.emit(self.generation, progress)
+            self.analysis_finished.emit(self.generation)
+        except Exception as e:
+            # 被interrupt()中断的查询不再上报
+            if not self._cancelled:
+                self.analysis_failed.emit(self.generation, str(e))
+        finally:
+            with self._lock:
+                self._conn = None
+            conn.close()
+
+
+class BatchAnalysisWorker(QThread):
+    """批量文本分析线程
+
+    把analysis_queue中排队的文本分批交给进程池分析（jieba分词是CPU密集型，
+    受GIL限制无法用多线程并行），每批结果与出队在同一个事务中写入
+    text_analysis和text_features。中断后已提交的批次不会丢失，队列中剩余的
+    文本下次继续分析。cancel()后不再提交新批次，正在分析的批次结果丢弃。
+    """
+    progress_changed = pyqtSignal(int, int)  # 已完成数, 总数
+    job_finished = pyqtSignal(int, float)  # 已完成数, 耗时(秒)
+    job_failed = pyqtSignal(str)
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.db_path = manager.db_path
+        self.chunk_size = manager.BATCH_ANALYSIS_CHUNK_SIZE
+        self.processes = manager.BATCH_ANALYSIS_PROCESSES or os.cpu_count() or 1
+        self._cancelled = False
+
+    def cancel(self):
+        """取消分析（可在其他线程调用）"""
+        self._cancelled = True
+
+    def load_chunk(self, cursor, text_ids):
+        """读取一批待分析的文本，返回 [(文本ID, 内容, 内容哈希, 是否HTML)]
+
+        旧版本保存的文本没有content_hash，顺便补算；已删除的文本不在结果中。
+        """
+        placeholders = ','.join('?' * len(text_ids))
+        cursor.execute(f'''
+        SELECT id, title, content, is_markdown, is_html, content_hash
+        FROM texts WHERE id IN ({placeholders})
+        ''', text_ids)
+        rows = []
+        for text_id, title, content, is_markdown, is_html, content_hash in cursor.fetchall():
+            if content_hash is None:
+                content_hash = self.manager.compute_content_hash(title, content, is_markdown, is_html)
+                cursor.execute("UPDATE texts SET content_hash = ? WHERE id = ?", (content_hash, text_id))
+            rows.append((text_id, content, content_hash, bool(is_html)))
+        return rows
+
+    def save_results(self, cursor, text_ids, results):
+        """写入一批分析结果并把这批文本出队（不提交事务）
+
+        分析期间被修改或删除的文本（内容哈希已不一致）不写入结果。
+        """
+        cursor.executemany('''
+        INSERT OR REPLACE INTO text_analysis
+            (text_id, content_hash, readability, readability_level,
+             sentiment_score, sentiment, keywords, analyzed_time)
+        SELECT ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP
+        WHERE EXISTS (SELECT 1 FROM texts WHERE id = ? AND content_hash = ?)
+        ''', [result[:7] + result[:2] for result in results])
+        cursor.executemany('''
+        INSERT OR REPLACE INTO text_features (text_id, content_hash, features)
+        SELECT ?, ?, ?
+        WHERE EXISTS (SELECT 1 FROM texts WHERE id = ? AND content_hash = ?)
+        ''', [(result[0], result[1], result[7]) + result[:2] for result in results if result[7] is not None])
+        cursor.executemany("DELETE FROM analysis_queue WHERE text_id = ?", [(text_id,) for text_id in text_ids])
+
+    def run(self):
+        start_time = time.time()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT text_id FROM analysis_queue ORDER BY text_id")
+            text_ids = [text_id for text_id, in cursor.fetchall()]
+            chunks = [text_ids[i:i + self.chunk_size] for i in range(0, len(text_ids), self.chunk_size)]
+            total = len(text_ids)
+            done = 0
+            print(f"[批量分析] 共{total}篇文本，使用{self.processes}个进程")
+
+            with create_analysis_pool(self.db_path, self.processes) as executor:
+                pending = {}
+                next_chunk = 0
+                reported = 0
+                while (pending or next_chunk < len(chunks)) and not self._cancelled:
+                    # 每个进程最多两批在途，不一次读入全部文本
+                    while next_chunk < len(chunks) and len(pending) < self.processes * 2:
+                        chunk = chunks[next_chunk]
+                        next_chunk += 1
+                        rows = self.load_chunk(cursor, chunk)
+                        if rows:
+                            pending[executor.submit(analyze_text_chunk, rows)] = chunk
+                        else:
+                            # 整批文本都已删除，直接出队
+                            self.save_results(cursor, chunk, [])
+                            conn.commit()
+                            done += len(chunk)
+
+                    # 定时返回以便及时响应取消
+                    finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        chunk = pending.pop(future)
+                        self.save_results(cursor, chunk, future.result())
+                        conn.commit()
+                        done += len(chunk)
+                    if done != reported:
+                        reported = done
+                        self.progress_changed.emit(done, total)
+
+                for future in pending:
+                    future.cancel()
+
+            if not self._cancelled:
+                self.job_finished.emit(done, time.time() - start_time)
+        except Exception as e:
+            conn.rollback()
+            if not self._cancelled:
+                self.job_failed.emit(str(e))
+        finally:
+            conn.close()
+
+
+class AutoTagWorker(QThread):
+    """批量自动打标签线程
+
+    把文本分批交给进程池提取关键词作为候选标签，全部完成后一次性发出
+    [(文本ID, [标签])]，由界面线程预览确认后再写库。cancel()后不再提交新批次。
+    """
+    progress_changed = pyqtSignal(int, int)  # 已完成数, 总数
+    tags_ready = pyqtSignal(list, float)  # [(文本ID, [标签])], 耗时(秒)
+    job_failed = pyqtSignal(str)
+
+    def __init__(self, manager, text_ids, top_n, parent=None):
+        super().__init__(parent)
+        self.db_path = manager.db_path
+        self.text_ids = list(text_ids)
+        self.top_n = top_n
+        self.chunk_size = manager.BATCH_ANALYSIS_CHUNK_SIZE
+        self.processes = manager.BATCH_ANALYSIS_PROCESSES or os.cpu_count() or 1
+        self._cancelled = False
+
+    def cancel(self):
+        """取消提取（可在其他线程调用）"""
+        self._cancelled = True
+
+    def run(self):
+        start_time = time.time()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA query_only = ON")
+        try:
+            cursor = conn.cursor()
+            chunks = [self.text_ids[i:i + self.chunk_size]
+                      for i in range(0, len(self.text_ids), self.chunk_size)]
+            total = len(self.text_ids)
+            done = 0
+            suggestions = []
+            with create_analysis_pool(self.db_path, self.processes) as executor:
+                pending = {}
+                next_chunk = 0
+                while (pending or next_chunk < len(chunks)) and not self._cancelled:
+                    while next_chunk < len(chunks) and len(pending) < self.processes * 2:
+                        chunk = chunks[next_chunk]
+                        next_chunk += 1
+                        placeholders = ','.join('?' * len(chunk))
+                        cursor.execute(
+                            f"SELECT id, content, is_html FROM texts WHERE id IN ({placeholders})", chunk)
+                        rows = cursor.fetchall()
+                        future = executor.submit(extract_chunk_tags, rows, self.top_n)
+                        pending[future] = len(chunk)
+
+                    finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        done += pending.pop(future)
+                        suggestions.extend(result for result in future.result() if result[1])
+                    if finished:
+                        self.progress_changed.emit(done, total)
+
+                for future in pending:
+                    future.cancel()
+
+            if not self._cancelled:
+                self.tags_ready.emit(suggestions, time.time() - start_time)
+        except Exception as e:
+            if not self._cancelled:
+                self.job_failed.emit(str(e))
+        finally:
+            conn.close()
+
+
+class IndexUpdateWorker(QThread):
+    """后台索引更新线程
+
+    保存文本时只把文本ID写入index_queue，由本线程使用独立连接分批计算
+    特征缓存（jieba分词和词性标注，长文本要数秒）、相似度检索使用的词项索引
+    和近似重复检测使用的MinHash签名。
+    计算在事务之外进行，每批在一个BEGIN IMMEDIATE事务中核对内容哈希后写入
+    并出队：计算期间文本又被修改或删除时放弃该篇结果，留在队列中按新内容
+    重新计算。一次更新较多文本（如升级或重建词频索引）后重新计算全部文本的
+    向量模长。cancel()在文本之间生效，队列中剩余的文本下次启动后继续更新。
+    """
+    progress_changed = pyqtSignal(int, int)  # 已完成数, 总数
+    job_failed = pyqtSignal(str)
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.db_path = manager.db_path
+        self.chunk_size = manager.INDEX_UPDATE_CHUNK_SIZE
+        self._cancelled = False
+
+    def cancel(self):
+        """取消更新（可在其他线程调用）"""
+        self._cancelled = True
+
+    def compute_index_data(self, cursor, text_id):
+        """读取并计算一篇文本的派生索引数据（不写库）
+
+        特征缓存和MinHash签名已与当前内容一致时（如重建词频索引）不再重复计算。
+        返回 (内容哈希, {数据名: 数据})，文本已删除时返回 (None, None)
+        """
+        manager = self.manager
+        content_hash, _ = manager.current_content_hash(text_id, cursor)
+        if content_hash is None:
+            return None, None
+        
+        cursor.execute('''
+        SELECT t.content, t.is_html, f.content_hash, m.content_hash
+        FROM texts t
+        LEFT JOIN text_features f ON f.text_id = t.id
+        LEFT JOIN text_minhash m ON m.text_id = t.id
+        WHERE t.id = ?
+        ''', (text_id,))
+        content, is_html, features_hash, minhash_hash = cursor.fetchone()
+        content = content or ''
+        data = {}
+        if features_hash != content_hash:
+            try:
+                data['features'] = manager.extract_text_features(content, use_corpus_idf=False, cursor=cursor)
+            except Exception as e:
+                print(f"特征提取错误: {str(e)}")
+        plain_text = manager.html_to_plain(content) if is_html else content
+        data['terms'] = manager.compute_text_terms(plain_text)
+        if minhash_hash != content_hash:
+            data['minhash'] = manager.compute_minhash(plain_text)
+        return content_hash, data
+
+    def save_index_data(self, cursor, text_id, content_hash, data):
+        """写入一篇文本的派生索引数据（不提交事务）"""
+        manager = self.manager
+        if data.get('features') is not None:
+            manager.save_text_features(text_id, content_hash, data['features'], cursor)
+        manager.apply_text_terms(text_id, data['terms'], cursor)
+        if 'minhash' in data:
+            manager.save_text_minhash(text_id, content_hash, data['minhash'], cursor)
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT text_id FROM index_queue ORDER BY text_id")
+            text_ids = [text_id for text_id, in cursor.fetchall()]
+            total = len(text_ids)
+            for start in range(0, total, self.chunk_size):
+                results = []
+                for text_id in text_ids[start:start + self.chunk_size]:
+                    if self._cancelled:
+                        return
+                    results.append((text_id,) + self.compute_index_data(cursor, text_id))
+                
+                # 计算期间文本可能已被保存或删除，写入前在写事务中重新核对
+                cursor.execute("BEGIN IMMEDIATE")
+                for text_id, content_hash, data in results:
+                    current_hash, store_hash = self.manager.current_content_hash(text_id, cursor)
+                    if current_hash != content_hash:
+                        continue
+                    if current_hash is not None:
+                        if store_hash:
+                            cursor.execute(
+                                "UPDATE texts SET content_hash = ? WHERE id = ?", (current_hash, text_id))
+                        self.save_index_data(cursor, text_id, current_hash, data)
+                    cursor.execute("DELETE FROM index_queue WHERE text_id = ?", (text_id,))
+                conn.commit()
+                self.progress_changed.emit(start + len(results), total)
+            
+            # 增量更新时其他文本的模长随文档频率漂移，批量更新后统一校正
+            if total >= self.manager.TERM_NORM_REFRESH_MIN and not self._cancelled:
+                cursor.execute("BEGIN IMMEDIATE")
+                self.manager.refresh_term_norms(cursor)
+                conn.commit()
+        except Exception as e:
+            conn.rollback()
+            if not self._cancelled:
+                self.job_failed.emit(str(e))
+        finally:
+            conn.close()
+
+
+class MinHashRefreshWorker(QThread):
+    """查找近似重复文本前补算MinHash签名的线程
+
+    使用独立连接，为没有签名或签名已过期（内容哈希不一致）的文本分批计算签名，
+    每批在BEGIN IMMEDIATE事务中核对内容哈希后写入；计算期间被修改的文本已在
+    后台索引更新队列中，由IndexUpdateWorker按新内容计算。cancel()在批次之间
+    生效，已提交的签名保留。
+    """
+    progress_changed = pyqtSignal(int, int)  # 已完成数, 总数
+    job_finished = pyqtSignal(int, float)  # 补算的文本数, 耗时(秒)
+    job_failed = pyqtSignal(str)
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.db_path = manager.db_path
+        self._cancelled = False
+
+    def cancel(self):
+        """取消计算（可在其他线程调用）"""
+        self._cancelled = True
+
+    def run(self):
+        start_time = time.time()
+        manager = self.manager
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            # 清理已不存在的文本留下的签名
+            cursor.execute("DELETE FROM minhash_bands WHERE text_id NOT IN (SELECT id FROM texts)")
+            cursor.execute("DELETE FROM text_minhash WHERE text_id NOT IN (SELECT id FROM texts)")
+            conn.commit()
+            
+            cursor.execute('''
+            SELECT t.id FROM texts t
+            LEFT JOIN text_minhash m ON m.text_id = t.id
+            WHERE m.content_hash IS NOT t.content_hash OR t.content_hash IS NULL
+            ''')
+            text_ids = [text_id for text_id, in cursor.fetchall()]
+            total = len(text_ids)
+            
+            for start in range(0, total, 500):
+                if self._cancelled:
+                    return
+                chunk = text_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                SELECT id, title, content, is_markdown, is_html, content_hash
+                FROM texts WHERE id IN ({placeholders})
+                ''', chunk)
+                results = []
+                for text_id, title, content, is_markdown, is_html, content_hash in cursor.fetchall():
+                    store_hash = content_hash is None
+                    if store_hash:
+                        content_hash = manager.compute_content_hash(title, content, is_markdown, is_html)
+                    plain_text = manager.html_to_plain(content or '') if is_html else content
+                    results.append((text_id, content_hash, store_hash, manager.compute_minhash(plain_text)))
+                
+                cursor.execute("BEGIN IMMEDIATE")
+                for text_id, content_hash, store_hash, signature in results:
+                    if manager.current_content_hash(text_id, cursor)[0] != content_hash:
+                        continue
+                    if store_hash:
+                        cursor.execute(
+                            "UPDATE texts SET content_hash = ? WHERE id = ?", (content_hash, text_id))
+                    manager.save_text_minhash(text_id, content_hash, signature, cursor)
+                conn.commit()
+                self.progress_changed.emit(start + len(chunk), total)
+            
+            if not self._cancelled:
+                self.job_finished.emit(total, time.time() - start_time)
+        except Exception as e:
+            conn.rollback()
+            if not self._cancelled:
+                self.job_failed.emit(str(e))
+        finally:
+            conn.close()
+
+
+class JiebaWarmupWorker(QThread):
+    """启动后在后台加载jieba词典和关键词提取的IDF表，避免首次分析时界面卡顿"""
+    warmup_finished = pyqtSignal(bool, float)  # jieba是否可用, 耗时(秒)
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+
+    def cancel(self):
+        """词典加载无法中断，关闭窗口时等待加载完成"""
+
+    def run(self):
+        start_time = time.time()
+        available = False
+        try:
+            if self.manager.load_jieba() is not None:
+                import jieba.analyse
+                available = True
+        except Exception as e:
+            print(f"[jieba] 预热失败: {str(e)}")
+        self.warmup_finished.emit(available, time.time() - start_time)
+
+
+class TextListDelegate(QStyledItemDelegate):
+    """按模型中的颜色ID绘制列表项的背景色和文字颜色"""
+
+    def __init__(self, color_func, parent=None):
+        super().__init__(parent)
+        self._color_func = color_func
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        color_id = index.data(TextListModel.ColorRole)
+        if color_id is None:
+            return
+        
+        bg_color, text_color = self._color_func(color_id)
+        option.backgroundBrush = QBrush(bg_color)
+        option.palette.setColor(QPalette.Text, text_color)
+
+
+class TextAnalysisMixin:
+    """文本分析方法：字数分类、可读性、情感、关键词和特征提取
+
+    这些方法不访问界面，由TextManager和批量分析子进程中的BatchAnalyzer共用。
+    宿主类需提供self.cursor作为默认游标，并在使用前调用init_text_analysis()；
+    读数据库的方法都接受cursor参数，后台线程或子进程传入自己连接的游标。
+    这里的方法只能使用本类定义的属性，不能依赖宿主类的界面状态。
+    """
+    WORD_SPLIT_PATTERN = re.compile(r'(\w+)')  # 按单词切分，奇数位置为单词、偶数位置为单词间的字符
+    CJK_RUN_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+    DIGIT_RUN_PATTERN = re.compile(r'\d+')
+    SENTENCE_END_PATTERN = re.compile(r'[。！？.!?]+')
+    PUNCTUATION_CHARS = ',.!?;:，。！？；：、'  # 字数统计计入"标点符号"的字符
+    JIEBA_CACHE_FILE = 'jieba.cache'  # jieba前缀词典缓存文件（保存在程序目录）
+    
+    # 内置情感词典 (包含程度词和否定词处理)，可通过"加载情感词典"补充外部词典
+    SENTIMENT_LEXICON = {
+        # 中文情感词 (带权重)
+        'positive': {
+            '好': 1, '优秀': 2, '成功': 2, '高兴': 1.5, '满意': 1.5,
+            '喜欢': 1, '爱': 2, '开心': 1.5, '幸福': 2, '棒': 1,
+            '完美': 2, '精彩': 1.5, '美丽': 1, '聪明': 1, '强大': 1
+        },
+        'negative': {
+            '坏': 1, '差': 1, '失败': 2, '伤心': 1.5, '不满': 1.5,
+            '讨厌': 1.5, '恨': 2, '痛苦': 2, '糟糕': 1.5, '愚蠢': 1.5,
+            '难看': 1, '弱': 1, '困难': 1, '麻烦': 1, '失望': 1.5
+        },
+        # 英文情感词
+        'en_positive': {
+            'good': 1, 'excellent': 2, 'success': 2, 'happy': 1.5, 'satisfied': 1.5,
+            'like': 1, 'love': 2, 'joy': 1.5, 'great': 1.5, 'perfect': 2
+        },
+        'en_negative': {
+            'bad': 1, 'poor': 1, 'fail': 2, 'sad': 1.5, 'angry': 1.5,
+            'hate': 2, 'pain': 2, 'terrible': 1.5, 'stupid': 1.5, 'ugly': 1
+        },
+        # 程度副词
+        'intensifiers': {
+            '非常': 1.5, '特别': 1.5, '极其': 2, '十分': 1.3, '相当': 1.2,
+            '有点': 0.8, '稍微': 0.7, '略微': 0.7, '过于': 1.3,
+            'very': 1.5, 'extremely': 2, 'highly': 1.5, 'quite': 1.2
+        },
+        # 否定词
+        'negators': ['不', '没', '无', '非', '未', '不是', '不要', 'never', 'not', "n't"]
+    }
+    # 外部情感词典文件中的类别名
+    LEXICON_CATEGORIES = {
+        'positive': 'positive', '正面': 'positive',
+        'negative': 'negative', '负面': 'negative',
+        'intensifier': 'intensifier', '程度': 'intensifier',
+        'negator': 'negator', '否定': 'negator',
+    }
+
+    def init_text_analysis(self, jieba_user_dict=''):
+        """初始化分析用的实例状态"""
+        self.text_stats_cache = None  # 最近一次classify_text的 (文本, 统计结果)
+        self.sentiment_matcher = None  # 编译好的情感词典匹配器（词典变化时置空，使用时重新编译）
+        self.jieba_user_dict = jieba_user_dict  # jieba用户词典路径
+        self.jieba_loaded_user_dict = None  # 已加载到jieba中的用户词典路径
+
+    def get_setting(self, key, default=None, cursor=None):
+        """读取设置项（后台线程传入独立连接的游标）"""
+        cursor = cursor or self.cursor
+        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else default
+
+    def classify_text(self, text, cache=True):
+        """一次切分统计文本的字符和单词构成，供字数统计、保存、基本统计和文本特征共用
+
+        用WORD_SPLIT_PATTERN把文本切成单词(\\w+)和单词间字符两部分：中文字符、
+        英文单词和数字按不同单词分组计数，标点、空格、换行和句末标点只在单词间
+        字符中计数。各项结果与原来逐项正则统计的定义一致：
+            chinese_chars   [\\u4e00-\\u9fff]字符数
+            english_words   \\b[a-zA-Z]+\\b单词数（english_letters为其字母总数）
+            numbers         \\d+数字串数
+            words           \\w+单词数（unique_words为不同单词数）
+            sentences       按[。！？.!?]+分句的段数
+        结果只读；最近一次的结果被缓存，同一文本在多处统计时不重复扫描。
+        逐段统计等小文本可传cache=False，避免挤掉整篇文本的缓存。
+        """
+        cached = self.text_stats_cache
+        if cache and cached is not None and cached[0] == text:
+            return cached[1]
+        
+        parts = self.WORD_SPLIT_PATTERN.split(text)
+        words = parts[1::2]
+        # 单词间字符用\x00连接，避免两段句末标点在拼接后被当作一段
+        gaps = '\x00'.join(parts[0::2])
+        
+        word_counts = Counter(words)
+        chinese_chars = english_words = english_letters = numbers = 0
+        english_vocabulary = {}
+        for word, count in word_counts.items():
+            if word.isascii():
+                if word.isalpha():
+                    english_words += count
+                    english_letters += count * len(word)
+                    english_vocabulary[word] = count
+                    continue
+            else:
+                chinese = sum(map(len, self.CJK_RUN_PATTERN.findall(word)))
+                chinese_chars += count * chinese
+                if chinese == len(word):
+                    continue
+            if not word.isalpha():
+                numbers += count * len(self.DIGIT_RUN_PATTERN.findall(word))
+        
+        stats = {
+            'total': len(text),
+            'chinese_chars': chinese_chars,
+            'english_words': english_words,
+            'english_letters': english_letters,
+            'english_vocabulary': english_vocabulary,
+            'numbers': numbers,
+            'punctuation': sum(gaps.count(ch) for ch in self.PUNCTUATION_CHARS),
+            'spaces': gaps.count(' '),
+            'newlines': gaps.count('\n'),
+            'words': len(words),
+            'unique_words': len(word_counts),
+            'sentences': len(self.SENTENCE_END_PATTERN.findall(gaps)) + 1,
+            'sentence_marks': sum(gaps.count(ch) for ch in '。.！!？?'),
+            'questions': gaps.count('?') + gaps.count('？'),
+            'exclamations': gaps.count('!') + gaps.count('！'),
+            'paragraphs': sum(1 for p in text.split('\n') if p.strip()),
+        }
+        if cache:
+            self.text_stats_cache = (text, stats)
+        return stats
+
+    def compute_readability(self, content):
+        """完整版可读性评分计算 (Flesch Reading Ease + 中文适配)
+
+        不访问界面，可在后台线程调用。没有有效内容时返回None。
+        """
+        stats = self.classify_text(content)
+        
+        # 英文部分计算 (Flesch Reading Ease)
+        english_words = stats['english_words']
+        english_sentences = re.findall(r'[.!?]+', content)
+        
+        flesch_score = 0
+        if english_words and english_sentences:
+            avg_words_per_sentence = english_words / len(english_sentences)
+            syllables = sum(len(re.findall(r'[aeiouyAEIOUY]+', word)) * count
+                            for word, count in stats['english_vocabulary'].items())
+            avg_syllables_per_word = syllables / english_words
+            flesch_score = 206.835 - (1.015 * avg_words_per_sentence) - (84.6 * avg_syllables_per_word)
+        
+        # 中文部分计算 (基于平均句长和词汇难度)
+        chinese_chars = stats['chinese_chars']
+        chinese_sentences = re.split(r'[。！？；;]+', content)
+        chinese_sentences = [s for s in chinese_sentences if s.strip()]
+        
+        chinese_score = 0
+        if chinese_chars and chinese_sentences:
+            avg_chars_per_sentence = chinese_chars / len(chinese_sentences)
+            # 中文可读性经验公式 (基于句长和常用词比例)
+            common_word_ratio = len(re.findall(r'[的了是在有这我你他我们他们]', content)) / chinese_chars
+            chinese_score = 100 - (avg_chars_per_sentence * 0.5) + (common_word_ratio * 20)
+        
+        # 综合评分 (根据中英文内容比例)
+        total_chars = stats['total']
+        if total_chars == 0:
+            return None
+        
+        english_ratio = stats['english_letters'] / total_chars
+        chinese_ratio = chinese_chars / total_chars
+        readability = (flesch_score * english_ratio + chinese_score * chinese_ratio)
+        readability = max(0, min(100, readability))  # 限制在0-100范围内
+        
+        # 评分描述
+        if readability >= 90:
+            level = "非常容易"
+            description = (
+                "文本极其易读，适合所有读者，包括小学生。\n"
+                "典型文本：儿童读物、简单对话、基础说明文。\n"
+                "平均句子长度：8个词或更少\n"
+                "平均每词音节数：1.0或更少"
+            )
+        elif readability >= 80:
+            level = "容易"
+            description = (
+                "文本非常易读，适合普通大众阅读。\n"
+                "典型文本：流行小说、报纸文章、博客文章。\n"
+                "平均句子长度：8-12个词\n"
+                "平均每词音节数：1.0-1.2"
+            )
+        elif readability >= 70:
+            level = "较容易" 
+            description = (
+                "文本比较容易理解，适合13-15岁学生。\n"
+                "典型文本：青少年读物、杂志文章。\n"
+                "平均句子长度：12-15个词\n"
+                "平均每词音节数：1.2-1.4"
+            )
+        elif readability >= 60:
+            level = "标准"
+            description = (
+                "文本难度适中，适合高中毕业生阅读。\n"
+                "典型文本：普通报刊、大众非小说类书籍。\n"
+                "平均句子长度：15-17个词\n"
+                "平均每词音节数：1.4-1.6"
+            )
+        elif readability >= 50:
+            level = "较难"
+            description = (
+                "文本有一定难度，适合大学生阅读。\n"
+                "典型文本：学术论文、专业杂志、技术文档。\n"
+                "平均句子长度：17-20个词\n"
+                "平均每词音节数：1.6-1.8"
+            )
+        elif readability >= 30:
+            level = "困难"
+            description = (
+                "文本难度较高，需要专业知识或高等教育背景。\n"
+                "典型文本：法律文件、学术论文、专业文献。\n"
+                "平均句子长度：20-25个词\n"
+                "平均每词音节数：1.8-2.0"
+            )
+        else:
+            level = "非常困难"
+            description = (
+                "文本极其难懂，需要专业领域知识。\n"
+                "典型文本：哲学著作、高级技术规范、古典文学。\n"
+                "平均句子长度：25个词以上\n"
+                "平均每词音节数：2.0以上"
+            )
+        
+        return {
+            'readability': readability,
+            'level': level,
+            'description': description,
+            'flesch_score': flesch_score,
+            'chinese_score': chinese_score,
+        }
+
+    def get_sentiment_matcher(self, cursor=None):
+        """返回编译好的情感词典匹配器（内置词典加上设置中的外部词典，首次使用时编译）
+
+        cursor用于读取外部词典设置，后台线程首次编译时需传入独立连接的游标。
+
+        中英文情感词按各自类别编入同一个自动机：英文情感词按整词、不区分大小写
+        匹配，其余词条按子串匹配。外部词典中与内置词典重复的词条覆盖其权重。
+        """
+        matcher = self.sentiment_matcher
+        if matcher is not None:
+            return matcher
+        
+        entries = {}
+        def add_entry(word, category, weight):
+            is_english = category in ('positive', 'negative') and re.fullmatch(r"[A-Za-z][A-Za-z' -]*", word)
+            key = (category, word.lower() if is_english else word)
+            if key in entries:
+                entries[key][1] = weight
+            else:
+                entries[key] = [word, weight, len(entries), bool(is_english)]
+        
+        for group, category in (('positive', 'positive'), ('negative', 'negative'),
+                                ('en_positive', 'positive'), ('en_negative', 'negative'),
+                                ('intensifiers', 'intensifier')):
+            for word, weight in self.SENTIMENT_LEXICON[group].items():
+                add_entry(word, category, weight)
+        for word in self.SENTIMENT_LEXICON['negators']:
+            add_entry(word, 'negator', 1)
+        
+        for path in json.loads(self.get_setting('sentiment_lexicons', '[]', cursor)):
+            try:
+                for word, category, weight in self.load_lexicon_file(path):
+                    add_entry(word, category, weight)
+            except (OSError, ValueError) as e:
+                print(f"[情感词典] 跳过无法读取的词典 {path}: {str(e)}")
+        
+        matcher = LexiconMatcher()
+        for (category, _), (word, weight, order, is_english) in entries.items():
+            matcher.add(word, category, weight, order, boundary=is_english, ignore_case=is_english)
+        self.sentiment_matcher = matcher.build()
+        print(f"[情感词典] 已编译 {matcher.entry_count} 个词条")
+        return matcher
+
+    def load_lexicon_file(self, path):
+        """读取外部情感词典文件
+
+        UTF-8文本，每行一个词条：词条、类别、权重（可省略，默认1），用制表符分隔，
+        没有制表符时按空白分隔。类别为 positive/正面、negative/负面、
+        intensifier/程度、negator/否定。空行和#开头的行忽略。
+        """
+        entries = []
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = [field.strip() for field in line.split('\t')] if '\t' in line else line.split()
+                if len(fields) < 2 or fields[1].lower() not in self.LEXICON_CATEGORIES:
+                    raise ValueError(f"第{line_number}行格式错误: {line}")
+                weight = float(fields[2]) if len(fields) > 2 and fields[2] else 1.0
+                entries.append((fields[0], self.LEXICON_CATEGORIES[fields[1].lower()], weight))
+        return entries
+
+    def compute_sentiment(self, content, cursor=None):
+        """完整版情感分析 (支持中英文混合+程度分析)
+
+        所有词典编译在同一个匹配器中，全文只扫描一次，再按句子汇总：
+        句中有否定词时情感反转，程度副词取词典顺序中第一个出现的，
+        每个情感词在一句中只计一次。不访问界面，可在后台线程传入独立连接的
+        cursor调用（首次使用时用它读取外部词典设置）。
+        """
+        # 按句末标点切分句子，记录每句的起止位置
+        sentence_spans = []
+        position = 0
+        for match in re.finditer(r'[。！？；;.!?]+', content):
+            sentence_spans.append((position, match.start()))
+            position = match.end()
+        sentence_spans.append((position, len(content)))
+        sentence_starts = [start for start, _ in sentence_spans]
+        
+        # 扫描一次，把命中的词条归入所在句子（跨越句末标点的词条不计）
+        sentence_hits = {}
+        for start, end, word, category, weight, order in self.get_sentiment_matcher(cursor).find(content):
+            index = bisect.bisect_right(sentence_starts, start) - 1
+            if end > sentence_spans[index][1]:
+                continue
+            hits = sentence_hits.setdefault(index, {'negator': False, 'intensifier': None, 'words': {}})
+            if category == 'negator':
+                hits['negator'] = True
+            elif category == 'intensifier':
+                if hits['intensifier'] is None or order < hits['intensifier'][0]:
+                    hits['intensifier'] = (order, weight)
+            else:
+                hits['words'][order] = (word, category, weight)
+        
+        # 初始化计数器
+        positive_score = 0
+        negative_score = 0
+        sentiment_words = []
+        
+        for index in sorted(sentence_hits):
+            hits = sentence_hits[index]
+            
+            # 否定词和程度词
+            negator_factor = -1 if hits['negator'] else 1
+            intensifier = hits['intensifier'][1] if hits['intensifier'] else 1
+            
+            # 情感词按词典顺序计分
+            for order in sorted(hits['words']):
+                word, category, weight = hits['words'][order]
+                score = weight * intensifier * negator_factor
+                if category == 'positive':
+                    positive_score += max(0, score)
+                    negative_score += max(0, -score)
+                else:
+                    negative_score += max(0, score)
+                    positive_score += max(0, -score)
+                sentiment_words.append((word, score))
+        
+        # 计算情感倾向
+        total_score = positive_score - negative_score
+        abs_total = abs(total_score)
+        
+        if abs_total < 1:
+            sentiment = "中性"
+            intensity = "一般"
+        else:
+            if total_score > 0:
+                sentiment = "积极"
+                intensity = "强烈" if abs_total > 3 else "中等" if abs_total > 1.5 else "轻微"
+            else:
+                sentiment = "消极"
+                intensity = "强烈" if abs_total > 3 else "中等" if abs_total > 1.5 else "轻微"
+        
+        return {
+            'sentiment': sentiment,
+            'intensity': intensity,
+            'positive_score': positive_score,
+            'negative_score': negative_score,
+            'top_words': sorted(sentiment_words, key=lambda x: abs(x[1]), reverse=True)[:5],
+        }
+
+    def load_jieba(self):
+        """导入并初始化jieba，返回jieba模块；未安装时返回None（可在后台线程调用）
+
+        前缀词典缓存在程序目录下的JIEBA_CACHE_FILE中（jieba默认缓存在系统临时
+        目录，可能被清理），之后启动只需读取缓存。用户词典在初始化后加载。
+        jieba初始化时自带锁，后台预热和分析线程同时调用时后到者等待加载完成。
+        """
+        try:
+            import jieba
+        except ImportError:
+            return None
+        
+        if not jieba.dt.initialized:
+            jieba.dt.tmp_dir = os.path.dirname(os.path.abspath(__file__))
+            jieba.dt.cache_file = self.JIEBA_CACHE_FILE
+            jieba.initialize()
+        
+        user_dict = self.jieba_user_dict
+        if user_dict and user_dict != self.jieba_loaded_user_dict:
+            self.jieba_loaded_user_dict = user_dict
+            try:
+                jieba.load_userdict(user_dict)
+                print(f"[jieba] 已加载用户词典: {user_dict}")
+            except Exception as e:
+                print(f"[jieba] 加载用户词典失败 {user_dict}: {str(e)}")
+        return jieba
+
+    def extract_keywords(self, content, top_n=10, with_weight=False, use_corpus_idf=True, cursor=None):
+        """完整版关键词提取(使用jieba分词)
+        
+        参数:
+            content: 要提取关键词的文本内容
+            top_n: 返回关键词数量
+            with_weight: 是否返回关键词权重
+            use_corpus_idf: 是否结合全库文档频率调整权重
+            cursor: 读取文档频率使用的游标（后台线程传入独立连接的游标）
+            
+        返回:
+            关键词列表(带权重时为元组列表)
+        """
+        try:
+            # 导入并初始化jieba（启动后已在后台预热，通常不需要再加载词典）
+            if self.load_jieba() is None:
+                raise ImportError("jieba")
+            import jieba.analyse
+            
+            # 自定义停用词列表 (可根据需要扩展)
+            stop_words = {
+                '的', '了', '和', '是', '在', '我', '有', '这', '那', '你', '他', '她', '它',
+                '我们', '你们', '他们', '这个', '那个', '要', '也', '都', '会', '可以', '可能',
+                '就是', '这样', '这些', '那些', '一些', '一点', '一种', '一样', '一般', '一定',
+                '非常', '很多', '什么', '为什么', '怎么', '如何', '因为', '所以', '但是', '虽然',
+                '如果', '然后', '而且', '或者', '还是', '不是', '没有', '不要', '不能', '需要',
+                '应该', '可能', '可以', '必须', '只是', '真是', '真是', '真是', '真是', '真是'
+            }
+            
+            # 1. 计算TF-IDF (使用jieba的TF-IDF接口)
+            keywords = jieba.analyse.extract_tags(
+                content,
+                topK=top_n*2,  # 先获取更多候选词
+                withWeight=True,
+                allowPOS=('n', 'vn', 'v', 'a')  # 只保留名词、动名词、动词、形容词
+            )
+            
+            # 2. 过滤停用词和单字词
+            filtered_keywords = [
+                (word, weight) for word, weight in keywords 
+                if word not in stop_words and len(word) > 1
+            ][:top_n]
+            
+            # 3. 计算文档频率 (从词项文档频率表读取)
+            doc_freq = {}
+            total_docs = 0
+            if use_corpus_idf:
+                doc_freq, total_docs = self.get_doc_freqs([word for word, _ in filtered_keywords], cursor)
+            
+            # 4. 调整权重 (结合全局文档频率)
+            final_keywords = []
+            for word, weight in filtered_keywords:
+                # 计算逆文档频率 (IDF)
+                df = doc_freq.get(word, 1)
+                idf = math.log((total_docs + 1) / (df + 1)) + 1  # 平滑处理
+                
+                # 调整后的权重 = TF * IDF
+                adjusted_weight = weight * idf
+                
+                final_keywords.append((word, adjusted_weight))
+            
+            # 按调整后的权重重新排序
+            final_keywords.sort(key=lambda x: x[1], reverse=True)
+            
+            if with_weight:
+                return final_keywords[:top_n]
+            else:
+                return [word for word, weight in final_keywords[:top_n]]
+                
+        except ImportError:
+            # 回退到简单实现 (如果没有安装jieba)，启动预热时已在状态栏提示过
+            return self._fallback_extract_keywords(content, top_n)
+        except Exception as e:
+            print(f"关键词提取错误: {str(e)}")
+            return []
+
+    def _fallback_extract_keywords(self, content, top_n):
+        """jieba不可用时的回退实现"""
+        words = re.findall(r'[\u4e00-\u9fa5]{2,}', content)
+        
+        # 简单停用词过滤
+        stop_words = ['的', '了', '和', '是', '在', '我', '有', '这', '那', '你']
+        words = [word for word in words if word not in stop_words]
+        
+        # 词频统计
+        word_counts = {}
+        for word in words:
+            word_counts[word] = word_counts.get(word, 0) + 1
+        
+        # 按频率排序
+        sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
+        
+        return [word for word, count in sorted_words[:top_n]]
+
+    def get_doc_freqs(self, terms, cursor=None):
+        """读取词项的文档频率，返回 ({词项: 文档数}, 文本总数)"""
+        cursor = cursor or self.cursor
+        cursor.execute("SELECT COUNT(*) FROM texts")
+        total_docs = cursor.fetchone()[0]
+        if not terms or not total_docs:
+            return {}, total_docs
+        
+        terms = list(terms)
+        doc_freq = {}
+        for start in range(0, len(terms), 500):
+            chunk = terms[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(
+                f"SELECT term, doc_freq FROM term_doc_freq WHERE term IN ({placeholders})", chunk)
+            doc_freq.update(cursor.fetchall())
+        return doc_freq, total_docs
+
+    def extract_text_features(self, text, use_corpus_idf=True, cursor=None):
+        """提取文本多维特征
+
+        use_corpus_idf为False时关键词不按全库文档频率重排（关键词集合不变），
+        用于批量计算特征缓存，避免逐个关键词扫描全库。
+        """
+        stats = self.classify_text(text)
+        features = {
+            # 词汇特征
+            'word_count': stats['words'],
+            'unique_words': stats['unique_words'],
+            'lexical_diversity': stats['unique_words'] / max(1, stats['words']),
+            
+            # 中文特征
+            'chinese_chars': stats['chinese_chars'],
+            'chinese_ratio': stats['chinese_chars'] / max(1, stats['total']),
+            
+            # 英文特征
+            'english_words': stats['english_words'],
+            'english_ratio': stats['english_words'] / max(1, stats['words']),
+            
+            # 结构特征
+            'avg_sentence_length': stats['words'] / max(1, stats['sentences']),
+            'paragraph_count': stats['paragraphs'],
+            
+            # 内容特征
+            'question_ratio': stats['questions'] / max(1, stats['sentence_marks']),
+            'exclamation_ratio': stats['exclamations'] / max(1, stats['sentence_marks']),
+            
+            # 关键词特征
+            'keywords': self.extract_keywords(text, top_n=10, use_corpus_idf=use_corpus_idf, cursor=cursor)
+        }
+        return features
+
+    def html_to_plain(self, html):
+        """将HTML转换为纯文本（简化版）"""
+        # 移除HTML标签
+        text = re.sub(r'<[^>]+>', '', html)
+        # 替换HTML实体
+        text = text.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>')
+        return text.strip()
+
+
+class BatchAnalyzer(TextAnalysisMixin):
+    """批量分析子进程中使用的分析器
+
+    子进程中没有主窗口，通过TextAnalysisMixin复用与主窗口相同的分析方法，
+    使用只读连接读取词项文档频率和外部情感词典设置。
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA query_only = ON")
+        self.cursor = self.conn.cursor()
+        self.init_text_analysis(self.get_setting('jieba_user_dict', ''))
+
+    def analyze(self, text_id, content, content_hash, is_html):
+        """分析一篇文本，返回与text_analysis列对应的元组，末尾附加特征JSON
+
+        可读性、情感和关键词按纯文本计算；特征与update_text_features一致，
+        按原始内容计算且关键词不按全库文档频率重排。出错时各项结果为None。
+        """
+        content = content or ''
+        plain_text = self.html_to_plain(content) if is_html else content
+        try:
+            readability = self.compute_readability(plain_text)
+            sentiment = self.compute_sentiment(plain_text, cursor=self.cursor)
+            keywords = self.extract_keywords(plain_text, cursor=self.cursor)
+            features = self.extract_text_features(content, use_corpus_idf=False, cursor=self.cursor)
+        except Exception as e:
+            print(f"[批量分析] 文本{text_id}分析失败: {str(e)}")
+            return (text_id, content_hash, None, None, None, None, None, None)
+
+        return (
+            text_id, content_hash,
+            readability['readability'] if readability else None,
+            readability['level'] if readability else None,
+            sentiment['positive_score'] - sentiment['negative_score'],
+            sentiment['sentiment'],
+            json.dumps(keywords, ensure_ascii=False),
+            json.dumps(features, ensure_ascii=False),
+        )
+
+    def suggest_tags(self, content, is_html, top_n):
+        """按纯文本提取关键词作为候选标签（与auto_tag_text相同），出错时返回空列表"""
+        content = content or ''
+        plain_text = self.html_to_plain(content) if is_html else content
+        try:
+            return self.extract_keywords(plain_text, top_n=top_n, cursor=self.cursor)
+        except Exception as e:
+            print(f"[自动标签] 关键词提取失败: {str(e)}")
+            return []
+
+
+_batch_analyzer = None  # 批量分析子进程中的分析器，由init_batch_analyzer创建
+
+
+def init_batch_analyzer(db_path):
+    """批量分析进程池的初始化函数：每个子进程创建一个分析器"""
+    global _batch_analyzer
+    _batch_analyzer = BatchAnalyzer(db_path)
+
+
+def analyze_text_chunk(rows):
+    """在子进程中分析一批文本（进程池只能调用可按名称序列化的模块级函数）"""
+    return [_batch_analyzer.analyze(*row) for row in rows]
+
+
+def extract_chunk_tags(rows, top_n):
+    """在子进程中为一批文本提取关键词作为候选标签，返回 [(文本ID, [标签])]"""
+    return [(text_id, _batch_analyzer.suggest_tags(content, is_html, top_n))
+            for text_id, content, is_html in rows]
+
+
+def create_analysis_pool(db_path, processes):
+    """创建批量分析使用的进程池（每个子进程初始化一个BatchAnalyzer）
+
+    子进程使用spawn方式启动：主进程已创建Qt对象和线程，fork出的子进程可能死锁。
+    """
+    return ProcessPoolExecutor(max_workers=processes,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_batch_analyzer,
+                               initargs=(db_path,))
+
+
+class TextManager(TextAnalysisMixin, QMainWindow):
     # 类变量 - 集中管理关于信息
     ABOUT = {
         "name": "高级文本管理工具",
@@ -57,7 +1598,37 @@ class TextManager(QMainWindow):
     }
 
     # 类变量 - 集中管理配置参数
-    SIMILAR_TEXT_DISPLAY_COUNT = 0  # 控制显示的相似文章数量，0表示显示全部
+    SIMILAR_TEXT_DISPLAY_COUNT = 20  # 相似文本检索返回的数量(top-k)，0表示显示全部候选
+    SIMILARITY_QUERY_TERMS = 64  # 相似文本检索时使用的查询词项数量上限（按TF-IDF权重取前N个）
+    SIMILARITY_MAX_DF_RATIO = 0.5  # 出现在超过该比例文本中的词项区分度低，不参与倒排检索
+    SIMILARITY_CANDIDATES = 200  # 粗排后参与精确相似度计算的候选文本数量下限
+    MINHASH_SHINGLE_SIZE = 5  # 近似重复检测的字符shingle长度（按字符切分，中文同样适用）
+    MINHASH_PERMUTATIONS = 128  # MinHash签名长度
+    MINHASH_BANDS = 32  # LSH分段数（每段 MINHASH_PERMUTATIONS // MINHASH_BANDS 个值）
+    NEAR_DUPLICATE_THRESHOLD = 0.8  # 估计的Jaccard相似度达到该值视为近似重复
+    SIMHASH_MAX_DISTANCE = 3  # 保存新文本时SimHash汉明距离不超过该值即提示可能重复
+    SIMHASH_BACKFILL_CHUNK_SIZE = 500  # 回填SimHash时每批处理的文本数量
+    SEARCH_DEBOUNCE_MS = 300  # 输入停止多久后开始搜索
+    SEARCH_HISTORY_PAUSE_MS = 2000  # 输入停顿多久后记录搜索历史
+    PREVIEW_DEBOUNCE_MS = 300  # Markdown模式下停止输入多久后刷新预览
+    PREVIEW_CACHE_BLOCKS = 2000  # Markdown预览缓存的已渲染块数量
+    READING_PROGRESS_INTERVAL_MS = 100  # 光标移动时阅读进度最多每隔多久刷新一次
+    BATCH_ANALYSIS_CHUNK_SIZE = 50  # 批量分析时每批交给子进程并提交一次的文本数量
+    BATCH_ANALYSIS_PROCESSES = 0  # 批量分析使用的进程数，0表示CPU核数
+    AUTO_TAG_COUNT = 3  # 自动打标签时每篇文本添加的关键词标签数量
+    INDEX_UPDATE_CHUNK_SIZE = 50  # 后台更新索引时每批计算并提交一次的文本数量
+    INDEX_PROGRESS_MIN = 20  # 后台待更新索引的文本达到该数量时在状态栏显示进度
+    TERM_NORM_REFRESH_MIN = 20  # 后台一次更新的文本达到该数量时重新计算全部文本向量模长
+    
+    FTS_TOKENIZER_DEFAULT = 'trigram'  # 全文检索默认分词方式: trigram / jieba
+    FTS_REBUILD_CHUNK_SIZE = 1000  # 重建全文索引时每批处理的文本数量
+    FTS_TRIGGERS = ('texts_fts_ai', 'texts_fts_ad', 'texts_fts_au')  # 维护外部内容索引的触发器
+    PINYIN_BACKFILL_CHUNK_SIZE = 1000  # 回填标题拼音时每批处理的文本数量
+    BM25_TITLE_WEIGHT = 10.0  # 相关度排序时标题命中的权重
+    BM25_CONTENT_WEIGHT = 1.0  # 相关度排序时内容命中的权重
+    SNIPPET_TOKENS = 16  # 搜索结果摘要的长度（分词单位数）
+    RELEVANCE_RESULT_LIMIT = 200  # 按相关度排序时显示的结果数量
+    LIST_CACHE_SIZE = 64  # 文本列表查询结果缓存的条目数（按页计）
 
 
     def __init__(self):
@@ -71,7 +1642,29 @@ class TextManager(QMainWindow):
         # 初始化变量
         self.current_view = "normal"  # normal/recycle_bin
         self.current_id = None
-        self.db_version = 2  # 当前数据库最新版本
+        self.editor_dirty = False  # 分类/格式等无修改标志的控件是否被改动
+        self.search_worker = None  # 正在执行的后台搜索
+        self.search_generation = 0  # 搜索序号，用于丢弃过期的搜索结果
+        self.analysis_worker = None  # 正在执行的后台文本分析
+        self.analysis_generation = 0  # 分析序号，用于丢弃已取消或过期的分析结果
+        self.block_word_counts = []  # 内容编辑器每个文本块的 (中文字符数, 英文单词数)，与块号一一对应
+        self.word_count_totals = [0, 0]  # block_word_counts的合计
+        self.preview_renderer = MarkdownBlockRenderer(self.PREVIEW_CACHE_BLOCKS)  # 按块缓存的Markdown渲染器
+        self.preview_worker = None  # 正在执行的后台预览渲染
+        self.preview_generation = 0  # 预览序号，用于丢弃过期的渲染结果
+        self.batch_analysis_worker = None  # 正在执行（或正在结束）的批量分析
+        self.batch_analysis_dialog = None  # 批量分析进度对话框
+        self.auto_tag_worker = None  # 正在执行（或正在结束）的批量自动打标签
+        self.auto_tag_dialog = None  # 批量自动打标签进度对话框
+        self.jieba_warmup_started = False  # 是否已在后台预热jieba
+        self.index_update_worker = None  # 正在执行（或正在结束）的后台索引更新
+        self.index_update_pending = False  # 索引更新期间又有文本入队，结束后需要再更新一轮
+        self.minhash_refresh_worker = None  # 正在执行（或正在结束）的MinHash签名补算
+        self.minhash_refresh_dialog = None  # 补算签名进度对话框
+        self.init_text_analysis()  # 分析缓存和jieba状态（用户词典在init_db中从设置读取）
+        self.db_path = 'text_manager_enhanced.db'
+        self.list_cache = QueryResultCache(self.LIST_CACHE_SIZE)  # 文本列表分页查询结果缓存
+        self.db_version = 16  # 当前数据库最新版本
         self.default_format = 2  # 默认使用即见即所得模式
         
         # 初始化数据库和UI
@@ -155,7 +1748,7 @@ class TextManager(QMainWindow):
 
     def init_db(self):
         """初始化数据库并检查升级"""
-        self.conn = sqlite3.connect('text_manager_enhanced.db')
+        self.conn = sqlite3.connect(self.db_path)
         self.cursor = self.conn.cursor()
         
         # 启用SQLite全文搜索
@@ -174,13 +1767,39 @@ class TextManager(QMainWindow):
         current_version = self.cursor.fetchone()
         current_version = current_version[0] if current_version else 0
         
-        # 执行必要的升级
-        self.upgrade_database(current_version)
+        # 创建设置表（升级步骤需要读取设置，如全文检索分词方式）
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''')
+        # 升级和重建索引时可能用到jieba分词，先读取用户词典设置
+        self.jieba_user_dict = self.get_setting('jieba_user_dict', '')
+        
+        # 执行必要的升级：各步骤在同一个显式事务中执行，中途失败时回滚尚未提交的
+        # 结构修改（回填数据的步骤会分批提交，重新执行时可接着完成）
+        self.cursor.execute("BEGIN")
+        try:
+            self.upgrade_database(current_version)
+        except Exception:
+            self.conn.rollback()
+            raise
         
         # 初始化表结构
         self.init_tables()
         self.init_default_shortcuts()
         self.conn.commit()
+        
+        # 全文索引与texts表不一致时（如被外部工具修改）自动重建；
+        # 较慢的结构完整性检查只在升级后执行，平时可从工具菜单手动检查
+        if not self.check_fts_consistency(integrity_check=current_version < self.db_version):
+            print("[FTS] 全文索引与文本表不一致，正在重建...")
+            self.rebuild_fts_index()
+        
+        # 补算外部写入（未经本程序保存）的文本的标题拼音和SimHash指纹
+        self.backfill_title_pinyin()
+        self.backfill_simhash()
 
     def upgrade_database(self, current_version):
         """执行数据库升级"""
@@ -200,13 +1819,184 @@ class TextManager(QMainWindow):
                 if "duplicate column" not in str(e):
                     raise
         
+        if current_version < 3:
+            # 版本3升级：将texts_fts重建为真正的FTS5虚拟表并按批次重建索引。
+            # 需要版本3升级的数据库一定也会执行版本4升级，rebuild_fts_index直接按
+            # 版本4的结构重建，这里只记录版本，避免整个全文索引重建两次
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (3)')
+            print("数据库升级到版本3：重建FTS5全文索引（与版本4合并执行）")
+        
+        if current_version < 4:
+            # 版本4升级：texts_fts改为外部内容表(content='texts')，由触发器维护
+            self.rebuild_fts_index()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (4)')
+            print("数据库升级到版本4：全文索引改为外部内容表（执行\"优化数据库\"可回收空间）")
+        
+        if current_version < 5:
+            # 版本5升级：为列表排序、分类/字数/标签筛选等热点查询添加索引
+            self.create_indexes()
+            self.cursor.execute("ANALYZE")
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (5)')
+            print("数据库升级到版本5：添加查询索引")
+        
+        if current_version < 6:
+            # 版本6升级：jieba分词模式下为普通搜索补建trigram子串索引
+            self.rebuild_substring_index()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (6)')
+            print("数据库升级到版本6：添加trigram子串索引")
+        
+        if current_version < 7:
+            # 版本7升级：预先计算标题全拼和首字母并建立索引，拼音搜索直接查索引
+            for column in ('title_pinyin', 'title_initials'):
+                try:
+                    self.cursor.execute(f'ALTER TABLE texts ADD COLUMN {column} TEXT')
+                except sqlite3.OperationalError as e:
+                    if "duplicate column" not in str(e):
+                        raise
+            self.execute_script('''
+            CREATE INDEX IF NOT EXISTS idx_texts_title_pinyin ON texts(title_pinyin);
+            CREATE INDEX IF NOT EXISTS idx_texts_title_initials ON texts(title_initials);
+            ''')
+            self.backfill_title_pinyin()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (7)')
+            print("数据库升级到版本7：添加标题拼音索引")
+        
+        if current_version < 8:
+            # 版本8升级：记录内容哈希，未修改的文本保存时不再写库
+            try:
+                self.cursor.execute('ALTER TABLE texts ADD COLUMN content_hash TEXT')
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (8)')
+            print("数据库升级到版本8：添加内容哈希")
+        
+        if current_version < 9:
+            # 版本9升级：未经save_text（未同时写入新哈希）修改标题或内容时清空内容哈希，
+            # 使依赖内容哈希的特征缓存失效
+            self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS texts_content_hash_au
+            AFTER UPDATE OF title, content ON texts
+            WHEN new.content_hash IS old.content_hash
+                AND (new.title IS NOT old.title OR new.content IS NOT old.content)
+            BEGIN
+                UPDATE texts SET content_hash = NULL WHERE id = new.id;
+            END
+            ''')
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (9)')
+            print("数据库升级到版本9：内容修改时清除过期的内容哈希")
+        
+        if current_version < 10:
+            # 版本10升级：建立词项文档频率表，关键词IDF不再逐词LIKE扫描全库；
+            # 全部文本排队，启动后由后台线程切分
+            self.init_tables()
+            self.reset_term_index()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (10)')
+            print("数据库升级到版本10：建立词项文档频率表")
+        
+        if current_version < 11:
+            # 版本11升级：text_terms记录词频权重，另存文本向量模长，用于TF-IDF相似度检索
+            try:
+                self.cursor.execute('ALTER TABLE text_terms ADD COLUMN tf_weight REAL NOT NULL DEFAULT 1.0')
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise
+            self.init_tables()
+            if current_version >= 10:
+                # 从版本10之前升级时，上一步已清空并排队
+                self.reset_term_index()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (11)')
+            print("数据库升级到版本11：建立TF-IDF相似度索引")
+        
+        if current_version < 12:
+            # 版本12升级：保存SimHash指纹，按分段表达式索引查找近似重复；
+            # 未经save_text修改内容时清空指纹，启动时重新回填
+            try:
+                self.cursor.execute('ALTER TABLE texts ADD COLUMN simhash INTEGER')
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise
+            for band, expression in enumerate(self.simhash_band_expressions()):
+                self.cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_texts_simhash_{band} ON texts({expression})')
+            self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS texts_simhash_au
+            AFTER UPDATE OF content ON texts
+            WHEN new.content_hash IS old.content_hash AND new.content IS NOT old.content
+            BEGIN
+                UPDATE texts SET simhash = NULL WHERE id = new.id;
+            END
+            ''')
+            self.backfill_simhash()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (12)')
+            print("数据库升级到版本12：添加SimHash指纹索引")
+        
+        if current_version < 13:
+            # 版本13升级：保存批量分析结果（可读性、情感、关键词），按可读性和情感筛选走索引；
+            # 待分析文本记录在队列表中，批量分析中断后可继续
+            self.init_tables()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (13)')
+            print("数据库升级到版本13：添加批量分析结果表")
+        
+        if current_version < 14:
+            # 版本14升级：版本9的触发器只看UPDATE语句是否写了标题/内容列，
+            # 值未变（如只改分类）也会清空内容哈希，导致下次保存重算全部特征；
+            # 重建触发器，只在标题或内容的值确实改变时清空
+            self.cursor.execute("DROP TRIGGER IF EXISTS texts_content_hash_au")
+            self.cursor.execute('''
+            CREATE TRIGGER texts_content_hash_au
+            AFTER UPDATE OF title, content ON texts
+            WHEN new.content_hash IS old.content_hash
+                AND (new.title IS NOT old.title OR new.content IS NOT old.content)
+            BEGIN
+                UPDATE texts SET content_hash = NULL WHERE id = new.id;
+            END
+            ''')
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (14)')
+            print("数据库升级到版本14：内容哈希触发器只在内容实际改变时生效")
+        
+        if current_version < 15:
+            # 版本15升级：SimHash触发器同样只在内容值确实改变时清空指纹，
+            # 避免未改内容的UPDATE使指纹失效、启动时重新回填
+            self.cursor.execute("DROP TRIGGER IF EXISTS texts_simhash_au")
+            self.cursor.execute('''
+            CREATE TRIGGER texts_simhash_au
+            AFTER UPDATE OF content ON texts
+            WHEN new.content_hash IS old.content_hash AND new.content IS NOT old.content
+            BEGIN
+                UPDATE texts SET simhash = NULL WHERE id = new.id;
+            END
+            ''')
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (15)')
+            print("数据库升级到版本15：SimHash触发器只在内容实际改变时生效")
+        
+        if current_version < 16:
+            # 版本16升级：保存后需要更新派生索引（特征缓存等）的文本记录在队列表中，
+            # 由后台线程计算，保存时只写文本行
+            self.init_tables()
+            self.cursor.execute('INSERT OR IGNORE INTO db_version (version) VALUES (16)')
+            print("数据库升级到版本16：添加后台索引更新队列")
+        
         # 未来版本升级可以在此继续添加
-        # if current_version < 3:
-        #     self.upgrade_to_version_3()
+
+    def execute_script(self, script):
+        """逐条执行多条SQL语句
+
+        executescript会先提交当前事务，升级数据库时改用本方法，
+        使建表、建索引和触发器留在升级事务中。
+        """
+        statement = ''
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                self.cursor.execute(statement)
+                statement = ''
+        if statement.strip():
+            self.cursor.execute(statement)
 
     def init_tables(self):
         """初始化所有表结构（不含版本控制）"""
-        self.cursor.executescript('''
+        self.execute_script('''
         CREATE TABLE IF NOT EXISTS categories (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL UNIQUE,
@@ -226,20 +2016,13 @@ class TextManager(QMainWindow):
             word_count INTEGER DEFAULT 0,
             chinese_count INTEGER DEFAULT 0,
             english_count INTEGER DEFAULT 0,
+            title_pinyin TEXT,
+            title_initials TEXT,
+            content_hash TEXT,
+            simhash INTEGER,
             FOREIGN KEY (category_id) REFERENCES categories(id)
         );
         
-        CREATE TABLE IF NOT EXISTS texts_fts (
-            id INTEGER PRIMARY KEY,
-            title TEXT,
-            content TEXT
-        );
-        
-        CREATE VIRTUAL TABLE IF NOT EXISTS texts_fts USING fts5(
-            title, content, 
-            tokenize="porter unicode61"
-        );
-        
         CREATE TABLE IF NOT EXISTS tags (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL UNIQUE,
@@ -279,8 +2062,97 @@ class TextManager(QMainWindow):
             action TEXT NOT NULL UNIQUE,
             shortcut TEXT NOT NULL
         );
+        
+        CREATE TABLE IF NOT EXISTS text_features (
+            text_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            features TEXT NOT NULL,
+            FOREIGN KEY (text_id) REFERENCES texts(id)
+        );
+        
+        CREATE TABLE IF NOT EXISTS text_terms (
+            text_id INTEGER NOT NULL,
+            term TEXT NOT NULL,
+            tf_weight REAL NOT NULL DEFAULT 1.0,
+            PRIMARY KEY (text_id, term),
+            FOREIGN KEY (text_id) REFERENCES texts(id)
+        ) WITHOUT ROWID;
+        
+        CREATE TABLE IF NOT EXISTS term_doc_freq (
+            term TEXT PRIMARY KEY,
+            doc_freq INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        
+        CREATE TABLE IF NOT EXISTS text_vectors (
+            text_id INTEGER PRIMARY KEY,
+            norm REAL NOT NULL,
+            FOREIGN KEY (text_id) REFERENCES texts(id)
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_text_terms_term ON text_terms(term, tf_weight);
+        
+        CREATE TABLE IF NOT EXISTS text_minhash (
+            text_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            signature BLOB,
+            FOREIGN KEY (text_id) REFERENCES texts(id)
+        );
+        
+        CREATE TABLE IF NOT EXISTS minhash_bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            text_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, text_id)
+        ) WITHOUT ROWID;
+        
+        CREATE INDEX IF NOT EXISTS idx_minhash_bands_text ON minhash_bands(text_id);
+        
+        CREATE TABLE IF NOT EXISTS text_analysis (
+            text_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            readability REAL,
+            readability_level TEXT,
+            sentiment_score REAL,
+            sentiment TEXT,
+            keywords TEXT,
+            analyzed_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (text_id) REFERENCES texts(id)
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_text_analysis_readability ON text_analysis(readability);
+        CREATE INDEX IF NOT EXISTS idx_text_analysis_sentiment ON text_analysis(sentiment, sentiment_score);
+        
+        CREATE TABLE IF NOT EXISTS analysis_queue (
+            text_id INTEGER PRIMARY KEY
+        );
+        
+        CREATE TABLE IF NOT EXISTS index_queue (
+            text_id INTEGER PRIMARY KEY
+        );
+        ''')
+        
+        # 全文检索表的分词器由设置决定，单独创建
+        self.create_fts_table()
+        self.create_substring_index()
+
+    def create_indexes(self):
+        """创建热点查询使用的二级索引"""
+        self.execute_script('''
+        CREATE INDEX IF NOT EXISTS idx_texts_update_time ON texts(update_time);
+        CREATE INDEX IF NOT EXISTS idx_texts_category_update ON texts(category_id, update_time);
+        CREATE INDEX IF NOT EXISTS idx_texts_word_count ON texts(word_count);
+        CREATE INDEX IF NOT EXISTS idx_text_tags_tag ON text_tags(tag_id);
+        CREATE INDEX IF NOT EXISTS idx_recycle_bin_deleted_time ON recycle_bin(deleted_time);
+        CREATE INDEX IF NOT EXISTS idx_search_history_time ON search_history(search_time);
         ''')
 
+    def set_setting(self, key, value):
+        """保存设置项"""
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            (key, str(value))
+        )
+
     def init_default_shortcuts(self):
         """初始化默认快捷键"""
         default_shortcuts = [
@@ -524,11 +2396,35 @@ class TextManager(QMainWindow):
         self.word_count_layout.addWidget(self.word_count_max)
         self.advanced_search_layout.addLayout(self.word_count_layout)
         
+        # 可读性和情感（使用批量分析的结果）
+        self.analysis_filter_layout = QHBoxLayout()
+        self.readability_min = QSpinBox()
+        self.readability_min.setRange(0, 100)
+        self.readability_max = QSpinBox()
+        self.readability_max.setRange(0, 100)
+        self.readability_max.setValue(100)
+        self.sentiment_filter = QComboBox()
+        self.sentiment_filter.addItems(["全部情感", "积极", "中性", "消极"])
+        self.analysis_filter_layout.addWidget(QLabel("可读性:"))
+        self.analysis_filter_layout.addWidget(self.readability_min)
+        self.analysis_filter_layout.addWidget(QLabel("-"))
+        self.analysis_filter_layout.addWidget(self.readability_max)
+        self.analysis_filter_layout.addWidget(self.sentiment_filter)
+        self.advanced_search_layout.addLayout(self.analysis_filter_layout)
+        
         # 搜索模式
         self.search_mode = QComboBox()
         self.search_mode.addItems(["普通搜索", "全文检索"])
         self.advanced_search_layout.addWidget(self.search_mode)
         
+        # 全文检索时按BM25相关度排序并显示命中摘要
+        self.rank_by_relevance = QCheckBox("按相关度排序")
+        self.rank_by_relevance.setEnabled(False)
+        self.search_mode.currentTextChanged.connect(
+            lambda mode: self.rank_by_relevance.setEnabled(mode == "全文检索"))
+        self.rank_by_relevance.toggled.connect(self.search_texts)
+        self.advanced_search_layout.addWidget(self.rank_by_relevance)
+        
         self.advanced_search_group.setLayout(self.advanced_search_layout)
         self.advanced_search_group.setCheckable(True)
         self.advanced_search_group.setChecked(False)
@@ -552,12 +2448,34 @@ class TextManager(QMainWindow):
         # 搜索区域
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText('搜索标题/内容/拼音首字母...')
-        self.search_input.textChanged.connect(self.search_texts)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        self.search_input.returnPressed.connect(self.commit_search)
         self.left_layout.addWidget(self.search_input)
         
-        # 文本列表
-        self.text_list = QListWidget()
-        self.text_list.itemClicked.connect(self.load_text)
+        # 输入防抖：停止输入后再搜索；停顿较久或按回车才记录搜索历史
+        self.search_debounce_timer = QTimer(self)
+        self.search_debounce_timer.setSingleShot(True)
+        self.search_debounce_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_debounce_timer.timeout.connect(self.search_texts)
+        
+        self.search_history_timer = QTimer(self)
+        self.search_history_timer.setSingleShot(True)
+        self.search_history_timer.setInterval(self.SEARCH_HISTORY_PAUSE_MS)
+        self.search_history_timer.timeout.connect(
+            lambda: self.save_search_history(self.search_input.text().strip())
+        )
+        
+        # 文本列表（按需分页加载的模型/视图）
+        self.text_list_model = TextListModel(self.fetch_list_rows, self)
+        self.text_list = QListView()
+        self.text_list.setModel(self.text_list_model)
+        self.text_list.setItemDelegate(TextListDelegate(
+            lambda color_id: self.generate_harmonious_color(color_id, saturation=0.4, value=0.92),
+            self.text_list
+        ))
+        self.text_list.setUniformItemSizes(True)
+        self.text_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.text_list.clicked.connect(self.load_text)
         self.left_layout.addWidget(self.text_list)
         
         # 批量操作按钮（使用特殊操作色）
@@ -819,6 +2737,9 @@ class TextManager(QMainWindow):
         
         dialog.setLayout(layout)
 
+        # 对话框关闭时取消仍在执行的分析
+        dialog.finished.connect(self.cancel_text_analysis)
+        
         # 创建后立即执行分析
         self.analyze_text(dialog, content)
         
@@ -830,316 +2751,152 @@ class TextManager(QMainWindow):
 
 
     def analyze_text(self, dialog, content):
-        """执行文本分析"""
+        """在后台线程执行文本分析，各阶段结果到达后更新对应选项卡"""
         print("[DEBUG] 开始文本分析")
-    
-        # 初始化进度条
+        self.cancel_text_analysis()
+        
+        # 初始化进度条和统计信息文本框
         self.reading_progress.setValue(5)
-        QApplication.processEvents()  # 强制更新UI
-    
-        try:
-            # 1. 初始化统计信息文本框
-            self.stats_info.clear()  # 先清空内容
-            print("[DEBUG] 初始化统计信息文本框")
-            self.reading_progress.setValue(10)
-            QApplication.processEvents()
-
-            # 2. 基本统计
-            self.update_basic_stats(content)
+        self.analysis_progress.setValue(5)
+        self.stats_info.clear()
+        self.analyzing_label.setText("正在分析文本，请稍候...")
+        self.analyzing_label.setVisible(True)
+        
+        self.analysis_generation += 1
+        self.analysis_dialog = dialog
+        worker = AnalysisWorker(self, self.analysis_generation, content, self.current_id, self)
+        worker.stage_ready.connect(self.on_analysis_stage)
+        worker.progress_changed.connect(self.on_analysis_progress)
+        worker.analysis_finished.connect(self.on_analysis_finished)
+        worker.analysis_failed.connect(self.on_analysis_failed)
+        worker.finished.connect(worker.deleteLater)
+        self.analysis_worker = worker
+        worker.start()
+
+    def cancel_text_analysis(self):
+        """取消正在执行的后台分析（分析对话框关闭时调用），已发出的过期结果会被丢弃"""
+        if self.analysis_worker is not None:
+            self.analysis_worker.cancel()
+            self.analysis_worker = None
+            self.analysis_generation += 1
+            print("[DEBUG] 已取消文本分析")
+
+    def on_analysis_stage(self, generation, stage, result):
+        """接收后台分析一个阶段的结果并更新界面"""
+        if generation != self.analysis_generation:
+            return
+        
+        if stage == 'stats':
+            self.update_basic_stats(result)
+            self.paragraph_stats.setText(f"段落统计: {result['paragraphs']}段")
             print("[DEBUG] 基本统计信息更新")
-            self.reading_progress.setValue(20)
-            QApplication.processEvents()
-            
-            # 3. 关键词提取
-            keywords = self.extract_keywords(content)
-            self.keywords_label.setText(f"关键词: {', '.join(keywords)}")
-            print("[DEBUG] 关键词提取:", keywords)
-            self.reading_progress.setValue(35)
-            QApplication.processEvents()
-            
-            # 4. 查找相似文本
-            self.find_similar_texts(content)
-            self.reading_progress.setValue(50)
-            QApplication.processEvents()
-            
-            # 5. 新增段落统计
-            paragraph_count = len([p for p in content.split('\n') if p.strip()])
-            self.paragraph_stats.setText(f"段落统计: {paragraph_count}段")
-            print("[DEBUG] 段落统计:", paragraph_count)
-            self.reading_progress.setValue(60)
-            QApplication.processEvents()
-            
-            # 6. 完整版可读性评分计算 (Flesch Reading Ease + 中文适配)
-            # 英文部分计算 (Flesch Reading Ease)
-            english_words = re.findall(r'\b[a-zA-Z]+\b', content)
-            english_sentences = re.findall(r'[.!?]+', content)
-            
-            flesch_score = 0
-            if english_words and english_sentences:
-                avg_words_per_sentence = len(english_words) / len(english_sentences)
-                avg_syllables_per_word = sum(len(re.findall(r'[aeiouyAEIOUY]+', word)) for word in english_words) / len(english_words)
-                flesch_score = 206.835 - (1.015 * avg_words_per_sentence) - (84.6 * avg_syllables_per_word)
-            
-            # 中文部分计算 (基于平均句长和词汇难度)
-            chinese_chars = re.findall(r'[\u4e00-\u9fff]', content)
-            chinese_sentences = re.split(r'[。！？；;]+', content)
-            chinese_sentences = [s for s in chinese_sentences if s.strip()]
-            
-            chinese_score = 0
-            if chinese_chars and chinese_sentences:
-                avg_chars_per_sentence = len(chinese_chars) / len(chinese_sentences)
-                # 中文可读性经验公式 (基于句长和常用词比例)
-                common_word_ratio = len(re.findall(r'[的了是在有这我你他我们他们]', content)) / len(chinese_chars)
-                chinese_score = 100 - (avg_chars_per_sentence * 0.5) + (common_word_ratio * 20)
-            
-            # 综合评分 (根据中英文内容比例)
-            total_chars = len(content)
-            if total_chars > 0:
-                english_ratio = len(''.join(english_words)) / total_chars
-                chinese_ratio = len(''.join(chinese_chars)) / total_chars
-                readability = (flesch_score * english_ratio + chinese_score * chinese_ratio)
-                readability = max(0, min(100, readability))  # 限制在0-100范围内
-                
-                # 评分描述
-                if readability >= 90:
-                    level = "非常容易"
-                    description = (
-                        "文本极其易读，适合所有读者，包括小学生。\n"
-                        "典型文本：儿童读物、简单对话、基础说明文。\n"
-                        "平均句子长度：8个词或更少\n"
-                        "平均每词音节数：1.0或更少"
-                    )
-                elif readability >= 80:
-                    level = "容易"
-                    description = (
-                        "文本非常易读，适合普通大众阅读。\n"
-                        "典型文本：流行小说、报纸文章、博客文章。\n"
-                        "平均句子长度：8-12个词\n"
-                        "平均每词音节数：1.0-1.2"
-                    )
-                elif readability >= 70:
-                    level = "较容易" 
-                    description = (
-                        "文本比较容易理解，适合13-15岁学生。\n"
-                        "典型文本：青少年读物、杂志文章。\n"
-                        "平均句子长度：12-15个词\n"
-                        "平均每词音节数：1.2-1.4"
-                    )
-                elif readability >= 60:
-                    level = "标准"
-                    description = (
-                        "文本难度适中，适合高中毕业生阅读。\n"
-                        "典型文本：普通报刊、大众非小说类书籍。\n"
-                        "平均句子长度：15-17个词\n"
-                        "平均每词音节数：1.4-1.6"
-                    )
-                elif readability >= 50:
-                    level = "较难"
-                    description = (
-                        "文本有一定难度，适合大学生阅读。\n"
-                        "典型文本：学术论文、专业杂志、技术文档。\n"
-                        "平均句子长度：17-20个词\n"
-                        "平均每词音节数：1.6-1.8"
-                    )
-                elif readability >= 30:
-                    level = "困难"
-                    description = (
-                        "文本难度较高，需要专业知识或高等教育背景。\n"
-                        "典型文本：法律文件、学术论文、专业文献。\n"
-                        "平均句子长度：20-25个词\n"
-                        "平均每词音节数：1.8-2.0"
-                    )
-                else:
-                    level = "非常困难"
-                    description = (
-                        "文本极其难懂，需要专业领域知识。\n"
-                        "典型文本：哲学著作、高级技术规范、古典文学。\n"
-                        "平均句子长度：25个词以上\n"
-                        "平均每词音节数：2.0以上"
-                    )
-
-                
-                self.readability_score.setText(
-                    f"可读性评分: {readability:.1f}/100 ({level})\n"
-                    f"英文部分: {flesch_score:.1f} 中文部分: {chinese_score:.1f}"
-                )
-            else:
-                self.readability_score.setText("可读性评分: 无有效内容")
-            
-            print(f"[DEBUG] 可读性评分: {readability:.1f} (英文:{flesch_score:.1f} 中文:{chinese_score:.1f})")
-            self.reading_progress.setValue(10)
-            QApplication.processEvents()
-            
-            # 7. 完整版情感分析 (支持中英文混合+程度分析)
-            # 扩展的情感词典 (包含程度词和否定词处理)
-            sentiment_dict = {
-                # 中文情感词 (带权重)
-                'positive': {
-                    '好': 1, '优秀': 2, '成功': 2, '高兴': 1.5, '满意': 1.5,
-                    '喜欢': 1, '爱': 2, '开心': 1.5, '幸福': 2, '棒': 1,
-                    '完美': 2, '精彩': 1.5, '美丽': 1, '聪明': 1, '强大': 1
-                },
-                'negative': {
-                    '坏': 1, '差': 1, '失败': 2, '伤心': 1.5, '不满': 1.5,
-                    '讨厌': 1.5, '恨': 2, '痛苦': 2, '糟糕': 1.5, '愚蠢': 1.5,
-                    '难看': 1, '弱': 1, '困难': 1, '麻烦': 1, '失望': 1.5
-                },
-                # 英文情感词
-                'en_positive': {
-                    'good': 1, 'excellent': 2, 'success': 2, 'happy': 1.5, 'satisfied': 1.5,
-                    'like': 1, 'love': 2, 'joy': 1.5, 'great': 1.5, 'perfect': 2
-                },
-                'en_negative': {
-                    'bad': 1, 'poor': 1, 'fail': 2, 'sad': 1.5, 'angry': 1.5,
-                    'hate': 2, 'pain': 2, 'terrible': 1.5, 'stupid': 1.5, 'ugly': 1
-                },
-                # 程度副词
-                'intensifiers': {
-                    '非常': 1.5, '特别': 1.5, '极其': 2, '十分': 1.3, '相当': 1.2,
-                    '有点': 0.8, '稍微': 0.7, '略微': 0.7, '过于': 1.3,
-                    'very': 1.5, 'extremely': 2, 'highly': 1.5, 'quite': 1.2
-                },
-                # 否定词
-                'negators': ['不', '没', '无', '非', '未', '不是', '不要', 'never', 'not', "n't"]
-            }
-
-            # 初始化计数器
-            positive_score = 0
-            negative_score = 0
-            sentiment_words = []
-            
-            # 预处理文本
-            sentences = re.split(r'[。！？；;.!?]+', content)
-            
-            for sentence in sentences:
-                if not sentence.strip():
-                    continue
-                
-                # 检查否定词
-                has_negator = any(neg in sentence for neg in sentiment_dict['negators'])
-                negator_factor = -1 if has_negator else 1
-                
-                # 检查程度词
-                intensifier = 1
-                for word, factor in sentiment_dict['intensifiers'].items():
-                    if word in sentence:
-                        intensifier *= factor
-                        break
-                
-                # 中文情感词分析
-                for word, weight in sentiment_dict['positive'].items():
-                    if word in sentence:
-                        score = weight * intensifier * negator_factor
-                        positive_score += max(0, score)
-                        negative_score += max(0, -score)
-                        sentiment_words.append((word, score))
-                
-                for word, weight in sentiment_dict['negative'].items():
-                    if word in sentence:
-                        score = weight * intensifier * negator_factor
-                        negative_score += max(0, score)
-                        positive_score += max(0, -score)
-                        sentiment_words.append((word, score))
-                
-                # 英文情感词分析
-                for word, weight in sentiment_dict['en_positive'].items():
-                    if re.search(r'\b' + word + r'\b', sentence, re.IGNORECASE):
-                        score = weight * intensifier * negator_factor
-                        positive_score += max(0, score)
-                        negative_score += max(0, -score)
-                        sentiment_words.append((word, score))
-                
-                for word, weight in sentiment_dict['en_negative'].items():
-                    if re.search(r'\b' + word + r'\b', sentence, re.IGNORECASE):
-                        score = weight * intensifier * negator_factor
-                        negative_score += max(0, score)
-                        positive_score += max(0, -score)
-                        sentiment_words.append((word, score))
-            
-            # 计算情感倾向
-            total_score = positive_score - negative_score
-            abs_total = abs(total_score)
-            
-            if abs_total < 1:
-                sentiment = "中性"
-                intensity = "一般"
-            else:
-                if total_score > 0:
-                    sentiment = "积极"
-                    intensity = "强烈" if abs_total > 3 else "中等" if abs_total > 1.5 else "轻微"
-                else:
-                    sentiment = "消极"
-                    intensity = "强烈" if abs_total > 3 else "中等" if abs_total > 1.5 else "轻微"
-            
-            # 生成详细报告
-            top_words = sorted(sentiment_words, key=lambda x: abs(x[1]), reverse=True)[:5]
-            word_details = "，".join(f"{word}({score:.1f})" for word, score in top_words)
-            
-            self.sentiment_label.setText(
-                f"情感倾向: {sentiment}-{intensity}\n"
-                f"正面强度: {positive_score:.1f} 负面强度: {negative_score:.1f}\n"
-                f"关键情感词: {word_details}"
-            )
-            
-            print(f"[DEBUG] 情感分析: {sentiment}-{intensity} (正:{positive_score:.1f} 负:{negative_score:.1f})")
-            print(f"[DEBUG] 情感词: {top_words}")
-            self.reading_progress.setValue(90)
-            QApplication.processEvents()
-
-            # 增强版特征分析
-            self.analyze_text_features(content)
-            self.reading_progress.setValue(100)
-
-            # 更新统计信息文本框 - 使用HTML格式
-            stats_html = (
-                "<h3>详细统计信息:</h3>"
-                "<ul>"
-                "<li>总字符数: {}</li>"
-                "<li>中文字符: {}</li>"
-                "<li>英文单词: {}</li>"
-                "<li>数字数量: {}</li>"
-                "<li>标点符号: {}</li>"
-                "<li>空格数量: {}</li>"
-                "<li>换行数量: {}</li>"
-                "</ul>"
-            ).format(
-                len(content),
-                len(re.findall(r'[\u4e00-\u9fff]', content)),
-                len(re.findall(r'\b[a-zA-Z]+\b', content)),
-                len(re.findall(r'\d+', content)),
-                len(re.findall(r'[,.!?;:，。！？；：、]', content)),
-                content.count(' '),
-                content.count('\n')
-            )
-            self.stats_info.setHtml(stats_html)
-
-            # 分析完成后隐藏"正在分析"标签
-            if hasattr(self, 'analyzing_label'):
-                self.analyzing_label.setVisible(False)
-            
-            # 确保所有分析结果可见
-            for i in range(3):  # 确保3个选项卡都可见
-                dialog.findChild(QTabWidget).setTabVisible(i, True)
-
-            print("[DEBUG] 文本分析完成")
-        except Exception as e:
-            print("[ERROR] 文本分析失败:", str(e))
-            self.reading_progress.setValue(0)
-            QMessageBox.critical(dialog, "错误", f"分析失败: {str(e)}")
-
-
+        elif stage == 'keywords':
+            self.keywords_label.setText(f"关键词: {', '.join(result)}")
+            print("[DEBUG] 关键词提取:", result)
+        elif stage == 'similar':
+            similarities, current_features = result
+            self.show_similar_texts(similarities, current_features)
+        elif stage == 'readability':
+            self.show_readability(result)
+        elif stage == 'sentiment':
+            self.show_sentiment(result)
+        elif stage == 'features':
+            self.analyze_text_features(result)
+
+    def on_analysis_progress(self, generation, value):
+        """后台分析进度"""
+        if generation == self.analysis_generation:
+            self.reading_progress.setValue(value)
+            self.analysis_progress.setValue(value)
+
+    def on_analysis_finished(self, generation):
+        """后台分析完成"""
+        if generation != self.analysis_generation:
+            return
+        self.analysis_worker = None
+        
+        # 分析完成后隐藏"正在分析"标签
+        self.analyzing_label.setVisible(False)
+        
+        # 确保所有分析结果可见
+        for i in range(3):  # 确保3个选项卡都可见
+            self.analysis_dialog.findChild(QTabWidget).setTabVisible(i, True)
+        
+        print("[DEBUG] 文本分析完成")
 
+    def on_analysis_failed(self, generation, message):
+        """后台分析出错"""
+        if generation != self.analysis_generation:
+            return
+        self.analysis_worker = None
+        print("[ERROR] 文本分析失败:", message)
+        self.reading_progress.setValue(0)
+        self.analyzing_label.setText(f"分析失败: {message}")
+        QMessageBox.critical(self.analysis_dialog, "错误", f"分析失败: {message}")
+
+    def compute_basic_stats(self, content):
+        """计算基本统计数据（不访问界面，可在后台线程调用）"""
+        stats = dict(self.classify_text(content))
+        stats['others'] = (stats['total'] - stats['chinese_chars'] - stats['english_words']
+                           - stats['numbers'] - stats['punctuation'] - stats['spaces'])
+        return stats
+
+    def show_readability(self, result):
+        """显示可读性评分"""
+        if result is None:
+            self.readability_score.setText("可读性评分: 无有效内容")
+            return
+        
+        self.readability_score.setText(
+            f"可读性评分: {result['readability']:.1f}/100 ({result['level']})\n"
+            f"英文部分: {result['flesch_score']:.1f} 中文部分: {result['chinese_score']:.1f}"
+        )
+        print(f"[DEBUG] 可读性评分: {result['readability']:.1f} "
+              f"(英文:{result['flesch_score']:.1f} 中文:{result['chinese_score']:.1f})")
+
+    def load_sentiment_lexicons(self):
+        """工具菜单：加载外部情感词典（替换之前加载的外部词典）"""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择情感词典文件", "", "词典文件 (*.txt *.tsv);;所有文件 (*)")
+        if not paths:
+            return
+        
+        try:
+            count = sum(len(self.load_lexicon_file(path)) for path in paths)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"加载情感词典失败: {str(e)}")
+            return
+        
+        self.set_setting('sentiment_lexicons', json.dumps(paths, ensure_ascii=False))
+        self.conn.commit()
+        self.sentiment_matcher = None
+        self.show_status_message(f"已加载{len(paths)}个情感词典，共{count}个词条", 5000)
 
-    def update_basic_stats(self, content):
-        """更新基本统计图表"""
-        # 计算统计数据
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', content))
-        english_words = len(re.findall(r'\b[a-zA-Z]+\b', content))
-        numbers = len(re.findall(r'\d+', content))
-        punctuation = len(re.findall(r'[,.!?;:，。！？；：、]', content))
-        spaces = content.count(' ')
-        others = len(content) - chinese_chars - english_words - numbers - punctuation - spaces
+    def reset_sentiment_lexicons(self):
+        """工具菜单：只使用内置情感词典"""
+        self.set_setting('sentiment_lexicons', '[]')
+        self.conn.commit()
+        self.sentiment_matcher = None
+        self.show_status_message("已恢复为内置情感词典", 3000)
+
+    def show_sentiment(self, result):
+        """显示情感分析结果"""
+        # 生成详细报告
+        top_words = result['top_words']
+        word_details = "，".join(f"{word}({score:.1f})" for word, score in top_words)
+        
+        self.sentiment_label.setText(
+            f"情感倾向: {result['sentiment']}-{result['intensity']}\n"
+            f"正面强度: {result['positive_score']:.1f} 负面强度: {result['negative_score']:.1f}\n"
+            f"关键情感词: {word_details}"
+        )
         
+        print(f"[DEBUG] 情感分析: {result['sentiment']}-{result['intensity']} "
+              f"(正:{result['positive_score']:.1f} 负:{result['negative_score']:.1f})")
+        print(f"[DEBUG] 情感词: {top_words}")
+
+    def update_basic_stats(self, stats):
+        """更新基本统计图表和详细统计信息"""
         # 创建图表
         chart = QChart()
         chart.setTitle("文本统计")
@@ -1147,12 +2904,12 @@ class TextManager(QMainWindow):
         
         # 创建饼图系列
         series = QPieSeries()
-        series.append("中文字符", chinese_chars)
-        series.append("英文单词", english_words)
-        series.append("数字", numbers)
-        series.append("标点符号", punctuation)
-        series.append("空格", spaces)
-        series.append("其他字符", others)
+        series.append("中文字符", stats['chinese_chars'])
+        series.append("英文单词", stats['english_words'])
+        series.append("数字", stats['numbers'])
+        series.append("标点符号", stats['punctuation'])
+        series.append("空格", stats['spaces'])
+        series.append("其他字符", stats['others'])
         
         # 设置切片标签可见
         for slice in series.slices():
@@ -1166,148 +2923,383 @@ class TextManager(QMainWindow):
         
         self.stats_chart_view.setChart(chart)
         self.stats_chart_view.setRenderHint(QPainter.Antialiasing)
+        
+        # 更新统计信息文本框 - 使用HTML格式
+        stats_html = (
+            "<h3>详细统计信息:</h3>"
+            "<ul>"
+            "<li>总字符数: {}</li>"
+            "<li>中文字符: {}</li>"
+            "<li>英文单词: {}</li>"
+            "<li>数字数量: {}</li>"
+            "<li>标点符号: {}</li>"
+            "<li>空格数量: {}</li>"
+            "<li>换行数量: {}</li>"
+            "</ul>"
+        ).format(
+            stats['total'],
+            stats['chinese_chars'],
+            stats['english_words'],
+            stats['numbers'],
+            stats['punctuation'],
+            stats['spaces'],
+            stats['newlines']
+        )
+        self.stats_info.setHtml(stats_html)
 
 
-    def extract_keywords(self, content, top_n=10, with_weight=False):
-        """完整版关键词提取(使用jieba分词)
-        
-        参数:
-            content: 要提取关键词的文本内容
-            top_n: 返回关键词数量
-            with_weight: 是否返回关键词权重
-            
-        返回:
-            关键词列表(带权重时为元组列表)
+    def start_jieba_warmup(self):
+        """窗口显示后在后台预热jieba"""
+        if self.jieba_warmup_started:
+            return
+        self.jieba_warmup_started = True
+        worker = JiebaWarmupWorker(self, self)
+        worker.warmup_finished.connect(self.on_jieba_warmup_finished)
+        worker.finished.connect(worker.deleteLater)
+        worker.start()
+
+    def on_jieba_warmup_finished(self, available, elapsed):
+        """jieba预热完成"""
+        if available:
+            print(f"[jieba] 词典加载完成，耗时{elapsed:.2f}秒")
+        else:
+            print("[警告] 未安装jieba库，使用简化版关键词提取")
+            self.show_status_message("未安装jieba库，关键词提取和分词使用简化版", 5000)
+
+    def current_content_hash(self, text_id, cursor=None):
+        """读取文本当前的内容哈希，文本已删除时返回None（后台线程传入独立连接的游标）
+
+        外部修改清空了content_hash的文本按当前内容补算（调用方负责写回）。
+        返回 (内容哈希, 是否需要写回)
         """
+        cursor = cursor or self.cursor
+        cursor.execute('''
+        SELECT title, content, is_markdown, is_html, content_hash FROM texts WHERE id = ?
+        ''', (text_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None, False
+        title, content, is_markdown, is_html, content_hash = row
+        if content_hash is not None:
+            return content_hash, False
+        return self.compute_content_hash(title, content, is_markdown, is_html), True
+
+    def enqueue_index_update(self, text_id):
+        """把文本加入后台索引更新队列（不提交事务，提交后调用start_index_update）"""
+        self.cursor.execute("INSERT OR IGNORE INTO index_queue (text_id) VALUES (?)", (text_id,))
+
+    def start_index_update(self):
+        """启动后台索引更新线程；线程正在运行时等它结束后再更新一轮"""
+        if self.index_update_worker is not None:
+            self.index_update_pending = True
+            return
+        
+        self.cursor.execute("SELECT EXISTS (SELECT 1 FROM index_queue)")
+        if not self.cursor.fetchone()[0]:
+            return
+        
+        worker = IndexUpdateWorker(self, self)
+        worker.progress_changed.connect(self.on_index_update_progress)
+        worker.job_failed.connect(self.on_index_update_failed)
+        worker.finished.connect(self.on_index_update_stopped)
+        worker.finished.connect(worker.deleteLater)
+        self.index_update_worker = worker
+        self.index_update_pending = False
+        worker.start()
+
+    def on_index_update_progress(self, done, total):
+        """后台索引更新进度（文本较多时才在状态栏显示）"""
+        if total < self.INDEX_PROGRESS_MIN:
+            return
+        if done < total:
+            self.show_status_message(f"正在后台更新索引: {done}/{total}")
+        else:
+            self.show_status_message(f"索引更新完成，共{total}篇文本", 5000)
+
+    def on_index_update_failed(self, message):
+        """后台索引更新出错（剩余文本留在队列中，下次启动后继续）"""
+        print("[ERROR] 后台索引更新失败:", message)
+        self.index_update_pending = False
+        self.show_status_message(f"后台索引更新失败: {message}", 5000)
+
+    def on_index_update_stopped(self):
+        """后台索引更新线程已退出，期间又有文本入队时再更新一轮"""
+        self.index_update_worker = None
+        if self.index_update_pending:
+            self.start_index_update()
+
+    def load_jieba_user_dict(self):
+        """工具菜单：选择jieba用户词典（每行：词语 词频(可省略) 词性(可省略)）"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "选择jieba用户词典", "", "词典文件 (*.txt);;所有文件 (*)")
+        if not path:
+            return
+        
         try:
-            import jieba
-            import jieba.analyse
-            
-            # 初始化jieba (第一次使用时加载词典)
-            if not hasattr(jieba, 'dt'):
-                jieba.initialize()
-            
-            # 自定义停用词列表 (可根据需要扩展)
-            stop_words = {
-                '的', '了', '和', '是', '在', '我', '有', '这', '那', '你', '他', '她', '它',
-                '我们', '你们', '他们', '这个', '那个', '要', '也', '都', '会', '可以', '可能',
-                '就是', '这样', '这些', '那些', '一些', '一点', '一种', '一样', '一般', '一定',
-                '非常', '很多', '什么', '为什么', '怎么', '如何', '因为', '所以', '但是', '虽然',
-                '如果', '然后', '而且', '或者', '还是', '不是', '没有', '不要', '不能', '需要',
-                '应该', '可能', '可以', '必须', '只是', '真是', '真是', '真是', '真是', '真是'
-            }
-            
-            # 1. 计算TF-IDF (使用jieba的TF-IDF接口)
-            keywords = jieba.analyse.extract_tags(
-                content,
-                topK=top_n*2,  # 先获取更多候选词
-                withWeight=True,
-                allowPOS=('n', 'vn', 'v', 'a')  # 只保留名词、动名词、动词、形容词
-            )
-            
-            # 2. 过滤停用词和单字词
-            filtered_keywords = [
-                (word, weight) for word, weight in keywords 
-                if word not in stop_words and len(word) > 1
-            ][:top_n]
-            
-            # 3. 计算文档频率 (从数据库获取)
-            doc_freq = {}
-            total_docs = 0
-            self.cursor.execute("SELECT COUNT(*) FROM texts")
-            total_docs = self.cursor.fetchone()[0]
-            
-            if total_docs > 0:
-                for word, _ in filtered_keywords:
-                    self.cursor.execute(
-                        "SELECT COUNT(*) FROM texts WHERE content LIKE ?",
-                        (f'%{word}%',)
-                    )
-                    doc_freq[word] = self.cursor.fetchone()[0]
-            
-            # 4. 调整权重 (结合全局文档频率)
-            final_keywords = []
-            for word, weight in filtered_keywords:
-                # 计算逆文档频率 (IDF)
-                df = doc_freq.get(word, 1)
-                idf = math.log((total_docs + 1) / (df + 1)) + 1  # 平滑处理
-                
-                # 调整后的权重 = TF * IDF
-                adjusted_weight = weight * idf
-                
-                final_keywords.append((word, adjusted_weight))
-            
-            # 按调整后的权重重新排序
-            final_keywords.sort(key=lambda x: x[1], reverse=True)
-            
-            if with_weight:
-                return final_keywords[:top_n]
-            else:
-                return [word for word, weight in final_keywords[:top_n]]
-                
-        except ImportError:
-            # 回退到简单实现 (如果没有安装jieba)
-            QMessageBox.warning(self, "警告", "未安装jieba库，使用简化版关键词提取")
-            return self._fallback_extract_keywords(content, top_n)
-        except Exception as e:
-            print(f"关键词提取错误: {str(e)}")
-            return []
+            with open(path, 'r', encoding='utf-8') as f:
+                count = sum(1 for line in f if line.strip())
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.warning(self, "错误", f"读取用户词典失败: {str(e)}")
+            return
+        
+        replaced = bool(self.jieba_loaded_user_dict)
+        self.set_setting('jieba_user_dict', path)
+        self.conn.commit()
+        self.jieba_user_dict = path
+        if self.load_jieba() is None:
+            QMessageBox.warning(self, "警告", "未安装jieba库，用户词典将在安装后生效")
+            return
+        
+        message = f"已加载jieba用户词典，共{count}个词条"
+        if replaced:
+            message += "（原用户词典中的词条重启后移除）"
+        self.show_status_message(message, 5000)
+
+    def clear_jieba_user_dict(self):
+        """工具菜单：不再使用jieba用户词典（重启后生效）"""
+        self.set_setting('jieba_user_dict', '')
+        self.conn.commit()
+        self.jieba_user_dict = ''
+        self.show_status_message("已取消jieba用户词典，重启后生效", 3000)
+
+    def extract_terms(self, content):
+        """把文本切分为词项（与关键词提取相同的jieba分词），返回 {词项: 出现次数}"""
+        jieba = self.load_jieba()
+        if jieba is not None:
+            words = jieba.cut(content or '')
+        else:
+            words = re.findall(r'[\u4e00-\u9fa5]{2,}|[A-Za-z0-9_]{2,}', content or '')
+        return Counter(word for word in words if len(word) > 1 and re.search(r'\w', word))
+
+    def term_tf_weight(self, count):
+        """对数词频权重"""
+        return 1 + math.log(count)
+
+    def term_idf(self, doc_freq, total_docs):
+        """平滑的逆文档频率（与关键词提取的IDF公式一致）"""
+        return math.log((total_docs + 1) / (doc_freq + 1)) + 1
 
-    def _fallback_extract_keywords(self, content, top_n):
-        """jieba不可用时的回退实现"""
-        words = re.findall(r'[\u4e00-\u9fa5]{2,}', content)
+    def compute_text_terms(self, content):
+        """切分文本并计算各词项的对数词频权重，返回 {词项: 权重}"""
+        counts = self.extract_terms(content) if content else {}
+        return {term: self.term_tf_weight(count) for term, count in counts.items()}
+
+    def update_text_terms(self, text_id, content, cursor=None):
+        """重新切分文本并增量更新其词项索引
+
+        删除文本时传入空内容即可移除其全部词项（不分词，可在界面线程调用）。
+        """
+        self.apply_text_terms(text_id, self.compute_text_terms(content), cursor)
+
+    def apply_text_terms(self, text_id, new_terms, cursor=None):
+        """比较文本新旧词项，增量更新text_terms、term_doc_freq和文本向量模长"""
+        cursor = cursor or self.cursor
+        cursor.execute("SELECT term, tf_weight FROM text_terms WHERE text_id = ?", (text_id,))
+        old_terms = dict(cursor.fetchall())
+        
+        added = [(term,) for term in new_terms if term not in old_terms]
+        removed = [(term,) for term in old_terms if term not in new_terms]
+        changed = [
+            (weight, text_id, term) for term, weight in new_terms.items()
+            if term in old_terms and old_terms[term] != weight
+        ]
         
-        # 简单停用词过滤
-        stop_words = ['的', '了', '和', '是', '在', '我', '有', '这', '那', '你']
-        words = [word for word in words if word not in stop_words]
+        if removed:
+            cursor.executemany(
+                "DELETE FROM text_terms WHERE text_id = ? AND term = ?",
+                [(text_id, term) for term, in removed]
+            )
+            cursor.executemany(
+                "UPDATE term_doc_freq SET doc_freq = doc_freq - 1 WHERE term = ?", removed)
+            cursor.executemany(
+                "DELETE FROM term_doc_freq WHERE term = ? AND doc_freq <= 0", removed)
+        
+        if changed:
+            cursor.executemany(
+                "UPDATE text_terms SET tf_weight = ? WHERE text_id = ? AND term = ?", changed)
+        
+        if added:
+            cursor.executemany(
+                "INSERT INTO text_terms (text_id, term, tf_weight) VALUES (?, ?, ?)",
+                [(text_id, term, new_terms[term]) for term, in added]
+            )
+            cursor.executemany('''
+            INSERT INTO term_doc_freq (term, doc_freq) VALUES (?, 1)
+            ON CONFLICT(term) DO UPDATE SET doc_freq = doc_freq + 1
+            ''', added)
+        
+        # 更新TF-IDF向量模长（其他文本的模长随文档频率缓慢漂移，批量更新后由refresh_term_norms校正）
+        if new_terms:
+            doc_freq, total_docs = self.get_doc_freqs(new_terms, cursor)
+            norm = math.sqrt(sum(
+                (weight * self.term_idf(doc_freq.get(term, 0), total_docs)) ** 2
+                for term, weight in new_terms.items()
+            ))
+            cursor.execute(
+                "INSERT OR REPLACE INTO text_vectors (text_id, norm) VALUES (?, ?)", (text_id, norm))
+        else:
+            cursor.execute("DELETE FROM text_vectors WHERE text_id = ?", (text_id,))
+
+    def reset_term_index(self):
+        """清空词项索引，并把全部文本加入后台索引更新队列重新切分（不提交事务）
+
+        返回排队的文本数
+        """
+        self.cursor.execute("DELETE FROM text_terms")
+        self.cursor.execute("DELETE FROM term_doc_freq")
+        self.cursor.execute("DELETE FROM text_vectors")
+        self.cursor.execute("INSERT OR IGNORE INTO index_queue (text_id) SELECT id FROM texts")
+        self.cursor.execute("SELECT COUNT(*) FROM index_queue")
+        return self.cursor.fetchone()[0]
+
+    def refresh_term_norms(self, cursor=None):
+        """按当前文档频率重新计算全部文本的TF-IDF向量模长（不提交事务）"""
+        cursor = cursor or self.cursor
+        cursor.execute("SELECT COUNT(*) FROM texts")
+        total_docs = cursor.fetchone()[0]
+        
+        norms = {}
+        for text_id, weight, doc_freq in cursor.connection.execute('''
+            SELECT tt.text_id, tt.tf_weight, f.doc_freq
+            FROM text_terms tt JOIN term_doc_freq f ON f.term = tt.term
+            '''):
+            norms[text_id] = norms.get(text_id, 0.0) + (weight * self.term_idf(doc_freq, total_docs)) ** 2
+        cursor.execute("DELETE FROM text_vectors")
+        cursor.executemany(
+            "INSERT INTO text_vectors (text_id, norm) VALUES (?, ?)",
+            [(text_id, math.sqrt(value)) for text_id, value in norms.items()]
+        )
+        return len(norms)
+
+    def query_similar_texts(self, content, k, exclude_id=None, cursor=None):
+        """用TF-IDF余弦相似度检索与content最相似的k篇文本
+
+        先取查询文本中权重最高、且不是几乎每篇都出现的词项，经倒排索引
+        (text_terms的term索引)找出至少共享一个词项的候选文本并粗排；
+        再对前SIMILARITY_CANDIDATES篇候选按全部查询词项计算精确点积，
+        最后用有界堆取前k个。k为0时返回全部候选。
+        返回 [(text_id, 相似度)]，按相似度从高到低排列。
+        """
+        cursor = cursor or self.cursor
+        counts = self.extract_terms(content)
+        if not counts:
+            return []
         
-        # 词频统计
-        word_counts = {}
-        for word in words:
-            word_counts[word] = word_counts.get(word, 0) + 1
+        doc_freq, total_docs = self.get_doc_freqs(counts, cursor)
+        query_vector = {
+            term: self.term_tf_weight(count) * self.term_idf(doc_freq.get(term, 0), total_docs)
+            for term, count in counts.items()
+        }
+        query_norm = math.sqrt(sum(weight ** 2 for weight in query_vector.values()))
         
-        # 按频率排序
-        sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
+        # 文档向量分量为 tf_weight * idf，把idf并入查询权重；库中没有的词项不会命中
+        query_terms = {
+            term: weight * self.term_idf(doc_freq[term], total_docs)
+            for term, weight in query_vector.items() if doc_freq.get(term)
+        }
+        max_df = max(2, total_docs * self.SIMILARITY_MAX_DF_RATIO)
+        significant_terms = dict(heapq.nlargest(
+            self.SIMILARITY_QUERY_TERMS,
+            ((term, weight) for term, weight in query_terms.items() if doc_freq[term] <= max_df),
+            key=lambda item: item[1]
+        ))
+        if not significant_terms:
+            return []
         
-        return [word for word, count in sorted_words[:top_n]]
+        candidate_limit = max(k * 10, self.SIMILARITY_CANDIDATES) if k else -1
+        rows = cursor.execute('''
+        WITH significant_terms AS (
+            SELECT key AS term, value AS weight FROM json_each(?)
+        ),
+        candidates AS (
+            SELECT tt.text_id AS text_id
+            FROM significant_terms s
+            JOIN text_terms tt ON tt.term = s.term
+            JOIN text_vectors v ON v.text_id = tt.text_id
+            WHERE tt.text_id IS NOT ?
+            GROUP BY tt.text_id
+            ORDER BY SUM(s.weight * tt.tf_weight) / v.norm DESC
+            LIMIT ?
+        ),
+        query_terms AS (
+            SELECT key AS term, value AS weight FROM json_each(?)
+        )
+        SELECT c.text_id, SUM(q.weight * tt.tf_weight) / v.norm AS score
+        FROM candidates c
+        CROSS JOIN query_terms q
+        CROSS JOIN text_terms tt
+        JOIN text_vectors v ON v.text_id = c.text_id
+        WHERE tt.text_id = c.text_id AND tt.term = q.term
+        GROUP BY c.text_id
+        ''', (json.dumps(significant_terms), exclude_id, candidate_limit, json.dumps(query_terms)))
+        
+        if k:
+            top = heapq.nlargest(k, rows, key=lambda row: row[1])
+        else:
+            top = sorted(rows, key=lambda row: row[1], reverse=True)
+        return [(text_id, min(1.0, score / query_norm)) for text_id, score in top]
 
+    def rebuild_term_index_command(self):
+        """工具菜单：重建词频索引（由后台线程重新切分全部文本）"""
+        try:
+            total = self.reset_term_index()
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            QMessageBox.critical(self, "错误", f"重建词频索引失败: {str(e)}")
+            return
+        
+        self.show_status_message(f"正在后台重建词频索引，共{total}篇文本")
+        self.start_index_update()
 
+    def collect_similar_texts(self, content, exclude_id=None, cursor=None):
+        """增强版相似文本查找（不访问界面，可在后台线程使用独立连接的cursor调用）
 
-    def find_similar_texts(self, content):
-        """增强版相似文本查找"""
-        self.similar_texts_list.clear()
-        self.similarity_table.setRowCount(0)
-        
-        # 获取所有文本
-        self.cursor.execute("SELECT id, title, content, category_id FROM texts WHERE id != ?", (self.current_id,))
-        texts = self.cursor.fetchall()
+        返回 ([(文本ID, 标题, 分类, 相似度, 特征)], 当前文本特征)
+        """
+        cursor = cursor or self.cursor
+        
+        # 经倒排索引按TF-IDF余弦相似度取前k篇
+        top_texts = self.query_similar_texts(content, self.SIMILAR_TEXT_DISPLAY_COUNT, exclude_id, cursor=cursor)
+        scores = dict(top_texts)
+        
+        # 只为结果读取标题、分类和缓存的特征（内容哈希不一致的缓存视为失效）
+        texts = []
+        text_ids = [text_id for text_id, _ in top_texts]
+        for start in range(0, len(text_ids), 500):
+            chunk = text_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+            SELECT t.id, t.title, c.name, f.features
+            FROM texts t
+            LEFT JOIN categories c ON t.category_id = c.id
+            LEFT JOIN text_features f ON f.text_id = t.id AND f.content_hash = t.content_hash
+            WHERE t.id IN ({placeholders})
+            ''', chunk)
+            texts.extend(cursor.fetchall())
+        
+        # 补算缺失或过期的特征
+        missing = self.compute_missing_text_features(
+            [text_id for text_id, _, _, cached in texts if cached is None], cursor=cursor)
         
         # 提取特征
-        current_features = self.extract_text_features(content)
+        current_features = self.extract_text_features(content, cursor=cursor)
         
-        # 计算相似度
         similarities = []
-        for text_id, title, text, category_id in texts:
-            features = self.extract_text_features(text)
-            similarity = self.calculate_similarity(current_features, features)
-            
-            # 获取分类名
-            category_name = "未分类"
-            if category_id:
-                self.cursor.execute("SELECT name FROM categories WHERE id=?", (category_id,))
-                res = self.cursor.fetchone()
-                if res:
-                    category_name = res[0]
-            
-            similarities.append((text_id, title, category_name, similarity, features))
+        for text_id, title, category_name, cached in texts:
+            features = json.loads(cached) if cached is not None else missing[text_id]
+            similarities.append((text_id, title, category_name or "未分类", scores[text_id], features))
         
         # 按相似度排序
         similarities.sort(key=lambda x: x[3], reverse=True)
+        return similarities, current_features
+
+    def show_similar_texts(self, similarities, current_features):
+        """显示相似文本列表和特征权重表"""
+        self.similar_texts_list.clear()
+        self.similarity_table.setRowCount(0)
         
-        # 显示相似文本（如果SIMILAR_TEXT_DISPLAY_COUNT为0则显示全部）
-        display_count = len(similarities) if self.SIMILAR_TEXT_DISPLAY_COUNT == 0 else min(self.SIMILAR_TEXT_DISPLAY_COUNT, len(similarities))
-        
-        for i, (text_id, title, category, similarity, features) in enumerate(similarities[:display_count]):
+        for i, (text_id, title, category, similarity, features) in enumerate(similarities):
             item = QListWidgetItem()
             widget = QWidget()
             layout = QHBoxLayout()
@@ -1340,60 +3332,49 @@ class TextManager(QMainWindow):
         # 显示特征权重表
         self.show_feature_weights(current_features)
 
-    def extract_text_features(self, text):
-        """提取文本多维特征"""
-        features = {
-            # 词汇特征
-            'word_count': len(re.findall(r'\w+', text)),
-            'unique_words': len(set(re.findall(r'\w+', text))),
-            'lexical_diversity': len(set(re.findall(r'\w+', text))) / max(1, len(re.findall(r'\w+', text))),
-            
-            # 中文特征
-            'chinese_chars': len(re.findall(r'[\u4e00-\u9fff]', text)),
-            'chinese_ratio': len(re.findall(r'[\u4e00-\u9fff]', text)) / max(1, len(text)),
-            
-            # 英文特征
-            'english_words': len(re.findall(r'\b[a-zA-Z]+\b', text)),
-            'english_ratio': len(re.findall(r'\b[a-zA-Z]+\b', text)) / max(1, len(re.findall(r'\w+', text))),
-            
-            # 结构特征
-            'avg_sentence_length': len(re.findall(r'\w+', text)) / max(1, len(re.split(r'[。！？.!?]+', text))),
-            'paragraph_count': len([p for p in text.split('\n') if p.strip()]),
-            
-            # 内容特征
-            'question_ratio': len(re.findall(r'[？?]', text)) / max(1, len(re.findall(r'[。.！!？?]', text))),
-            'exclamation_ratio': len(re.findall(r'[！!]', text)) / max(1, len(re.findall(r'[。.！!？?]', text))),
-            
-            # 关键词特征
-            'keywords': self.extract_keywords(text, top_n=10)
-        }
+    def update_text_features(self, text_id, content, content_hash, cursor=None):
+        """计算并缓存一篇文本的特征（按文本ID和内容哈希存储）"""
+        try:
+            features = self.extract_text_features(content or '', use_corpus_idf=False, cursor=cursor)
+        except Exception as e:
+            print(f"特征提取错误: {str(e)}")
+            return None
+        
+        self.save_text_features(text_id, content_hash, features, cursor)
         return features
 
-    def calculate_similarity(self, features1, features2):
-        """计算多维特征相似度"""
-        # 数值特征相似度
-        numeric_sim = 0
-        numeric_features = ['word_count', 'unique_words', 'lexical_diversity',
-                        'chinese_chars', 'chinese_ratio', 'english_words',
-                        'english_ratio', 'avg_sentence_length', 'paragraph_count',
-                        'question_ratio', 'exclamation_ratio']
-        
-        for feat in numeric_features:
-            val1 = features1[feat]
-            val2 = features2[feat]
-            max_val = max(val1, val2) or 1
-            numeric_sim += 1 - abs(val1 - val2) / max_val
-        
-        numeric_sim /= len(numeric_features)
-        
-        # 关键词相似度
-        keywords1 = set(features1['keywords'])
-        keywords2 = set(features2['keywords'])
-        keyword_sim = len(keywords1 & keywords2) / max(1, len(keywords1 | keywords2))
-        
-        # 综合相似度
-        total_sim = 0.6 * numeric_sim + 0.4 * keyword_sim
-        return total_sim
+    def save_text_features(self, text_id, content_hash, features, cursor=None):
+        """写入一篇文本的特征缓存"""
+        (cursor or self.cursor).execute(
+            "INSERT OR REPLACE INTO text_features (text_id, content_hash, features) VALUES (?, ?, ?)",
+            (text_id, content_hash, json.dumps(features, ensure_ascii=False))
+        )
+
+    def compute_missing_text_features(self, text_ids, cursor=None):
+        """为没有有效特征缓存的文本计算特征并写入缓存
+
+        旧版本保存的文本没有content_hash，顺便补算。返回 {text_id: 特征}
+        """
+        cursor = cursor or self.cursor
+        result = {}
+        for start in range(0, len(text_ids), 500):
+            chunk = text_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+            SELECT id, title, content, is_markdown, is_html, content_hash
+            FROM texts WHERE id IN ({placeholders})
+            ''', chunk)
+            for text_id, title, content, is_markdown, is_html, content_hash in cursor.fetchall():
+                if content_hash is None:
+                    content_hash = self.compute_content_hash(title, content, is_markdown, is_html)
+                    cursor.execute(
+                        "UPDATE texts SET content_hash = ? WHERE id = ?", (content_hash, text_id))
+                result[text_id] = self.update_text_features(text_id, content, content_hash, cursor)
+        
+        if result:
+            cursor.connection.commit()
+            print(f"[特征] 已补算 {len(result)} 篇文本的特征")
+        return result
 
     def show_feature_weights(self, features):
         """显示特征权重表"""
@@ -1448,10 +3429,8 @@ class TextManager(QMainWindow):
         
         self.similarity_detail.setPlainText(report)
 
-    def analyze_text_features(self, content):
-        """增强版文本特征分析"""
-        features = self.extract_text_features(content)
-        
+    def analyze_text_features(self, features):
+        """增强版文本特征分析（显示extract_text_features的结果）"""
         # 1. 更新可读性卡片
         readability = min(100, max(0, 100 - (features['avg_sentence_length'] * 0.5)))
         self.readability_score.setText(
@@ -1524,24 +3503,27 @@ class TextManager(QMainWindow):
                 self.features_table.setItem(i, 2, QTableWidgetItem(""))
 
 
+    def schedule_reading_progress(self):
+        """光标移动时安排刷新阅读进度（计时器未运行时才启动，即节流而非防抖）"""
+        if not self.reading_progress_timer.isActive():
+            self.reading_progress_timer.start()
+
     def update_reading_progress(self):
-        """更新阅读进度"""
+        """更新阅读进度（用文档字符数计算，不复制编辑器内容）"""
         if not hasattr(self, 'current_id') or not self.current_id:
             return
         
-        # 获取当前编辑器内容
+        # 获取当前编辑器
         if hasattr(self, 'wysiwyg_editor') and self.wysiwyg_editor.isVisible():
-            content = self.wysiwyg_editor.toPlainText()
-            cursor = self.wysiwyg_editor.textCursor()
+            editor = self.wysiwyg_editor
         elif hasattr(self, 'content_input'):
-            content = self.content_input.toPlainText()
-            cursor = self.content_input.textCursor()
+            editor = self.content_input
         else:
             return
         
-        # 计算进度
-        position = cursor.position()
-        total = len(content)
+        # 计算进度（characterCount包含文档末尾的段落符）
+        position = editor.textCursor().position()
+        total = editor.document().characterCount() - 1
         
         if total > 0:
             progress = int((position / total) * 100)
@@ -1596,6 +3578,7 @@ class TextManager(QMainWindow):
             # 分类选择框
             self.category_combo = QComboBox()
             self.category_combo.addItem('未分类', 0)
+            self.category_combo.currentIndexChanged.connect(self.mark_editor_dirty)
             self.edit_layout.addWidget(self.category_combo)
             print("[DEBUG] 分类选择框创建并添加完成")
             
@@ -1612,6 +3595,7 @@ class TextManager(QMainWindow):
             self.format_combo.addItem('即见即所得')
             self.format_combo.setCurrentIndex(self.default_format)
             self.format_combo.currentIndexChanged.connect(self.toggle_edit_mode)
+            self.format_combo.currentIndexChanged.connect(self.mark_editor_dirty)
             self.edit_layout.addWidget(self.format_combo)
             print(f"[DEBUG] 格式选择框创建并添加完成，默认索引: {self.default_format}")
             
@@ -1629,7 +3613,7 @@ class TextManager(QMainWindow):
                     font-family: 'Consolas', 'Microsoft YaHei', monospace;
                 }
             """)
-            self.content_input.textChanged.connect(self.update_word_count)
+            self.content_input.document().contentsChange.connect(self.on_content_changed)
             self.edit_layout.addWidget(self.content_input)
             print("[DEBUG] 内容编辑器创建并添加完成")
             
@@ -1735,9 +3719,13 @@ class TextManager(QMainWindow):
             self.right_panel.addTab(self.edit_tab, "编辑")
             print("[DEBUG] 编辑选项卡添加完成")
             
-            # 连接文本光标变化信号
-            self.content_input.cursorPositionChanged.connect(self.update_reading_progress)
-            self.wysiwyg_editor.cursorPositionChanged.connect(self.update_reading_progress)
+            # 连接文本光标变化信号（节流：连续移动光标时每隔一段时间刷新一次阅读进度）
+            self.reading_progress_timer = QTimer(self)
+            self.reading_progress_timer.setSingleShot(True)
+            self.reading_progress_timer.setInterval(self.READING_PROGRESS_INTERVAL_MS)
+            self.reading_progress_timer.timeout.connect(self.update_reading_progress)
+            self.content_input.cursorPositionChanged.connect(self.schedule_reading_progress)
+            self.wysiwyg_editor.cursorPositionChanged.connect(self.schedule_reading_progress)
             print("[DEBUG] 光标变化信号连接完成")
             
             print("[DEBUG] === 编辑选项卡创建完成 ===")
@@ -1765,6 +3753,12 @@ class TextManager(QMainWindow):
         scroll.setWidgetResizable(True)
         self.preview_layout.addWidget(scroll)
         
+        # 输入防抖：停止输入后再在后台渲染预览
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(self.PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.render_preview)
+        
         self.right_panel.addTab(self.preview_tab, "预览")
 
     def toggle_view(self):
@@ -1888,6 +3882,44 @@ class TextManager(QMainWindow):
         export_group.setLayout(export_layout)
         layout.addWidget(export_group)
         
+        # 近似重复检测
+        duplicate_group = QGroupBox("近似重复文本")
+        duplicate_layout = QVBoxLayout()
+        btn_find_duplicates = QPushButton("查找近似重复文本")
+        btn_find_duplicates.clicked.connect(lambda: self.show_near_duplicate_report(dialog))
+        duplicate_layout.addWidget(btn_find_duplicates)
+        duplicate_group.setLayout(duplicate_layout)
+        layout.addWidget(duplicate_group)
+        
+        # 批量分析（可读性、情感、关键词和特征）
+        analysis_group = QGroupBox("批量分析")
+        analysis_layout = QHBoxLayout()
+        btn_analyze_selected = QPushButton("分析选中文本")
+        btn_analyze_selected.clicked.connect(lambda: self.start_batch_analysis(dialog, selected_only=True))
+        analysis_layout.addWidget(btn_analyze_selected)
+        btn_analyze_all = QPushButton("分析全部文本")
+        btn_analyze_all.clicked.connect(lambda: self.start_batch_analysis(dialog, selected_only=False))
+        analysis_layout.addWidget(btn_analyze_all)
+        analysis_group.setLayout(analysis_layout)
+        layout.addWidget(analysis_group)
+        
+        # 批量自动打标签（关键词提取，预览确认后写入）
+        auto_tag_group = QGroupBox("批量自动打标签")
+        auto_tag_layout = QVBoxLayout()
+        self.batch_skip_tagged_check = QCheckBox("跳过已有标签的文本")
+        self.batch_skip_tagged_check.setChecked(True)
+        auto_tag_layout.addWidget(self.batch_skip_tagged_check)
+        auto_tag_buttons = QHBoxLayout()
+        btn_tag_selected = QPushButton("选中文本")
+        btn_tag_selected.clicked.connect(lambda: self.start_batch_auto_tag(dialog, selected_only=True))
+        auto_tag_buttons.addWidget(btn_tag_selected)
+        btn_tag_listed = QPushButton("列表中全部文本")
+        btn_tag_listed.clicked.connect(lambda: self.start_batch_auto_tag(dialog, selected_only=False))
+        auto_tag_buttons.addWidget(btn_tag_listed)
+        auto_tag_layout.addLayout(auto_tag_buttons)
+        auto_tag_group.setLayout(auto_tag_layout)
+        layout.addWidget(auto_tag_group)
+        
         # 关闭按钮
         btn_close = QPushButton("关闭")
         btn_close.clicked.connect(dialog.close)
@@ -1896,6 +3928,392 @@ class TextManager(QMainWindow):
         dialog.setLayout(layout)
         dialog.exec_()
 
+    def shingle_hashes(self, text):
+        """去掉空白后按MINHASH_SHINGLE_SIZE个字符切分shingle，返回各shingle的64位哈希值集合"""
+        text = re.sub(r'\s+', '', text or '').lower()
+        if not text:
+            return set()
+        
+        size = self.MINHASH_SHINGLE_SIZE
+        shingles = {text[i:i + size] for i in range(max(1, len(text) - size + 1))}
+        return {
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles
+        }
+
+    def compute_minhash(self, text):
+        """计算文本字符shingle集合的MinHash签名
+
+        shingle切分见shingle_hashes，中英文同样适用。
+        使用单哈希分桶(one permutation hashing)：每个shingle只哈希一次，按哈希值
+        落入MINHASH_PERMUTATIONS个桶之一并保留桶内最小值；空桶借用右侧最近的
+        非空桶并加上距离偏移。文本为空时返回None。
+        """
+        hashes = self.shingle_hashes(text)
+        if not hashes:
+            return None
+        
+        bins = self.MINHASH_PERMUTATIONS
+        mins = [None] * bins
+        for h in hashes:
+            index, value = h % bins, h // bins
+            if mins[index] is None or value < mins[index]:
+                mins[index] = value
+        
+        span = 2 ** 64 // bins
+        signature = []
+        for index in range(bins):
+            distance = 0
+            while mins[(index + distance) % bins] is None:
+                distance += 1
+            signature.append(mins[(index + distance) % bins] + distance * span)
+        return signature
+
+    def compute_simhash(self, text):
+        """计算文本字符shingle集合的64位SimHash指纹
+
+        每一位取所有shingle哈希在该位上1多于0时为1。返回SQLite可直接保存的
+        有符号64位整数，文本为空时返回None。
+        耗时与文本长度成正比，约每1500字5毫秒，只在内容改变时计算。
+        """
+        hashes = self.shingle_hashes(text)
+        if not hashes:
+            return None
+        
+        # 按位统计：把所有哈希拼成一个二进制串，按步长64切片计数，避免逐位移位的Python循环
+        bit_string = ''.join(format(h, '064b') for h in hashes)
+        half = len(hashes) / 2
+        bits = ''.join('1' if bit_string[i::64].count('1') > half else '0' for i in range(64))
+        value = int(bits, 2)
+        return value - (1 << 64) if value >= 1 << 63 else value
+
+    def simhash_band_expressions(self):
+        """SimHash分段的SQL表达式（与索引定义一致才能命中索引）
+
+        汉明距离不超过SIMHASH_MAX_DISTANCE时，把64位分成SIMHASH_MAX_DISTANCE+1段，
+        至少有一段完全相同，因此只需按各段等值查找候选。
+        """
+        bands = self.SIMHASH_MAX_DISTANCE + 1
+        width = 64 // bands
+        mask = (1 << width) - 1
+        return [f'((simhash >> {band * width}) & {mask})' for band in range(bands)]
+
+    def find_simhash_duplicates(self, simhash, exclude_id=None):
+        """按分段索引查找SimHash汉明距离不超过SIMHASH_MAX_DISTANCE的文本
+
+        返回[(文本ID, 标题, 汉明距离)]，按距离升序排列。
+        """
+        if simhash is None:
+            return []
+        
+        bands = self.SIMHASH_MAX_DISTANCE + 1
+        width = 64 // bands
+        mask = (1 << width) - 1
+        expressions = self.simhash_band_expressions()
+        self.cursor.execute(f'''
+        SELECT id, title, simhash FROM texts
+        WHERE ({' OR '.join(f'{expression} = ?' for expression in expressions)})
+          AND id IS NOT ?
+        ''', [(simhash >> (band * width)) & mask for band in range(bands)] + [exclude_id])
+        
+        duplicates = []
+        for text_id, title, other in self.cursor.fetchall():
+            distance = bin((simhash ^ other) & 0xFFFFFFFFFFFFFFFF).count('1')
+            if distance <= self.SIMHASH_MAX_DISTANCE:
+                duplicates.append((text_id, title, distance))
+        duplicates.sort(key=lambda item: item[2])
+        return duplicates
+
+    def backfill_simhash(self):
+        """按批次为simhash为空的文本补算SimHash指纹"""
+        total = 0
+        last_id = 0
+        while True:
+            self.cursor.execute('''
+            SELECT id, content, is_html FROM texts
+            WHERE simhash IS NULL AND id > ? ORDER BY id LIMIT ?
+            ''', (last_id, self.SIMHASH_BACKFILL_CHUNK_SIZE))
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            
+            updates = []
+            for text_id, content, is_html in rows:
+                plain_text = self.html_to_plain(content or '') if is_html else content
+                simhash = self.compute_simhash(plain_text)
+                if simhash is not None:
+                    updates.append((simhash, text_id))
+            self.cursor.executemany("UPDATE texts SET simhash = ? WHERE id = ?", updates)
+            self.conn.commit()
+            total += len(updates)
+            last_id = rows[-1][0]
+            print(f"[SimHash] 已回填 {total} 条文本指纹")
+        return total
+
+    def warn_near_duplicate(self, text_id, simhash):
+        """新文本与已有文本近似重复时在状态栏提示（不打断编辑）"""
+        duplicates = self.find_simhash_duplicates(simhash, exclude_id=text_id)
+        if not duplicates:
+            return False
+        
+        other_id, other_title, distance = duplicates[0]
+        message = f'⚠ 新文本与已有文本《{other_title}》(ID: {other_id}) 高度相似'
+        if len(duplicates) > 1:
+            message += f'，另有{len(duplicates) - 1}篇相似文本'
+        print(f"[SimHash] 文本 {text_id} 与 {other_id} 汉明距离 {distance}")
+        self.show_status_message(message, 10000)
+        return True
+
+    def minhash_band_buckets(self, signature):
+        """把签名分为MINHASH_BANDS段，每段哈希为一个LSH桶号"""
+        rows = self.MINHASH_PERMUTATIONS // self.MINHASH_BANDS
+        buckets = []
+        for band in range(self.MINHASH_BANDS):
+            data = struct.pack(f'<{rows}Q', *signature[band * rows:(band + 1) * rows])
+            digest = hashlib.blake2b(data, digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, 'little', signed=True)))
+        return buckets
+
+    def save_text_minhash(self, text_id, content_hash, signature, cursor=None):
+        """保存文本的MinHash签名和LSH分桶（不提交事务）"""
+        cursor = cursor or self.cursor
+        cursor.execute("DELETE FROM minhash_bands WHERE text_id = ?", (text_id,))
+        cursor.execute(
+            "INSERT OR REPLACE INTO text_minhash (text_id, content_hash, signature) VALUES (?, ?, ?)",
+            (text_id, content_hash,
+             struct.pack(f'<{len(signature)}Q', *signature) if signature else None)
+        )
+        if signature:
+            cursor.executemany(
+                "INSERT INTO minhash_bands (band, bucket, text_id) VALUES (?, ?, ?)",
+                [(band, bucket, text_id) for band, bucket in self.minhash_band_buckets(signature)]
+            )
+
+    def remove_text_minhash(self, text_id):
+        """删除文本的MinHash签名和LSH分桶"""
+        self.cursor.execute("DELETE FROM minhash_bands WHERE text_id = ?", (text_id,))
+        self.cursor.execute("DELETE FROM text_minhash WHERE text_id = ?", (text_id,))
+
+    def find_near_duplicates(self):
+        """在全库范围查找近似重复文本
+
+        同一LSH桶中的文本对为候选，再用签名估计Jaccard相似度核实，
+        达到NEAR_DUPLICATE_THRESHOLD的文本对按连通关系合并成组。
+        调用前由MinHashRefreshWorker补算缺失或过期的签名。
+        返回 [(组内最高相似度, [text_id, ...]), ...]
+        """
+        self.cursor.execute('''
+        SELECT DISTINCT a.text_id, b.text_id
+        FROM minhash_bands a
+        JOIN minhash_bands b
+            ON b.band = a.band AND b.bucket = a.bucket AND b.text_id > a.text_id
+        ''')
+        pairs = self.cursor.fetchall()
+        if not pairs:
+            return []
+        
+        text_ids = sorted({text_id for pair in pairs for text_id in pair})
+        signatures = {}
+        for start in range(0, len(text_ids), 500):
+            chunk = text_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            self.cursor.execute(
+                f"SELECT text_id, signature FROM text_minhash WHERE text_id IN ({placeholders})", chunk)
+            for text_id, signature in self.cursor.fetchall():
+                signatures[text_id] = struct.unpack(f'<{self.MINHASH_PERMUTATIONS}Q', signature)
+        
+        # 并查集合并相似文本
+        parent = {}
+        
+        def find(text_id):
+            while parent.get(text_id, text_id) != text_id:
+                text_id = parent[text_id]
+            return text_id
+        
+        best = {}
+        for a, b in pairs:
+            similarity = sum(
+                x == y for x, y in zip(signatures[a], signatures[b])
+            ) / self.MINHASH_PERMUTATIONS
+            if similarity < self.NEAR_DUPLICATE_THRESHOLD:
+                continue
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[root_b] = root_a
+            best[a] = max(best.get(a, 0), similarity)
+            best[b] = max(best.get(b, 0), similarity)
+        
+        groups = {}
+        for text_id in best:
+            groups.setdefault(find(text_id), []).append(text_id)
+        return sorted(
+            ((max(best[i] for i in members), members) for members in groups.values()),
+            key=lambda group: (-group[0], -len(group[1]))
+        )
+
+    def show_near_duplicate_report(self, parent_dialog):
+        """在后台补算MinHash签名，完成后显示近似重复文本报告"""
+        if self.minhash_refresh_worker is not None:
+            QMessageBox.information(parent_dialog, "近似重复文本", "正在计算文本签名，请稍候")
+            return
+        
+        # 进度对话框对批量操作对话框模态，计算期间不能关闭它
+        progress = QProgressDialog("正在计算文本签名...", "取消", 0, 0, parent_dialog)
+        progress.setWindowTitle("近似重复文本")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(self.cancel_minhash_refresh)
+        progress.show()
+        self.minhash_refresh_dialog = progress
+        
+        worker = MinHashRefreshWorker(self, self)
+        worker.progress_changed.connect(self.on_minhash_refresh_progress)
+        worker.job_finished.connect(
+            lambda count, elapsed: self.on_minhash_refresh_finished(parent_dialog, count, elapsed))
+        worker.job_failed.connect(self.on_minhash_refresh_failed)
+        worker.finished.connect(self.on_minhash_refresh_stopped)
+        worker.finished.connect(worker.deleteLater)
+        self.minhash_refresh_worker = worker
+        worker.start()
+
+    def cancel_minhash_refresh(self):
+        """取消补算签名（已提交的签名保留）"""
+        if self.minhash_refresh_worker is not None:
+            self.minhash_refresh_worker.cancel()
+        self.close_minhash_refresh_dialog()
+        self.show_status_message("已取消查找近似重复文本", 3000)
+
+    def close_minhash_refresh_dialog(self):
+        """关闭补算签名进度对话框"""
+        if self.minhash_refresh_dialog is not None:
+            progress = self.minhash_refresh_dialog
+            self.minhash_refresh_dialog = None
+            progress.canceled.disconnect(self.cancel_minhash_refresh)
+            progress.close()
+            progress.deleteLater()
+
+    def on_minhash_refresh_progress(self, done, total):
+        """补算签名进度"""
+        if self.minhash_refresh_dialog is not None:
+            self.minhash_refresh_dialog.setMaximum(total)
+            self.minhash_refresh_dialog.setValue(done)
+            self.minhash_refresh_dialog.setLabelText(f"正在计算文本签名: {done}/{total}")
+
+    def on_minhash_refresh_finished(self, parent_dialog, count, elapsed):
+        """签名已是最新，查找并显示近似重复文本"""
+        self.close_minhash_refresh_dialog()
+        if count:
+            print(f"[MinHash] 补算{count}篇文本的签名，耗时{elapsed:.2f}秒")
+        self.show_near_duplicate_groups(parent_dialog, elapsed)
+
+    def on_minhash_refresh_failed(self, message):
+        """补算签名出错"""
+        self.close_minhash_refresh_dialog()
+        print("[ERROR] 计算文本签名失败:", message)
+        QMessageBox.critical(self, "错误", f"查找近似重复文本失败: {message}")
+
+    def on_minhash_refresh_stopped(self):
+        """补算签名线程已退出"""
+        self.minhash_refresh_worker = None
+
+    def show_near_duplicate_groups(self, parent_dialog, refresh_elapsed=0.0):
+        """显示近似重复文本报告，勾选的文本可批量移到回收站
+
+        每组默认保留最近更新的一篇，勾选其余各篇。
+        """
+        start_time = time.time()
+        try:
+            groups = self.find_near_duplicates()
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"查找近似重复文本失败: {str(e)}")
+            return
+        elapsed = time.time() - start_time + refresh_elapsed
+        
+        if not groups:
+            self.show_status_message(f"未发现近似重复文本，耗时{elapsed:.2f}秒", 5000)
+            QMessageBox.information(parent_dialog, "近似重复文本", "未发现近似重复文本")
+            return
+        
+        dialog = QDialog(parent_dialog)
+        dialog.setWindowTitle("近似重复文本")
+        dialog.resize(700, 500)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(
+            f"发现{len(groups)}组近似重复文本（相似度≥{self.NEAR_DUPLICATE_THRESHOLD:.0%}，耗时{elapsed:.2f}秒），"
+            f"勾选的文本将移到回收站："
+        ))
+        
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["标题", "ID", "字数", "更新时间"])
+        for number, (similarity, members) in enumerate(groups, 1):
+            placeholders = ','.join('?' * len(members))
+            self.cursor.execute(f'''
+            SELECT id, title, word_count, update_time FROM texts
+            WHERE id IN ({placeholders})
+            ORDER BY update_time DESC, id DESC
+            ''', members)
+            rows = self.cursor.fetchall()
+            
+            group_item = QTreeWidgetItem(tree, [f"第{number}组：{len(rows)}篇，相似度{similarity:.0%}"])
+            for index, (text_id, title, word_count, update_time) in enumerate(rows):
+                item = QTreeWidgetItem(group_item, [title, str(text_id), str(word_count), str(update_time)])
+                item.setData(0, Qt.UserRole, text_id)
+                item.setCheckState(0, Qt.Unchecked if index == 0 else Qt.Checked)
+            group_item.setExpanded(True)
+        tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(tree)
+        
+        button_layout = QHBoxLayout()
+        btn_recycle = QPushButton("移至回收站")
+        btn_recycle.clicked.connect(lambda: self.recycle_checked_duplicates(tree, dialog))
+        button_layout.addWidget(btn_recycle)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(dialog.close)
+        button_layout.addWidget(btn_close)
+        layout.addLayout(button_layout)
+        
+        dialog.setLayout(layout)
+        dialog.exec_()
+
+    def recycle_checked_duplicates(self, tree, dialog):
+        """把报告中勾选的文本批量移到回收站"""
+        text_ids = []
+        for i in range(tree.topLevelItemCount()):
+            group_item = tree.topLevelItem(i)
+            for j in range(group_item.childCount()):
+                item = group_item.child(j)
+                if item.checkState(0) == Qt.Checked:
+                    text_ids.append(item.data(0, Qt.UserRole))
+        
+        if not text_ids:
+            QMessageBox.warning(dialog, "警告", "没有勾选任何文本!")
+            return
+        
+        reply = QMessageBox.question(
+            dialog, '确认删除',
+            f'确定要把勾选的{len(text_ids)}篇文本移到回收站吗?',
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        try:
+            for text_id in text_ids:
+                self.move_text_to_recycle_bin(text_id)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            QMessageBox.critical(dialog, "错误", f"删除失败: {str(e)}")
+            return
+        
+        if self.current_id in text_ids:
+            self.new_text()
+        self.load_text_list()
+        self.show_status_message(f"已将{len(text_ids)}篇近似重复文本移到回收站", 3000)
+        dialog.accept()
+
     def select_export_directory(self):
         """选择导出目录"""
         dir_path = QFileDialog.getExistingDirectory(self, "选择导出目录")
@@ -1904,8 +4322,8 @@ class TextManager(QMainWindow):
 
     def batch_export(self, dialog):
         """批量导出选中文本"""
-        selected_items = self.text_list.selectedItems()
-        if not selected_items:
+        text_ids = self.selected_text_ids()
+        if not text_ids:
             QMessageBox.warning(self, "警告", "请先选择要导出的文本!")
             return
             
@@ -1915,7 +4333,6 @@ class TextManager(QMainWindow):
             return
             
         export_format = self.export_format_combo.currentText()
-        text_ids = [item.data(Qt.UserRole) for item in selected_items]
         
         try:
             for text_id in text_ids:
@@ -1969,78 +4386,424 @@ class TextManager(QMainWindow):
             print(self, "错误", f"导出失败: {str(e)}")
             QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
 
+    def stage_text_ids(self, text_ids):
+        """把选中的文本ID写入临时表temp.selected_text_ids（不提交事务）
+
+        批量操作用一条 ... IN (SELECT text_id FROM temp.selected_text_ids) 语句
+        处理全部选中文本，不再逐个文本执行语句。
+        """
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS selected_text_ids (text_id INTEGER PRIMARY KEY)")
+        self.cursor.execute("DELETE FROM temp.selected_text_ids")
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO temp.selected_text_ids (text_id) VALUES (?)",
+            [(text_id,) for text_id in text_ids]
+        )
+
     def batch_update_category(self, dialog):
-        """批量更新分类"""
-        selected_items = self.text_list.selectedItems()
-        if not selected_items:
+        """批量更新分类（选中ID写入临时表后一条UPDATE完成）"""
+        text_ids = self.selected_text_ids()
+        if not text_ids:
             QMessageBox.warning(self, "警告", "请先选择要操作的文本!")
             return
             
         category_id = self.batch_category_combo.currentData()
-        text_ids = [item.data(Qt.UserRole) for item in selected_items]
         
+        start_time = time.time()
         try:
-            for text_id in text_ids:
-                self.cursor.execute(
-                    "UPDATE texts SET category_id = ? WHERE id = ?",
-                    (category_id, text_id)
-                )
-            
+            self.stage_text_ids(text_ids)
+            self.cursor.execute('''
+            UPDATE texts SET category_id = ?
+            WHERE id IN (SELECT text_id FROM temp.selected_text_ids)
+              AND category_id IS NOT ?
+            ''', (category_id, category_id))
+            updated = self.cursor.rowcount
+            self.cursor.execute("DELETE FROM temp.selected_text_ids")
             self.conn.commit()
-            self.load_text_list()
-            dialog.close()
-            self.show_status_message(f"已批量更新{len(text_ids)}个文本的分类", 3000)
         except Exception as e:
+            self.conn.rollback()
             QMessageBox.critical(self, "错误", f"批量更新失败: {str(e)}")
+            return
+        elapsed = time.time() - start_time
+        
+        # 正在编辑的文本同步显示新分类，避免之后保存时改回旧分类
+        if self.current_id in text_ids:
+            index = self.category_combo.findData(category_id)
+            if index >= 0:
+                dirty = self.editor_dirty
+                self.category_combo.setCurrentIndex(index)
+                self.editor_dirty = dirty
+        
+        if updated:
+            self.load_text_list()
+        dialog.close()
+        print(f"[批量操作] 更新{updated}个文本的分类，耗时{elapsed:.3f}秒")
+        self.show_status_message(
+            f"已批量更新{len(text_ids)}个文本的分类（{updated}个有变化），耗时{elapsed:.2f}秒", 3000)
 
     def batch_add_tags(self, dialog):
-        """批量添加标签"""
-        selected_items = self.text_list.selectedItems()
-        if not selected_items:
+        """批量添加标签（选中ID写入临时表，标签只解析一次，一条INSERT ... SELECT完成关联）"""
+        text_ids = self.selected_text_ids()
+        if not text_ids:
             QMessageBox.warning(self, "警告", "请先选择要操作的文本!")
             return
             
-        new_tags = [tag.strip() for tag in self.batch_tag_input.text().split(",") if tag.strip()]
+        new_tags = list(dict.fromkeys(
+            tag.strip() for tag in self.batch_tag_input.text().split(",") if tag.strip()))
         if not new_tags:
             QMessageBox.warning(self, "警告", "请输入有效的标签!")
             return
-            
-        text_ids = [item.data(Qt.UserRole) for item in selected_items]
         
+        start_time = time.time()
         try:
-            for text_id in text_ids:
-                for tag_name in new_tags:
-                    # 查找或创建标签
-                    self.cursor.execute("SELECT id FROM tags WHERE name=?", (tag_name,))
-                    tag_id = self.cursor.fetchone()
-                    
-                    if not tag_id:
-                        self.cursor.execute("INSERT INTO tags (name) VALUES (?)", (tag_name,))
-                        tag_id = self.cursor.lastrowid
-                    else:
-                        tag_id = tag_id[0]
-                    
-                    # 检查是否已存在关联
-                    self.cursor.execute(
-                        "SELECT 1 FROM text_tags WHERE text_id=? AND tag_id=?",
-                        (text_id, tag_id)
-                    )
-                    if not self.cursor.fetchone():
-                        self.cursor.execute(
-                            "INSERT INTO text_tags (text_id, tag_id) VALUES (?, ?)",
-                            (text_id, tag_id)
-                        )
-            
+            self.stage_text_ids(text_ids)
+            # 查找或创建标签（每个标签只处理一次）
+            self.cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(tag,) for tag in new_tags])
+            placeholders = ','.join('?' * len(new_tags))
+            self.cursor.execute(f'''
+            INSERT OR IGNORE INTO text_tags (text_id, tag_id)
+            SELECT s.text_id, t.id
+            FROM temp.selected_text_ids s
+            CROSS JOIN tags t
+            WHERE t.name IN ({placeholders})
+            ''', new_tags)
+            added_links = self.cursor.rowcount
+            self.cursor.execute("DELETE FROM temp.selected_text_ids")
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            QMessageBox.critical(self, "错误", f"批量添加标签失败: {str(e)}")
+            return
+        elapsed = time.time() - start_time
+        
+        # 正在编辑的文本同步显示新标签，避免之后保存时按旧标签删掉新增的关联
+        if self.current_id in text_ids:
+            self.merge_tags_into_editor(new_tags)
+        
+        # 列表中不显示标签，只刷新标签云
+        self.load_tags()
+        dialog.close()
+        print(f"[批量操作] 添加{added_links}个标签关联，耗时{elapsed:.3f}秒")
+        self.show_status_message(
+            f"已批量添加标签到{len(text_ids)}个文本（新增{added_links}个关联），耗时{elapsed:.2f}秒", 3000)
+
+    def start_batch_auto_tag(self, dialog, selected_only):
+        """为选中文本或列表中（当前筛选结果）的全部文本批量提取关键词标签"""
+        if self.current_view == "recycle_bin":
+            QMessageBox.warning(dialog, "警告", "回收站中的文本不能打标签!")
+            return
+        if self.auto_tag_worker is not None:
+            QMessageBox.information(dialog, "批量自动打标签", "批量自动打标签正在进行，请等待完成或取消后再试")
+            return
+        
+        text_ids = self.selected_text_ids() if selected_only else self.text_list_model.all_text_ids()
+        if text_ids and self.batch_skip_tagged_check.isChecked():
+            tagged = set()
+            for start in range(0, len(text_ids), 500):
+                chunk = text_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                self.cursor.execute(
+                    f"SELECT DISTINCT text_id FROM text_tags WHERE text_id IN ({placeholders})", chunk)
+                tagged.update(text_id for text_id, in self.cursor.fetchall())
+            text_ids = [text_id for text_id in text_ids if text_id not in tagged]
+        if not text_ids:
+            QMessageBox.warning(dialog, "警告", "没有需要打标签的文本!")
+            return
+        
+        dialog.close()
+        total = len(text_ids)
+        progress = QProgressDialog(f"正在提取关键词标签: 0/{total}", "取消", 0, total, self)
+        progress.setWindowTitle("批量自动打标签")
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(self.cancel_batch_auto_tag)
+        progress.show()
+        self.auto_tag_dialog = progress
+        
+        worker = AutoTagWorker(self, text_ids, self.AUTO_TAG_COUNT, self)
+        worker.progress_changed.connect(self.on_auto_tag_progress)
+        worker.tags_ready.connect(self.on_auto_tag_ready)
+        worker.job_failed.connect(self.on_auto_tag_failed)
+        worker.finished.connect(self.on_auto_tag_stopped)
+        worker.finished.connect(worker.deleteLater)
+        self.auto_tag_worker = worker
+        worker.start()
+
+    def cancel_batch_auto_tag(self):
+        """取消批量自动打标签（尚未写入任何标签）"""
+        if self.auto_tag_worker is not None:
+            self.auto_tag_worker.cancel()
+        self.close_auto_tag_dialog()
+        self.show_status_message("已取消批量自动打标签", 3000)
+
+    def close_auto_tag_dialog(self):
+        """关闭批量自动打标签进度对话框"""
+        if self.auto_tag_dialog is not None:
+            progress = self.auto_tag_dialog
+            self.auto_tag_dialog = None
+            progress.canceled.disconnect(self.cancel_batch_auto_tag)
+            progress.close()
+            progress.deleteLater()
+
+    def on_auto_tag_progress(self, done, total):
+        """批量自动打标签进度"""
+        if self.auto_tag_dialog is not None:
+            self.auto_tag_dialog.setValue(done)
+            self.auto_tag_dialog.setLabelText(f"正在提取关键词标签: {done}/{total}")
+
+    def on_auto_tag_ready(self, suggestions, elapsed):
+        """关键词提取完成，显示预览"""
+        self.close_auto_tag_dialog()
+        print(f"[自动标签] 为{len(suggestions)}篇文本提取到标签，耗时{elapsed:.2f}秒")
+        if not suggestions:
+            QMessageBox.information(self, "批量自动打标签", "未提取到有效关键词")
+            return
+        self.show_auto_tag_preview(suggestions, elapsed)
+
+    def on_auto_tag_failed(self, message):
+        """批量自动打标签出错"""
+        self.close_auto_tag_dialog()
+        print("[ERROR] 批量自动打标签失败:", message)
+        QMessageBox.critical(self, "错误", f"批量自动打标签失败: {message}")
+
+    def on_auto_tag_stopped(self):
+        """批量自动打标签线程已退出"""
+        self.auto_tag_worker = None
+
+    def show_auto_tag_preview(self, suggestions, elapsed):
+        """预览候选标签：可取消勾选或修改标签，确认后一次写入"""
+        titles = {}
+        text_ids = [text_id for text_id, _ in suggestions]
+        for start in range(0, len(text_ids), 500):
+            chunk = text_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            self.cursor.execute(f"SELECT id, title FROM texts WHERE id IN ({placeholders})", chunk)
+            titles.update(self.cursor.fetchall())
+        suggestions = [(text_id, tags) for text_id, tags in suggestions if text_id in titles]
+        
+        dialog = QDialog(self)
+        dialog.setWindowTitle("批量自动打标签 - 预览")
+        dialog.resize(700, 500)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(
+            f"为{len(suggestions)}篇文本提取到候选标签（耗时{elapsed:.2f}秒），"
+            f"勾选的文本将添加右侧标签（可直接修改，用逗号分隔）："
+        ))
+        
+        table = QTableWidget(len(suggestions), 2)
+        table.setHorizontalHeaderLabels(["标题", "标签"])
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        for row, (text_id, tags) in enumerate(suggestions):
+            title_item = QTableWidgetItem(titles[text_id])
+            title_item.setData(Qt.UserRole, text_id)
+            title_item.setFlags((title_item.flags() | Qt.ItemIsUserCheckable) & ~Qt.ItemIsEditable)
+            title_item.setCheckState(Qt.Checked)
+            table.setItem(row, 0, title_item)
+            table.setItem(row, 1, QTableWidgetItem(', '.join(tags)))
+        layout.addWidget(table)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("添加标签")
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.setLayout(layout)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        
+        pairs = []
+        for row in range(table.rowCount()):
+            title_item = table.item(row, 0)
+            if title_item.checkState() != Qt.Checked:
+                continue
+            text_id = title_item.data(Qt.UserRole)
+            tags = {tag.strip() for tag in table.item(row, 1).text().split(',') if tag.strip()}
+            pairs.extend((text_id, tag_name) for tag_name in tags)
+        if pairs:
+            self.apply_text_tag_pairs(pairs)
+
+    def apply_text_tag_pairs(self, pairs):
+        """把 (文本ID, 标签名) 批量写入text_tags
+
+        先把所有配对写入临时表，再用两条集合语句在一个事务中补建缺少的标签、
+        插入缺少的关联，不再逐个查询标签和关联是否存在。
+        """
+        start_time = time.time()
+        try:
+            self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS pending_text_tags (text_id INTEGER, tag_name TEXT)")
+            self.cursor.execute("DELETE FROM temp.pending_text_tags")
+            self.cursor.executemany("INSERT INTO temp.pending_text_tags (text_id, tag_name) VALUES (?, ?)", pairs)
+            self.cursor.execute('''
+            INSERT OR IGNORE INTO tags (name)
+            SELECT DISTINCT tag_name FROM temp.pending_text_tags
+            ''')
+            created_tags = self.cursor.rowcount
+            self.cursor.execute('''
+            INSERT OR IGNORE INTO text_tags (text_id, tag_id)
+            SELECT p.text_id, t.id
+            FROM temp.pending_text_tags p
+            JOIN tags t ON t.name = p.tag_name
+            WHERE p.text_id IN (SELECT id FROM texts)
+            ''')
+            added_links = self.cursor.rowcount
+            self.cursor.execute("DELETE FROM temp.pending_text_tags")
             self.conn.commit()
-            self.load_text_list()
-            self.load_tags()
-            dialog.close()
-            self.show_status_message(f"已批量添加标签到{len(text_ids)}个文本", 3000)
         except Exception as e:
+            self.conn.rollback()
             QMessageBox.critical(self, "错误", f"批量添加标签失败: {str(e)}")
+            return
+        elapsed = time.time() - start_time
+        
+        # 正在编辑的文本同步显示新标签，避免之后保存时按旧标签删掉新增的关联
+        if self.current_id is not None:
+            new_tags = [tag_name for text_id, tag_name in pairs if text_id == self.current_id]
+            if new_tags:
+                self.merge_tags_into_editor(new_tags)
+        
+        self.load_tags()
+        print(f"[标签] 批量添加{added_links}个标签关联，新建{created_tags}个标签，耗时{elapsed:.3f}秒")
+        self.show_status_message(
+            f"已添加{added_links}个标签关联（新建{created_tags}个标签），耗时{elapsed:.2f}秒", 5000)
+
+    def merge_tags_into_editor(self, tags):
+        """把已写入数据库的标签合并到编辑器的标签输入框（不改变其修改状态）"""
+        current_tags = [tag.strip() for tag in self.tag_edit.text().split(',') if tag.strip()]
+        merged = list(dict.fromkeys(current_tags + list(tags)))
+        if merged == current_tags:
+            return
+        modified = self.tag_edit.isModified()
+        self.tag_edit.setText(', '.join(merged))
+        self.tag_edit.setModified(modified)
+
+    def enqueue_text_analysis(self, text_ids=None):
+        """把文本加入批量分析队列（text_ids为None时加入全部文本，不提交事务）
+
+        分析结果与当前内容哈希一致的文本不再排队。返回队列中的文本数。
+        """
+        if text_ids is None:
+            self.cursor.execute("INSERT OR IGNORE INTO analysis_queue (text_id) SELECT id FROM texts")
+        else:
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO analysis_queue (text_id) VALUES (?)",
+                [(text_id,) for text_id in text_ids]
+            )
+        self.cursor.execute('''
+        DELETE FROM analysis_queue WHERE text_id IN (
+            SELECT a.text_id FROM text_analysis a
+            JOIN texts t ON t.id = a.text_id
+            WHERE a.content_hash = t.content_hash
+        )
+        ''')
+        self.cursor.execute("SELECT COUNT(*) FROM analysis_queue")
+        return self.cursor.fetchone()[0]
+
+    def start_batch_analysis(self, dialog, selected_only):
+        """批量分析选中或全部文本，上次中断时剩余的文本可以继续分析"""
+        if self.batch_analysis_worker is not None:
+            QMessageBox.information(dialog, "批量分析", "批量分析正在进行，请等待完成或取消后再试")
+            return
+        
+        text_ids = None
+        if selected_only:
+            text_ids = self.selected_text_ids()
+            if not text_ids:
+                QMessageBox.warning(dialog, "警告", "请先选择要分析的文本!")
+                return
+        
+        try:
+            self.cursor.execute("SELECT COUNT(*) FROM analysis_queue")
+            remaining = self.cursor.fetchone()[0]
+            if remaining:
+                reply = QMessageBox.question(
+                    dialog, "批量分析",
+                    f"上次批量分析未完成，还剩{remaining}篇文本。\n"
+                    "是否先继续上次的分析？选择\"否\"将放弃上次剩余的文本。",
+                    QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+                )
+                if reply == QMessageBox.Cancel:
+                    return
+                if reply == QMessageBox.No:
+                    self.cursor.execute("DELETE FROM analysis_queue")
+                    remaining = 0
+            
+            if not remaining:
+                remaining = self.enqueue_text_analysis(text_ids)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            QMessageBox.critical(dialog, "错误", f"批量分析失败: {str(e)}")
+            return
+        
+        if not remaining:
+            QMessageBox.information(dialog, "批量分析", "所选文本的分析结果都是最新的")
+            return
+        
+        dialog.close()
+        self.run_batch_analysis(remaining)
+
+    def run_batch_analysis(self, total):
+        """启动批量分析线程并显示进度"""
+        progress = QProgressDialog(f"正在批量分析文本: 0/{total}", "取消", 0, total, self)
+        progress.setWindowTitle("批量分析")
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(self.cancel_batch_analysis)
+        progress.show()
+        self.batch_analysis_dialog = progress
+        
+        worker = BatchAnalysisWorker(self, self)
+        worker.progress_changed.connect(self.on_batch_analysis_progress)
+        worker.job_finished.connect(self.on_batch_analysis_finished)
+        worker.job_failed.connect(self.on_batch_analysis_failed)
+        worker.finished.connect(self.on_batch_analysis_stopped)
+        worker.finished.connect(worker.deleteLater)
+        self.batch_analysis_worker = worker
+        worker.start()
+
+    def cancel_batch_analysis(self):
+        """取消批量分析（已提交的结果保留，剩余文本留在队列中）"""
+        if self.batch_analysis_worker is not None:
+            self.batch_analysis_worker.cancel()
+        self.close_batch_analysis_dialog()
+        self.show_status_message("批量分析已取消，剩余文本下次可继续分析", 5000)
+
+    def close_batch_analysis_dialog(self):
+        """关闭批量分析进度对话框"""
+        if self.batch_analysis_dialog is not None:
+            progress = self.batch_analysis_dialog
+            self.batch_analysis_dialog = None
+            progress.canceled.disconnect(self.cancel_batch_analysis)
+            progress.close()
+            progress.deleteLater()
+
+    def on_batch_analysis_progress(self, done, total):
+        """批量分析进度"""
+        if self.batch_analysis_dialog is not None:
+            self.batch_analysis_dialog.setValue(done)
+            self.batch_analysis_dialog.setLabelText(f"正在批量分析文本: {done}/{total}")
+
+    def on_batch_analysis_finished(self, done, elapsed):
+        """批量分析完成"""
+        self.close_batch_analysis_dialog()
+        print(f"[批量分析] 完成{done}篇文本，耗时{elapsed:.2f}秒")
+        self.show_status_message(f"批量分析完成: {done}篇文本，耗时{elapsed:.1f}秒", 5000)
+
+    def on_batch_analysis_failed(self, message):
+        """批量分析出错"""
+        self.close_batch_analysis_dialog()
+        print("[ERROR] 批量分析失败:", message)
+        QMessageBox.critical(self, "错误", f"批量分析失败: {message}\n已完成的结果已保存，剩余文本下次可继续分析")
+
+    def on_batch_analysis_stopped(self):
+        """批量分析线程已退出（取消时要等正在分析的批次结束），可以开始新的批量分析"""
+        self.batch_analysis_worker = None
 
     def load_search_history(self):
         """加载搜索历史（使用与文件列表相同的配色方案）"""
+        # 重建下拉框时不触发apply_search_history
+        self.search_history_combo.blockSignals(True)
         self.search_history_combo.clear()
         self.cursor.execute(
             "SELECT rowid, query FROM search_history ORDER BY search_time DESC LIMIT 10"
@@ -2056,32 +4819,107 @@ class TextManager(QMainWindow):
             index = self.search_history_combo.count() - 1
             self.search_history_combo.setItemData(index, bg_color, Qt.BackgroundRole)
             self.search_history_combo.setItemData(index, text_color, Qt.TextColorRole)
-
+        
+        self.search_history_combo.setCurrentIndex(-1)
+        self.search_history_combo.blockSignals(False)
 
 
     def apply_search_history(self, query):
         """应用搜索历史"""
         if query:
             self.search_input.setText(query)
+            self.search_debounce_timer.stop()
+            self.search_history_timer.stop()
             self.search_texts()
 
     def save_search_history(self, query):
-        """保存搜索历史"""
-        if query.strip():
-            self.cursor.execute(
-                "INSERT INTO search_history (query) VALUES (?)",
-                (query,)
-            )
-            self.conn.commit()
-            self.load_search_history()
+        """保存搜索历史（与最近一条相同则跳过）"""
+        if not query.strip():
+            return
+        
+        self.cursor.execute(
+            "SELECT query FROM search_history ORDER BY search_time DESC, id DESC LIMIT 1"
+        )
+        last = self.cursor.fetchone()
+        if last and last[0] == query:
+            return
+        
+        self.cursor.execute(
+            "INSERT INTO search_history (query) VALUES (?)",
+            (query,)
+        )
+        self.conn.commit()
+        self.load_search_history()
+
+    def on_search_text_changed(self, text):
+        """搜索框输入变化：重新开始防抖计时"""
+        self.search_debounce_timer.start()
+        if text.strip():
+            self.search_history_timer.start()
+        else:
+            self.search_history_timer.stop()
+
+    def commit_search(self):
+        """确认搜索（回车）：立即搜索并记录搜索历史"""
+        self.search_debounce_timer.stop()
+        self.search_history_timer.stop()
+        self.save_search_history(self.search_input.text().strip())
+        self.search_texts()
+
+    def show_text_query(self, query, params, key_columns, row_builder, background=False):
+        """在文本列表中显示查询结果
+
+        background为False时由模型按需分页读取；为True时在后台线程执行查询，
+        结果分批推送到列表，新的查询会中断仍在执行的旧查询。
+        key_columns为None时查询自带ORDER BY（如按相关度排序），只能在后台执行。
+        """
+        self.cancel_background_search()
+        
+        if not background:
+            self.text_list_model.set_query(query, params, key_columns, row_builder)
+            return
+        
+        if key_columns:
+            time_column, id_column = key_columns
+            query += f' ORDER BY {time_column} DESC, {id_column} DESC'
+        
+        self.search_generation += 1
+        self.text_list_model.reset_rows(row_builder)
+        worker = SearchWorker(self.db_path, self.search_generation, query, params, self)
+        worker.rows_ready.connect(self.on_search_rows)
+        worker.search_finished.connect(self.on_search_finished)
+        worker.search_failed.connect(self.on_search_failed)
+        worker.finished.connect(worker.deleteLater)
+        self.search_worker = worker
+        worker.start()
+
+    def cancel_background_search(self):
+        """中断正在执行的后台搜索"""
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.search_worker = None
+
+    def on_search_rows(self, generation, rows):
+        """接收后台搜索的一批结果"""
+        if generation == self.search_generation:
+            self.text_list_model.append_rows(rows)
+
+    def on_search_finished(self, generation, count):
+        """后台搜索完成"""
+        if generation == self.search_generation:
+            self.search_worker = None
+            self.show_status_message(f"找到{count}个匹配的文本", 2000)
+
+    def on_search_failed(self, generation, message):
+        """后台搜索出错"""
+        if generation == self.search_generation:
+            self.search_worker = None
+            self.show_status_message(f"搜索失败: {message}", 5000)
 
     def search_texts(self):
-        """增强版搜索功能"""
+        """增强版搜索功能（查询在后台线程执行）"""
         search_query = self.search_input.text().strip()
         
-        if search_query:
-            self.save_search_history(search_query)
-        
         if self.advanced_search_group.isChecked():
             # 高级搜索模式
             self.advanced_search(search_query)
@@ -2095,8 +4933,11 @@ class TextManager(QMainWindow):
             self.load_recycle_bin_list(search_query)
             return
         
+        if search_query and self.relevance_search(search_query):
+            return
+        
         query = '''
-        SELECT t.id, t.title, c.name 
+        SELECT t.id, t.title, c.name, t.update_time, t.id
         FROM texts t
         LEFT JOIN categories c ON t.category_id = c.id
         WHERE 1=1
@@ -2104,38 +4945,22 @@ class TextManager(QMainWindow):
         params = []
         
         if search_query:
-            pinyin_query = self.get_pinyin_query(search_query)
             if self.search_mode.currentText() == "全文检索":
                 # 使用FTS全文搜索
-                fts_query = f'''
-                AND t.id IN (
-                    SELECT rowid FROM texts_fts
-                    WHERE texts_fts MATCH ?
-                )
-                '''
-                query += fts_query
-                params.append(search_query)
-            else:
-                # 普通搜索
-                query += '''
-                AND (t.title LIKE ? OR t.content LIKE ? 
-                     OR t.title LIKE ? OR t.content LIKE ?)
-                '''
-                params.extend([
-                    f'%{search_query}%', f'%{search_query}%',
-                    f'%{pinyin_query}%', f'%{pinyin_query}%'
-                ])
-        
-        query += ' ORDER BY t.update_time DESC'
-        
-        self.cursor.execute(query, params)
-        texts = self.cursor.fetchall()
-        
-        self.text_list.clear()
-        for text_id, title, category_name in texts:
-            item = QListWidgetItem(f"{title} [{category_name or '未分类'}] (ID: {text_id})")
-            item.setData(Qt.UserRole, text_id)
-            self.text_list.addItem(item)
+                fts_clause, fts_params = self.build_fts_filter(search_query)
+                query += fts_clause
+                params.extend(fts_params)
+            else:
+                # 普通搜索（经trigram子串索引筛选候选）
+                like_clause, like_params = self.build_substring_filter(search_query)
+                query += like_clause
+                params.extend(like_params)
+        
+        self.show_text_query(
+            query, params, ('t.update_time', 't.id'),
+            lambda row: (row[0], f"{row[1]} [{row[2] or '未分类'}] (ID: {row[0]})", None),
+            background=bool(search_query)
+        )
 
     def advanced_search(self, search_query=None):
         """高级搜索模式"""
@@ -2143,100 +4968,89 @@ class TextManager(QMainWindow):
             self.load_recycle_bin_list(search_query)
             return
         
-        query = '''
-        SELECT t.id, t.title, c.name, t.create_time, t.update_time, t.word_count
-        FROM texts t
-        LEFT JOIN categories c ON t.category_id = c.id
-        WHERE 1=1
-        '''
+        filter_clause = ''
         params = []
         
         # 日期范围
         date_from = self.date_from.date().toString("yyyy-MM-dd")
         date_to = self.date_to.date().addDays(1).toString("yyyy-MM-dd")  # 包含当天
-        query += " AND t.update_time BETWEEN ? AND ?"
+        filter_clause += " AND t.update_time BETWEEN ? AND ?"
         params.extend([date_from, date_to])
         
         # 字数范围
         word_min = self.word_count_min.value()
         word_max = self.word_count_max.value()
         if word_max > 0:
-            query += " AND t.word_count BETWEEN ? AND ?"
+            filter_clause += " AND t.word_count BETWEEN ? AND ?"
             params.extend([word_min, word_max])
         
+        # 可读性和情感（只匹配已批量分析过的文本）
+        readability_min = self.readability_min.value()
+        readability_max = self.readability_max.value()
+        if readability_min > 0 or readability_max < 100:
+            filter_clause += " AND t.id IN (SELECT text_id FROM text_analysis WHERE readability BETWEEN ? AND ?)"
+            params.extend([readability_min, readability_max])
+        if self.sentiment_filter.currentIndex() > 0:
+            filter_clause += " AND t.id IN (SELECT text_id FROM text_analysis WHERE sentiment = ?)"
+            params.append(self.sentiment_filter.currentText())
+        
+        if search_query and self.relevance_search(search_query, filter_clause, params):
+            return
+        
+        query = '''
+        SELECT t.id, t.title, c.name, t.create_time, t.update_time, t.word_count,
+               t.update_time, t.id
+        FROM texts t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE 1=1
+        ''' + filter_clause
+        
         # 搜索查询
         if search_query:
             if self.search_mode.currentText() == "全文检索":
                 # 使用FTS全文搜索
-                fts_query = f'''
-                AND t.id IN (
-                    SELECT rowid FROM texts_fts
-                    WHERE texts_fts MATCH ?
-                )
-                '''
-                query += fts_query
-                params.append(search_query)
+                fts_clause, fts_params = self.build_fts_filter(search_query)
+                query += fts_clause
+                params.extend(fts_params)
             else:
-                # 普通搜索
-                pinyin_query = self.get_pinyin_query(search_query)
-                query += '''
-                AND (t.title LIKE ? OR t.content LIKE ? 
-                     OR t.title LIKE ? OR t.content LIKE ?)
-                '''
-                params.extend([
-                    f'%{search_query}%', f'%{search_query}%',
-                    f'%{pinyin_query}%', f'%{pinyin_query}%'
-                ])
+                # 普通搜索（经trigram子串索引筛选候选）
+                like_clause, like_params = self.build_substring_filter(search_query)
+                query += like_clause
+                params.extend(like_params)
         
-        query += ' ORDER BY t.update_time DESC'
-        
-        self.cursor.execute(query, params)
-        texts = self.cursor.fetchall()
-        
-        self.text_list.clear()
-        for text_id, title, category_name, create_time, update_time, word_count in texts:
+        def build_row(row):
+            text_id, title, category_name, create_time, update_time, word_count = row[:6]
             item_text = f"{title} [{category_name or '未分类'}] (ID: {text_id})\n"
             item_text += f"字数: {word_count} | 创建: {create_time} | 更新: {update_time}"
-            
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, text_id)
-            self.text_list.addItem(item)
+            return (text_id, item_text, None)
+        
+        self.show_text_query(query, params, ('t.update_time', 't.id'), build_row,
+                             background=bool(search_query))
 
     def load_recycle_bin_list(self, search_query=None):
         """加载回收站列表（使用与文件列表相同的配色方案）"""
-        query = "SELECT id, original_id, title, deleted_time FROM recycle_bin WHERE 1=1"
+        query = "SELECT id, original_id, title, deleted_time, deleted_time, id FROM recycle_bin WHERE 1=1"
         params = []
         
         if search_query:
             query += " AND title LIKE ?"
             params.append(f'%{search_query}%')
         
-        query += " ORDER BY deleted_time DESC"
-        
-        self.cursor.execute(query, params)
-        items = self.cursor.fetchall()
-        
-        self.text_list.clear()
-        for item_id, original_id, title, deleted_time in items:
-            item = QListWidgetItem(f"{title} (原ID: {original_id}, 删除于: {deleted_time})")
-            item.setData(Qt.UserRole, item_id)
-            
-            # 使用与文件列表相同的颜色生成方法
-            bg_color, text_color = self.generate_harmonious_color(original_id, saturation=0.4, value=0.92)
-            item.setBackground(bg_color)
-            item.setForeground(text_color)
-            
-            self.text_list.addItem(item)
+        # 使用与文件列表相同的颜色生成方法（按原ID着色）
+        self.show_text_query(
+            query, params, ('deleted_time', 'id'),
+            lambda row: (row[0], f"{row[2]} (原ID: {row[1]}, 删除于: {row[3]})", row[1])
+        )
 
 
     def restore_from_recycle_bin(self):
         """从回收站恢复文本"""
-        selected_items = self.text_list.selectedItems()
-        if not selected_items:
+        selected_ids = self.selected_text_ids()
+        if not selected_ids:
             QMessageBox.warning(self, "警告", "请先选择要恢复的文本!")
             return
             
-        item_id = selected_items[0].data(Qt.UserRole)
+        item_id = selected_ids[0]
         
         # 获取回收站内容
         self.cursor.execute(
@@ -2250,44 +5064,95 @@ class TextManager(QMainWindow):
             return
             
         original_id, title, content = result
+        title_pinyin, title_initials = self.title_to_pinyin(title)
+        # 与save_text新建文本一致：写入内容哈希和SimHash指纹，恢复后无需再回填
+        content_hash = self.compute_content_hash(title, content, False, False)
+        simhash = self.compute_simhash(content)
         
         try:
             # 检查原始文本是否还存在
             self.cursor.execute("SELECT 1 FROM texts WHERE id = ?", (original_id,))
             if self.cursor.fetchone():
                 # 如果存在，则创建新记录
-                self.cursor.execute(
-                    "INSERT INTO texts (title, content) VALUES (?, ?)",
-                    (title, content)
-                )
+                self.cursor.execute('''
+                INSERT INTO texts (title, content, title_pinyin, title_initials, content_hash, simhash)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (title, content, title_pinyin, title_initials, content_hash, simhash))
             else:
                 # 如果不存在，则恢复原始记录
-                self.cursor.execute(
-                    "INSERT INTO texts (id, title, content) VALUES (?, ?, ?)",
-                    (original_id, title, content)
-                )
+                self.cursor.execute('''
+                INSERT INTO texts (id, title, content, title_pinyin, title_initials, content_hash, simhash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (original_id, title, content, title_pinyin, title_initials, content_hash, simhash))
+            restored_id = self.cursor.lastrowid
+            self.update_fts_index(restored_id, title, content)
+            self.enqueue_index_update(restored_id)
             
             # 从回收站删除
             self.cursor.execute("DELETE FROM recycle_bin WHERE id = ?", (item_id,))
             self.conn.commit()
+            self.start_index_update()
             
             self.load_text_list()
             self.show_status_message("文本已从回收站恢复", 2000)
         except Exception as e:
             QMessageBox.critical(self, "错误", f"恢复失败: {str(e)}")
 
-    def update_word_count(self):
-        """增强版字数统计"""
-        content = self.content_input.toPlainText()
-        
-        # 中文统计
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', content))
+    def on_content_changed(self, position, removed, added):
+        """内容编辑器修改后只重新统计受影响的文本块
+
+        block_word_counts按块号缓存每块的统计，修改后先用文档块数的变化算出
+        旧文档中被替换的块范围，再用新文档中对应的块重新统计并替换，
+        每次按键的开销只与被修改的块有关。
+        """
+        document = self.content_input.document()
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not first.isValid():
+            first = document.firstBlock()
+        if not last.isValid():
+            last = document.lastBlock()
+        
+        first_number = first.blockNumber()
+        last_number = last.blockNumber()
+        old_last_number = last_number + len(self.block_word_counts) - document.blockCount()
+        if old_last_number < first_number or old_last_number >= len(self.block_word_counts):
+            # 缓存与文档不同步（如首次加载），全部重新统计
+            self.rebuild_block_word_counts()
+        else:
+            counts = []
+            block = first
+            while block.isValid() and block.blockNumber() <= last_number:
+                stats = self.classify_text(block.text(), cache=False)
+                counts.append((stats['chinese_chars'], stats['english_words']))
+                block = block.next()
+            
+            replaced = self.block_word_counts[first_number:old_last_number + 1]
+            for i in range(2):
+                self.word_count_totals[i] += sum(c[i] for c in counts) - sum(c[i] for c in replaced)
+            self.block_word_counts[first_number:old_last_number + 1] = counts
         
-        # 英文单词统计
-        english_words = len(re.findall(r'\b[a-zA-Z]+\b', content))
+        self.update_word_count()
+
+    def rebuild_block_word_counts(self):
+        """重新统计内容编辑器所有文本块的字数"""
+        counts = []
+        block = self.content_input.document().firstBlock()
+        while block.isValid():
+            stats = self.classify_text(block.text(), cache=False)
+            counts.append((stats['chinese_chars'], stats['english_words']))
+            block = block.next()
+        self.block_word_counts = counts
+        self.word_count_totals = [sum(c[0] for c in counts), sum(c[1] for c in counts)]
+
+    def update_word_count(self):
+        """增强版字数统计（按文本块缓存的合计显示，不复制整篇文本）"""
+        if len(self.block_word_counts) != self.content_input.document().blockCount():
+            self.rebuild_block_word_counts()
         
-        # 总字数
-        total = len(content)  # 简单统计总字符数
+        # 中文字符、英文单词和总字符数（字符数含块间换行，不含文档末尾的段落符）
+        chinese_chars, english_words = self.word_count_totals
+        total = self.content_input.document().characterCount() - 1
         
         # 阅读时间估算 (中文300字/分钟，英文200词/分钟)
         reading_time = max(1, round((chinese_chars / 300) + (english_words / 200)))
@@ -2337,29 +5202,7 @@ class TextManager(QMainWindow):
         
         if reply == QMessageBox.Yes:
             try:
-                # 获取文本内容
-                self.cursor.execute(
-                    "SELECT title, content FROM texts WHERE id = ?", 
-                    (self.current_id,)
-                )
-                title, content = self.cursor.fetchone()
-                
-                # 添加到回收站
-                self.cursor.execute(
-                    "INSERT INTO recycle_bin (original_id, title, content) VALUES (?, ?, ?)",
-                    (self.current_id, title, content)
-                )
-                
-                # 删除原文本
-                self.cursor.execute(
-                    "DELETE FROM texts WHERE id = ?", 
-                    (self.current_id,)
-                )
-                self.cursor.execute(
-                    "DELETE FROM text_tags WHERE text_id = ?", 
-                    (self.current_id,)
-                )
-                
+                self.move_text_to_recycle_bin(self.current_id)
                 self.conn.commit()
                 self.new_text()
                 self.load_text_list()
@@ -2367,6 +5210,39 @@ class TextManager(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, '错误', f'删除失败: {str(e)}')
 
+    def move_text_to_recycle_bin(self, text_id):
+        """把文本移到回收站并清理其索引和缓存（不提交事务）"""
+        # 获取文本内容
+        self.cursor.execute(
+            "SELECT title, content FROM texts WHERE id = ?", 
+            (text_id,)
+        )
+        title, content = self.cursor.fetchone()
+        
+        # 添加到回收站
+        self.cursor.execute(
+            "INSERT INTO recycle_bin (original_id, title, content) VALUES (?, ?, ?)",
+            (text_id, title, content)
+        )
+        
+        # 删除原文本
+        self.cursor.execute(
+            "DELETE FROM texts WHERE id = ?", 
+            (text_id,)
+        )
+        self.cursor.execute(
+            "DELETE FROM text_tags WHERE text_id = ?", 
+            (text_id,)
+        )
+        self.cursor.execute(
+            "DELETE FROM text_features WHERE text_id = ?",
+            (text_id,)
+        )
+        self.cursor.execute("DELETE FROM text_analysis WHERE text_id = ?", (text_id,))
+        self.update_text_terms(text_id, '')
+        self.remove_text_minhash(text_id)
+        self.remove_fts_index(text_id)
+
     def save_text(self):
         """保存文本（完整支持三种格式）"""
         title = self.title_input.text().strip()
@@ -2390,87 +5266,559 @@ class TextManager(QMainWindow):
         
         # 计算字数（使用纯文本计算）
         plain_text = self.wysiwyg_editor.toPlainText() if is_html else content
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', plain_text))
-        english_words = len(re.findall(r'\b[a-zA-Z]+\b', plain_text))
-        word_count = len(plain_text)
+        stats = self.classify_text(plain_text)
+        chinese_chars = stats['chinese_chars']
+        english_words = stats['english_words']
+        word_count = stats['total']
+        title_pinyin, title_initials = self.title_to_pinyin(title)
+        content_hash = self.compute_content_hash(title, content, is_markdown, is_html)
         
         try:
-            if hasattr(self, 'current_id') and self.current_id is not None:
+            text_id = self.current_id if hasattr(self, 'current_id') else None
+            text_changed = True
+            content_changed = True
+            is_new_text = False
+            saved_tags = set()
+            if text_id is not None:
+                # 与库中记录比较：内容哈希和分类都相同时不改写文本行
+                self.cursor.execute(
+                    "SELECT content_hash, category_id FROM texts WHERE id=?", (text_id,))
+                row = self.cursor.fetchone()
+                text_changed = not row or tuple(row) != (content_hash, category_id)
+                content_changed = not row or row[0] != content_hash
+                saved_tags = self.get_text_tag_names(text_id)
+            tags_changed = set(tags) != saved_tags
+            
+            if not text_changed and not tags_changed:
+                self.mark_editor_clean()
+                self.show_status_message('内容未修改', 2000)
+                return
+            
+            if content_changed:
+                simhash = self.compute_simhash(plain_text)
+            
+            if text_changed and not content_changed:
+                # 只改了分类：不改写标题和内容列，避免触发全文索引和内容哈希触发器
+                self.cursor.execute('''
+                UPDATE texts SET category_id=?, update_time=CURRENT_TIMESTAMP
+                WHERE id=?
+                ''', (category_id, text_id))
+            elif text_changed and text_id is not None:
                 # 更新现有文本
-                text_id = self.current_id
                 self.cursor.execute('''
                 UPDATE texts 
                 SET title=?, content=?, category_id=?, is_markdown=?, is_html=?,
                     update_time=CURRENT_TIMESTAMP, word_count=?, 
-                    chinese_count=?, english_count=?
+                    chinese_count=?, english_count=?,
+                    title_pinyin=?, title_initials=?, content_hash=?, simhash=?
                 WHERE id=?
                 ''', (title, content, category_id, is_markdown, is_html,
                     word_count, chinese_chars, english_words,
+                    title_pinyin, title_initials, content_hash, simhash,
                     text_id))
-            else:
+            elif text_changed:
                 # 插入新文本
                 self.cursor.execute('''
                 INSERT INTO texts (title, content, category_id, is_markdown, is_html,
-                                word_count, chinese_count, english_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                                word_count, chinese_count, english_count,
+                                title_pinyin, title_initials, content_hash, simhash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (title, content, category_id, is_markdown, is_html,
-                    word_count, chinese_chars, english_words))
+                    word_count, chinese_chars, english_words,
+                    title_pinyin, title_initials, content_hash, simhash))
                 text_id = self.cursor.lastrowid
                 self.current_id = text_id
-            
-            # 更新FTS索引（使用纯文本内容）
-            self.update_fts_index(text_id, title, plain_text)
-            
-            # 更新标签
-            self.cursor.execute('DELETE FROM text_tags WHERE text_id=?', (text_id,))
-            
-            for tag_name in tags:
-                # 查找或创建标签
-                self.cursor.execute('SELECT id FROM tags WHERE name=?', (tag_name,))
-                tag_id = self.cursor.fetchone()
-                
-                if not tag_id:
-                    self.cursor.execute('INSERT INTO tags (name) VALUES (?)', (tag_name,))
-                    tag_id = self.cursor.lastrowid
-                else:
-                    tag_id = tag_id[0]
+                is_new_text = True
+            
+            if content_changed:
+                # 更新FTS索引（使用纯文本内容）
+                self.update_fts_index(text_id, title, plain_text)
+                # 相似度分析使用的特征缓存、词项索引和MinHash签名由后台线程更新
+                self.enqueue_index_update(text_id)
+                # 批量分析结果已过期，删除后按可读性/情感筛选时不再命中旧结果
+                self.cursor.execute("DELETE FROM text_analysis WHERE text_id = ?", (text_id,))
+            
+            if tags_changed:
+                # 只增删有变化的标签关联
+                for tag_name in saved_tags - set(tags):
+                    self.cursor.execute('''
+                    DELETE FROM text_tags
+                    WHERE text_id=? AND tag_id IN (SELECT id FROM tags WHERE name=?)
+                    ''', (text_id, tag_name))
                 
-                # 关联文本和标签
-                self.cursor.execute('INSERT INTO text_tags (text_id, tag_id) VALUES (?, ?)', 
-                                (text_id, tag_id))
+                for tag_name in set(tags) - saved_tags:
+                    # 查找或创建标签
+                    self.cursor.execute('SELECT id FROM tags WHERE name=?', (tag_name,))
+                    tag_id = self.cursor.fetchone()
+                    
+                    if not tag_id:
+                        self.cursor.execute('INSERT INTO tags (name) VALUES (?)', (tag_name,))
+                        tag_id = self.cursor.lastrowid
+                    else:
+                        tag_id = tag_id[0]
+                    
+                    # 关联文本和标签
+                    self.cursor.execute('INSERT INTO text_tags (text_id, tag_id) VALUES (?, ?)', 
+                                    (text_id, tag_id))
             
             self.conn.commit()
+            self.mark_editor_clean()
+            if content_changed:
+                self.start_index_update()
             
             # 更新UI
-            self.load_text_list()
-            self.load_tags()
+            if text_changed:
+                self.load_text_list()
+            if tags_changed:
+                self.load_tags()
             self.show_status_message('保存成功!', 2000)
             
             # 显示自动保存指示器
             self.show_auto_save_indicator()
             
+            # 新文本与已有文本近似重复时在状态栏提示
+            if is_new_text:
+                self.warn_near_duplicate(text_id, simhash)
+            
         except Exception as e:
             print(self, '错误', f'保存失败: {str(e)}')
             QMessageBox.critical(self, '错误', f'保存失败: {str(e)}')
 
 
+    def compute_content_hash(self, title, content, is_markdown, is_html):
+        """计算文本标题、内容和格式的哈希，用于判断保存时是否需要改写文本行"""
+        data = '\x1f'.join((title, content or '', str(int(is_markdown)), str(int(is_html))))
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def get_text_tag_names(self, text_id):
+        """获取文本已关联的标签名集合"""
+        self.cursor.execute('''
+        SELECT tg.name FROM text_tags tt
+        JOIN tags tg ON tt.tag_id = tg.id
+        WHERE tt.text_id = ?
+        ''', (text_id,))
+        return {name for name, in self.cursor.fetchall()}
+
     def update_fts_index(self, text_id, title, content):
-        """更新全文搜索索引"""
+        """更新全文搜索索引（trigram模式由触发器维护，无需手动更新）"""
+        if self.fts_uses_triggers():
+            return
+        
         # 删除旧索引（如果存在）
         self.cursor.execute(
             "DELETE FROM texts_fts WHERE rowid = ?",
             (text_id,)
         )
         
-        # 插入新索引
+        # 插入新索引（jieba模式下写入分词后的影子文本）
         self.cursor.execute(
             "INSERT INTO texts_fts (rowid, title, content) VALUES (?, ?, ?)",
-            (text_id, title, content)
+            (text_id, self.segment_for_fts(title), self.segment_for_fts(content))
+        )
+
+    def get_fts_tokenizer(self):
+        """获取当前生效的全文检索分词方式
+
+        trigram: SQLite内置三元组分词，中英文子串均可命中（需SQLite 3.34+）
+        jieba:   使用jieba分词生成影子文本，再交给unicode61分词器建立索引
+        """
+        tokenizer = self.get_setting('fts_tokenizer', self.FTS_TOKENIZER_DEFAULT)
+        if tokenizer == 'trigram' and not self.trigram_supported():
+            print(f"[FTS] SQLite {sqlite3.sqlite_version} 不支持trigram分词，改用jieba模式")
+            tokenizer = 'jieba'
+        return tokenizer if tokenizer in ('trigram', 'jieba') else 'trigram'
+
+    def trigram_supported(self):
+        """SQLite 3.34起内置trigram分词器"""
+        return sqlite3.sqlite_version_info >= (3, 34, 0)
+
+    def get_substring_index_table(self):
+        """获取普通搜索使用的trigram子串索引表
+
+        trigram模式下texts_fts本身就是子串索引；jieba模式另建texts_trgm。
+        SQLite不支持trigram时返回None，普通搜索退回全表LIKE扫描。
+        """
+        if self.fts_uses_triggers():
+            return 'texts_fts'
+        return 'texts_trgm' if self.trigram_supported() else None
+
+    def create_substring_index(self):
+        """按需创建或删除texts_trgm子串索引表及其触发器"""
+        if self.get_substring_index_table() != 'texts_trgm':
+            for trigger in ('texts_trgm_ai', 'texts_trgm_ad', 'texts_trgm_au'):
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self.cursor.execute("DROP TABLE IF EXISTS texts_trgm")
+            return
+        
+        self.execute_script('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS texts_trgm USING fts5(
+            title, content,
+            content='texts', content_rowid='id',
+            tokenize="trigram"
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS texts_trgm_ai AFTER INSERT ON texts BEGIN
+            INSERT INTO texts_trgm (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS texts_trgm_ad AFTER DELETE ON texts BEGIN
+            INSERT INTO texts_trgm (texts_trgm, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS texts_trgm_au AFTER UPDATE OF title, content ON texts BEGIN
+            INSERT INTO texts_trgm (texts_trgm, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO texts_trgm (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+        ''')
+
+    def rebuild_substring_index(self):
+        """创建并重建texts_trgm子串索引（仅jieba模式需要）"""
+        self.create_substring_index()
+        if self.get_substring_index_table() == 'texts_trgm':
+            self.cursor.execute("INSERT INTO texts_trgm (texts_trgm) VALUES ('rebuild')")
+            self.conn.commit()
+
+    def build_substring_filter(self, search_query):
+        """构建普通搜索（标题/内容子串匹配、标题拼音匹配）的WHERE片段和参数
+
+        先用trigram索引筛选候选文本，再用原来的LIKE条件逐条核对，
+        结果与全表LIKE扫描完全一致。词长不足3个字符或包含LIKE通配符时
+        无法使用索引，只保留LIKE条件。
+        查询为拼音时（如wdbj、wodebiji）另按标题全拼/首字母前缀查索引。
+        """
+        substring_clause = '(t.title LIKE ? OR t.content LIKE ?)'
+        params = [f'%{search_query}%', f'%{search_query}%']
+        
+        index_table = self.get_substring_index_table()
+        if index_table and len(search_query) >= 3 and not re.search(r'[%_]', search_query):
+            substring_clause = f'''(t.id IN (
+                SELECT rowid FROM {index_table}
+                WHERE {index_table} MATCH ?
+            ) AND {substring_clause})'''
+            params.insert(0, '"' + search_query.replace('"', '""') + '"')
+        
+        pinyin_query = self.get_pinyin_query(search_query)
+        if pinyin_query:
+            clause = f'''
+            AND ({substring_clause}
+                 OR t.title_initials GLOB ? OR t.title_pinyin GLOB ?)
+            '''
+            params.extend([f'{pinyin_query}*', f'{pinyin_query}*'])
+        else:
+            clause = f'''
+            AND {substring_clause}
+            '''
+        return clause, params
+
+    def remove_fts_index(self, text_id):
+        """删除全文搜索索引（trigram模式由触发器维护，无需手动删除）"""
+        if self.fts_uses_triggers():
+            return
+        self.cursor.execute("DELETE FROM texts_fts WHERE rowid = ?", (text_id,))
+
+    def fts_uses_triggers(self):
+        """trigram模式直接索引texts表内容，由触发器同步；jieba模式需要Python分词，只能手动维护"""
+        return self.get_fts_tokenizer() == 'trigram'
+
+    def create_fts_table(self):
+        """按当前分词设置创建FTS5全文检索表（已存在则跳过）
+
+        trigram模式使用外部内容表(content='texts')，索引不保存正文副本，
+        由texts表上的插入/更新/删除触发器保持同步。
+        """
+        if not self.fts_uses_triggers():
+            for trigger in self.FTS_TRIGGERS:
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self.cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS texts_fts USING fts5(
+                title, content,
+                tokenize="unicode61"
+            )
+            ''')
+            return
+        
+        self.execute_script('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS texts_fts USING fts5(
+            title, content,
+            content='texts', content_rowid='id',
+            tokenize="trigram"
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS texts_fts_ai AFTER INSERT ON texts BEGIN
+            INSERT INTO texts_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS texts_fts_ad AFTER DELETE ON texts BEGIN
+            INSERT INTO texts_fts (texts_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS texts_fts_au AFTER UPDATE OF title, content ON texts BEGIN
+            INSERT INTO texts_fts (texts_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO texts_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+        ''')
+
+    def check_fts_consistency(self, integrity_check=False):
+        """检查全文索引是否与texts表一一对应
+
+        通过FTS5的docsize影子表比对文档ID；integrity_check为True时再执行FTS5
+        自带的结构完整性检查（需读取整个索引，大库要数秒）。返回True表示一致。
+        """
+        try:
+            self.cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM texts
+                 WHERE id NOT IN (SELECT id FROM texts_fts_docsize)),
+                (SELECT COUNT(*) FROM texts_fts_docsize
+                 WHERE id NOT IN (SELECT id FROM texts))
+            ''')
+            missing, orphaned = self.cursor.fetchone()
+            if missing or orphaned:
+                print(f"[FTS] 缺失索引 {missing} 条，多余索引 {orphaned} 条")
+                return False
+            
+            if integrity_check:
+                # 该检查以INSERT语句执行，sqlite3模块会隐式开启事务；及时提交，
+                # 否则连接一直持有事务，关闭时备份数据库会失败
+                self.cursor.execute("INSERT INTO texts_fts (texts_fts) VALUES ('integrity-check')")
+                self.conn.commit()
+            return True
+        except sqlite3.DatabaseError as e:
+            print(f"[FTS] 全文索引检查失败: {str(e)}")
+            return False
+
+    def segment_for_fts(self, text):
+        """生成写入全文索引的文本（jieba模式下按词切分并用空格连接）"""
+        if not text or self.get_fts_tokenizer() != 'jieba':
+            return text
+        
+        jieba = self.load_jieba()
+        if jieba is not None:
+            return ' '.join(w for w in jieba.cut_for_search(text) if w.strip())
+        else:
+            # 未安装jieba时按单个汉字切分，保证中文仍可检索
+            return re.sub(r'([\u4e00-\u9fff])', r' \1 ', text)
+
+    def rebuild_fts_index(self):
+        """删除并重建全文检索表，按批次从texts表重新写入索引"""
+        # 旧版本数据库中texts_fts可能是普通表，统一删除后重建
+        self.cursor.execute("DROP TABLE IF EXISTS texts_fts")
+        self.create_fts_table()
+        
+        chunk_size = self.FTS_REBUILD_CHUNK_SIZE
+        last_id = 0
+        total = 0
+        
+        if self.fts_uses_triggers():
+            # 外部内容表直接在SQLite内部按ID区间写入索引
+            while True:
+                self.cursor.execute(
+                    "SELECT MAX(id), COUNT(*) FROM (SELECT id FROM texts WHERE id > ? ORDER BY id LIMIT ?)",
+                    (last_id, chunk_size)
+                )
+                upper_id, count = self.cursor.fetchone()
+                if not count:
+                    break
+                
+                self.cursor.execute(
+                    "INSERT INTO texts_fts (rowid, title, content) "
+                    "SELECT id, title, content FROM texts WHERE id > ? AND id <= ?",
+                    (last_id, upper_id)
+                )
+                self.conn.commit()
+                last_id = upper_id
+                total += count
+                print(f"[FTS] 已重建 {total} 条索引")
+            
+            # trigram模式下texts_fts即子串索引，删除多余的texts_trgm
+            self.create_substring_index()
+            return total
+        
+        while True:
+            self.cursor.execute(
+                "SELECT id, title, content, is_html FROM texts WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size)
+            )
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            
+            self.cursor.executemany(
+                "INSERT INTO texts_fts (rowid, title, content) VALUES (?, ?, ?)",
+                [
+                    (text_id,
+                     self.segment_for_fts(title),
+                     self.segment_for_fts(self.html_to_plain(content or '') if is_html else content))
+                    for text_id, title, content, is_html in rows
+                ]
+            )
+            self.conn.commit()
+            last_id = rows[-1][0]
+            total += len(rows)
+            print(f"[FTS] 已重建 {total} 条索引")
+        
+        # jieba模式的索引无法做子串匹配，普通搜索另用trigram子串索引
+        self.rebuild_substring_index()
+        return total
+
+    def build_fts_match(self, search_query):
+        """把搜索词转换为FTS5 MATCH表达式
+
+        每个空格分隔的词都作为带引号的短语参与匹配，避免用户输入被当作FTS5语法。
+        trigram模式下不足3个字符的词无法走索引，退回LIKE匹配。
+        返回 (MATCH表达式或None, LIKE条件片段, LIKE参数)
+        """
+        tokenizer = self.get_fts_tokenizer()
+        phrases = []
+        short_terms = []
+        for term in search_query.split():
+            if tokenizer == 'trigram':
+                if len(term) < 3:
+                    short_terms.append(term)
+                    continue
+                words = [term]
+            else:
+                words = self.segment_for_fts(term).split()
+            # jieba模式按词索引，使用前缀匹配以命中更长的词
+            suffix = '' if tokenizer == 'trigram' else '*'
+            phrases.extend('"' + w.replace('"', '""') + '"' + suffix for w in words if w)
+        
+        like_clause = ''
+        like_params = []
+        for term in short_terms:
+            like_clause += ' AND (t.title LIKE ? OR t.content LIKE ?)'
+            like_params.extend([f'%{term}%', f'%{term}%'])
+        return (' AND '.join(phrases) if phrases else None), like_clause, like_params
+
+    def build_fts_filter(self, search_query):
+        """构建全文检索的WHERE片段和参数"""
+        match, like_clause, like_params = self.build_fts_match(search_query)
+        
+        clause = ''
+        params = []
+        if match:
+            clause += '''
+                AND t.id IN (
+                    SELECT rowid FROM texts_fts
+                    WHERE texts_fts MATCH ?
+                )
+                '''
+            params.append(match)
+        return clause + like_clause, params + like_params
+
+    def relevance_search(self, search_query, filter_clause='', filter_params=()):
+        """按BM25相关度执行全文检索，列表显示高亮标题和命中摘要
+
+        摘要和高亮由SQLite的snippet()/highlight()生成，不向Python传输全文。
+        先按相关度取前RELEVANCE_RESULT_LIMIT条，只为这些结果生成摘要。
+        未勾选相关度排序、非全文检索模式或没有可用的MATCH表达式时返回False，
+        由调用方按时间顺序搜索。
+        """
+        if self.search_mode.currentText() != "全文检索" or not self.rank_by_relevance.isChecked():
+            return False
+        
+        match, like_clause, like_params = self.build_fts_match(search_query)
+        if not match:
+            return False
+        
+        query = f'''
+        WITH ranked AS (
+            SELECT t.id AS id,
+                   bm25(texts_fts, {self.BM25_TITLE_WEIGHT}, {self.BM25_CONTENT_WEIGHT}) AS score
+            FROM texts_fts
+            JOIN texts t ON t.id = texts_fts.rowid
+            WHERE texts_fts MATCH ?
+            {filter_clause}{like_clause}
+            ORDER BY score
+            LIMIT ?
+        )
+        SELECT t.id, c.name, t.is_html,
+               highlight(texts_fts, 0, '【', '】'),
+               snippet(texts_fts, 1, '【', '】', '…', {self.SNIPPET_TOKENS})
+        FROM ranked
+        JOIN texts_fts ON texts_fts.rowid = ranked.id
+        JOIN texts t ON t.id = ranked.id
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE texts_fts MATCH ?
+        ORDER BY ranked.score
+        '''
+        params = [match, *filter_params, *like_params, self.RELEVANCE_RESULT_LIMIT, match]
+        segmented = not self.fts_uses_triggers()
+        
+        def build_row(row):
+            text_id, category_name, is_html, title, snippet = row
+            title = self.clean_fts_excerpt(title, False, segmented)
+            item_text = f"{title} [{category_name or '未分类'}] (ID: {text_id})\n"
+            item_text += self.clean_fts_excerpt(snippet, is_html, segmented)
+            return (text_id, item_text, None)
+        
+        self.show_text_query(query, params, None, build_row, background=True)
+        return True
+
+    def clean_fts_excerpt(self, text, is_html, segmented):
+        """整理snippet()/highlight()的结果以便在列表中单行显示
+
+        trigram模式索引的是原始内容，HTML文本需去掉标签（含被截断的半个标签）；
+        jieba模式(segmented)索引的是分词后的影子文本，需去掉汉字之间的空格。
+        """
+        text = text or ''
+        if is_html and not segmented:
+            text = re.sub(r'<[^<>]*>|^[^<>]*>|<[^<>]*$', '', text)
+        text = ' '.join(text.split())
+        if segmented:
+            text = re.sub(r'(?:(?<=[\u4e00-\u9fff])|(?<=[\u4e00-\u9fff]】)) (?=【?[\u4e00-\u9fff])', '', text)
+        # 相邻的高亮片段合并显示
+        return text.replace('】【', '')
+
+    def change_fts_tokenizer(self):
+        """切换全文检索分词方式并重建索引"""
+        options = ['trigram', 'jieba']
+        current = self.get_fts_tokenizer()
+        tokenizer, ok = QInputDialog.getItem(
+            self, '全文检索设置',
+            'trigram: 按三字子串索引，适合中英文混合内容\njieba: 按中文词语索引，索引更小',
+            options, options.index(current), False
         )
+        if not ok or tokenizer == current:
+            return
+        
+        try:
+            start_time = time.time()
+            self.set_setting('fts_tokenizer', tokenizer)
+            total = self.rebuild_fts_index()
+            self.conn.commit()
+            elapsed = time.time() - start_time
+            self.show_status_message(f"全文索引已按{tokenizer}重建，共{total}条，耗时{elapsed:.2f}秒", 5000)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"重建全文索引失败: {str(e)}")
+
+    def check_fts_index_command(self):
+        """工具菜单：完整检查全文索引，损坏或不一致时重建"""
+        start_time = time.time()
+        if self.check_fts_consistency(integrity_check=True):
+            elapsed = time.time() - start_time
+            self.show_status_message(f"全文索引完整，检查耗时{elapsed:.2f}秒", 5000)
+            return
+        
+        try:
+            total = self.rebuild_fts_index()
+            self.conn.commit()
+            elapsed = time.time() - start_time
+            self.show_status_message(f"全文索引不一致，已重建{total}条，耗时{elapsed:.2f}秒", 5000)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"重建全文索引失败: {str(e)}")
 
-    def load_text(self, item):
+    def load_text(self, index):
         """加载文本（完整支持三种格式）"""
-        text_id = item.data(Qt.UserRole)
+        text_id = index.data(Qt.UserRole)
         
         if self.current_view == "recycle_bin":
             # 加载回收站内容（始终作为纯文本处理）
@@ -2493,6 +5841,7 @@ class TextManager(QMainWindow):
             self.tag_edit.clear()
             self.format_combo.setCurrentIndex(0)  # 强制设为纯文本模式
             self.toggle_edit_mode()
+            self.mark_editor_clean()
             return
         
         # 正常加载文本
@@ -2526,7 +5875,7 @@ class TextManager(QMainWindow):
             self.format_combo.setCurrentIndex(1)  # Markdown模式
             self.content_input.setPlainText(content)
             self.wysiwyg_editor.setPlainText(content)
-            self.update_preview()
+            self.render_preview()
         elif is_html:
             self.format_combo.setCurrentIndex(2)  # HTML模式
             self.wysiwyg_editor.setHtml(self.clean_html(content))
@@ -2545,6 +5894,7 @@ class TextManager(QMainWindow):
             self.content_input.setPlainText(content)
         
         self.update_word_count()
+        self.mark_editor_clean()
 
 
 
@@ -2552,7 +5902,7 @@ class TextManager(QMainWindow):
     def toggle_markdown(self):
         """切换Markdown预览状态"""
         if self.format_combo.currentIndex() == 1:  # Markdown模式
-            self.update_preview()
+            self.render_preview()
             self.right_panel.setTabVisible(1, True)  # 显示预览标签页
         else:
             self.right_panel.setTabVisible(1, False)  # 隐藏预览标签页
@@ -2582,7 +5932,7 @@ class TextManager(QMainWindow):
                 
             self.content_input.setPlainText(current_content)
             self.wysiwyg_editor.setPlainText(current_content)
-            self.update_preview()
+            self.render_preview()
             
         else:  # 切换到即见即所得
             # 获取当前内容
@@ -2627,10 +5977,30 @@ class TextManager(QMainWindow):
 
 
     def update_preview(self):
-        """更新Markdown预览"""
+        """更新Markdown预览（防抖，停止输入PREVIEW_DEBOUNCE_MS毫秒后渲染）"""
         if self.format_combo.currentIndex() == 1:  # 只在Markdown模式下更新
-            content = self.content_input.toPlainText()
-            html = markdown.markdown(content)
+            self.preview_timer.start()
+
+    def render_preview(self):
+        """在后台线程渲染Markdown预览，只有修改过的块需要重新渲染"""
+        self.preview_timer.stop()
+        if self.format_combo.currentIndex() != 1:
+            return
+        
+        if self.preview_worker is not None:
+            self.preview_worker.cancel()
+        self.preview_generation += 1
+        worker = PreviewWorker(self.preview_renderer, self.preview_generation,
+                               self.content_input.toPlainText(), self)
+        worker.preview_ready.connect(self.on_preview_ready)
+        worker.finished.connect(worker.deleteLater)
+        self.preview_worker = worker
+        worker.start()
+
+    def on_preview_ready(self, generation, html):
+        """接收后台渲染的预览"""
+        if generation == self.preview_generation:
+            self.preview_worker = None
             self.preview_label.setText(html)
 
     def load_categories(self):
@@ -2701,7 +6071,7 @@ class TextManager(QMainWindow):
             return
         
         query = '''
-        SELECT t.id, t.title, c.name, t.category_id
+        SELECT t.id, t.title, c.name, t.category_id, t.update_time, t.id
         FROM texts t
         LEFT JOIN categories c ON t.category_id = c.id
         WHERE 1=1
@@ -2726,34 +6096,15 @@ class TextManager(QMainWindow):
         
         # 搜索查询
         if search_query:
-            pinyin_query = self.get_pinyin_query(search_query)
-            query += '''
-            AND (t.title LIKE ? OR t.content LIKE ? 
-                 OR t.title LIKE ? OR t.content LIKE ?)
-            '''
-            params.extend([
-                f'%{search_query}%', f'%{search_query}%',
-                f'%{pinyin_query}%', f'%{pinyin_query}%'
-            ])
-        
-        query += ' ORDER BY t.update_time DESC'
-        
-        self.cursor.execute(query, params)
-        texts = self.cursor.fetchall()
-        
-        self.text_list.clear()
-        for text_id, title, category_name, category_id in texts:
-            item = QListWidgetItem(f"{title} [{category_name or '未分类'}] (ID: {text_id})")
-            item.setData(Qt.UserRole, text_id)
-            
-            # 生成颜色（基于分类ID，如果没有分类则使用文本ID）
-            color_id = category_id if category_id else text_id
-            bg_color, text_color = self.generate_harmonious_color(color_id, saturation=0.4, value=0.92)
-            
-            item.setBackground(bg_color)
-            item.setForeground(text_color)
-            
-            self.text_list.addItem(item)
+            like_clause, like_params = self.build_substring_filter(search_query)
+            query += like_clause
+            params.extend(like_params)
+        
+        # 颜色基于分类ID，如果没有分类则使用文本ID
+        self.show_text_query(
+            query, params, ('t.update_time', 't.id'),
+            lambda row: (row[0], f"{row[1]} [{row[2] or '未分类'}] (ID: {row[0]})", row[3] or row[0])
+        )
 
     def filter_by_category(self, item):
         """按分类筛选文本 - 修改为显示选中分类+未分类的内容"""
@@ -2761,39 +6112,92 @@ class TextManager(QMainWindow):
         
         # 获取所有未分类的文本
         query = '''
-        SELECT t.id, t.title, c.name 
+        SELECT t.id, t.title, c.name, t.update_time, t.id
         FROM texts t
         LEFT JOIN categories c ON t.category_id = c.id
-        WHERE t.category_id = 0 OR t.category_id = ?
-        ORDER BY t.update_time DESC
+        WHERE (t.category_id = 0 OR t.category_id = ?)
         '''
         
-        self.cursor.execute(query, (category_id,))
-        texts = self.cursor.fetchall()
-        
-        self.text_list.clear()
-        for text_id, title, category_name in texts:
-            item = QListWidgetItem(f"{title} [{category_name or '未分类'}] (ID: {text_id})")
-            item.setData(Qt.UserRole, text_id)
-            self.text_list.addItem(item)
+        self.show_text_query(
+            query, [category_id], ('t.update_time', 't.id'),
+            lambda row: (row[0], f"{row[1]} [{row[2] or '未分类'}] (ID: {row[0]})", None)
+        )
 
 
+    def fetch_list_rows(self, sql, params):
+        """为文本列表模型执行分页查询（结果按写入代数缓存）"""
+        key = QueryResultCache.make_key(sql, params)
+        generation = self.get_write_generation()
+        rows = self.list_cache.get(key, generation)
+        if rows is None:
+            self.cursor.execute(sql, params)
+            rows = self.cursor.fetchall()
+            self.list_cache.put(key, generation, rows)
+        return rows
+
+    def get_write_generation(self):
+        """数据库写入代数：任何写入后都会变化
+
+        total_changes统计本连接（含触发器）增删改的行数，只增不减；
+        data_version在其他连接或进程提交修改后变化。
+        """
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return self.conn.total_changes, data_version
+
+    def selected_text_ids(self):
+        """获取文本列表中选中项的ID（按列表顺序）"""
+        indexes = sorted(self.text_list.selectionModel().selectedIndexes(), key=lambda i: i.row())
+        return [index.data(Qt.UserRole) for index in indexes]
+
     def filter_by_tag(self, tag_name):
         """按标签筛选文本"""
         if tag_name:
             self.load_text_list(tag_name=tag_name)
 
     def get_pinyin_query(self, text):
-        """将中文转换为拼音首字母查询字符串"""
-        result = []
-        for char in text:
-            if '\u4e00' <= char <= '\u9fff':  # 中文字符
-                pinyin = lazy_pinyin(char)
-                if pinyin:
-                    result.append(pinyin[0][0].lower())
+        """将拼音查询规范为与标题拼音列比较的形式，非拼音查询返回None"""
+        query = re.sub(r"[\s']", '', text).lower()
+        return query if re.fullmatch(r'[a-z]+', query) else None
+
+    def title_to_pinyin(self, title):
+        """计算标题的全拼和拼音首字母（如 我的笔记 -> wodebiji, wdbj）
+
+        连续的汉字整段交给pypinyin以便按词组判断多音字，其他字符原样保留
+        （转小写、去掉空白），保存时写入title_pinyin/title_initials列。
+        """
+        full = []
+        initials = []
+        for run in re.findall(r'[\u4e00-\u9fff]+|[^\u4e00-\u9fff]+', title or ''):
+            if '\u4e00' <= run[0] <= '\u9fff':
+                syllables = lazy_pinyin(run)
+                full.extend(syllables)
+                initials.extend(syllable[:1] for syllable in syllables)
             else:
-                result.append(char)
-        return ''.join(result)
+                run = re.sub(r'\s', '', run).lower()
+                full.append(run)
+                initials.append(run)
+        return ''.join(full).lower(), ''.join(initials).lower()
+
+    def backfill_title_pinyin(self):
+        """按批次为title_pinyin为空的文本补算标题拼音"""
+        total = 0
+        while True:
+            self.cursor.execute(
+                "SELECT id, title FROM texts WHERE title_pinyin IS NULL ORDER BY id LIMIT ?",
+                (self.PINYIN_BACKFILL_CHUNK_SIZE,)
+            )
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            
+            self.cursor.executemany(
+                "UPDATE texts SET title_pinyin = ?, title_initials = ? WHERE id = ?",
+                [(*self.title_to_pinyin(title), text_id) for text_id, title in rows]
+            )
+            self.conn.commit()
+            total += len(rows)
+            print(f"[拼音] 已回填 {total} 条标题拼音")
+        return total
 
     def new_text(self):
         """新建文本"""
@@ -2855,6 +6259,7 @@ class TextManager(QMainWindow):
         self.title_input.setFocus()
         print(f"[DEBUG] 当前焦点控件: {QApplication.focusWidget()}")
         
+        self.mark_editor_clean()
         print("[DEBUG] === new_text() 执行结束 ===")
 
 
@@ -2870,10 +6275,30 @@ class TextManager(QMainWindow):
         QTimer.singleShot(3000, lambda: self.save_indicator.setVisible(False))
 
     def auto_save(self):
-        """自动保存当前文本"""
-        if hasattr(self, 'current_id') and self.title_input.text().strip():
+        """自动保存当前文本（编辑器未修改时不访问数据库）"""
+        if hasattr(self, 'current_id') and self.title_input.text().strip() and self.is_editor_modified():
             self.save_text()
 
+    def is_editor_modified(self):
+        """编辑器内容自上次加载或保存后是否被修改"""
+        return (self.editor_dirty
+                or self.title_input.isModified()
+                or self.tag_edit.isModified()
+                or self.content_input.document().isModified()
+                or self.wysiwyg_editor.document().isModified())
+
+    def mark_editor_dirty(self):
+        """标记分类、格式等没有修改标志的控件已被改动"""
+        self.editor_dirty = True
+
+    def mark_editor_clean(self):
+        """加载或保存后清除所有修改标志"""
+        self.editor_dirty = False
+        self.title_input.setModified(False)
+        self.tag_edit.setModified(False)
+        self.content_input.document().setModified(False)
+        self.wysiwyg_editor.document().setModified(False)
+
     def show_status_message(self, message, timeout=0):
         """在状态栏显示临时消息"""
         self.status_bar.showMessage(message, timeout)
@@ -2910,9 +6335,6 @@ class TextManager(QMainWindow):
 
         self.shortcut_copy = QShortcut(QKeySequence("Ctrl+Shift+C"), self)
         self.shortcut_copy.activated.connect(self.copy_without_background)
-    
-        # 连接文本光标变化信号
-        self.content_input.cursorPositionChanged.connect(self.update_reading_progress)
 
     def show_reading_progress(self):
         """显示阅读进度提示"""
@@ -3035,7 +6457,7 @@ class TextManager(QMainWindow):
             return
         
         content = self.content_input.toPlainText()
-        keywords = self.extract_keywords(content, top_n=3)
+        keywords = self.extract_keywords(content, top_n=self.AUTO_TAG_COUNT)
         
         if not keywords:
             QMessageBox.information(self, "提示", "未提取到有效关键词")
@@ -3569,6 +6991,34 @@ class TextManager(QMainWindow):
         auto_tag_action.triggered.connect(self.auto_tag_text)
         tools_menu.addAction(auto_tag_action)
         
+        fts_action = QAction('全文检索设置', self)
+        fts_action.triggered.connect(self.change_fts_tokenizer)
+        tools_menu.addAction(fts_action)
+        
+        check_fts_action = QAction('检查全文索引', self)
+        check_fts_action.triggered.connect(self.check_fts_index_command)
+        tools_menu.addAction(check_fts_action)
+        
+        term_index_action = QAction('重建词频索引', self)
+        term_index_action.triggered.connect(self.rebuild_term_index_command)
+        tools_menu.addAction(term_index_action)
+        
+        load_lexicon_action = QAction('加载情感词典', self)
+        load_lexicon_action.triggered.connect(self.load_sentiment_lexicons)
+        tools_menu.addAction(load_lexicon_action)
+        
+        reset_lexicon_action = QAction('使用内置情感词典', self)
+        reset_lexicon_action.triggered.connect(self.reset_sentiment_lexicons)
+        tools_menu.addAction(reset_lexicon_action)
+        
+        load_user_dict_action = QAction('加载jieba用户词典', self)
+        load_user_dict_action.triggered.connect(self.load_jieba_user_dict)
+        tools_menu.addAction(load_user_dict_action)
+        
+        clear_user_dict_action = QAction('取消jieba用户词典', self)
+        clear_user_dict_action.triggered.connect(self.clear_jieba_user_dict)
+        tools_menu.addAction(clear_user_dict_action)
+        
         optimize_db_action = QAction('优化数据库', self)
         optimize_db_action.triggered.connect(self.optimize_database)
         tools_menu.addAction(optimize_db_action)
@@ -3723,14 +7173,6 @@ class TextManager(QMainWindow):
         """设置对齐方式"""
         self.wysiwyg_editor.setAlignment(alignment)
 
-    def html_to_plain(self, html):
-        """将HTML转换为纯文本（简化版）"""
-        # 移除HTML标签
-        text = re.sub(r'<[^>]+>', '', html)
-        # 替换HTML实体
-        text = text.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>')
-        return text.strip()
-
     def copy_text(self, with_format=True, selection_only=False):
         """复制文本内容到剪贴板
         
@@ -3940,6 +7382,11 @@ class TextManager(QMainWindow):
     def showEvent(self, event):
         print("[窗口事件] 窗口显示")
         super().showEvent(event)
+        # 窗口显示后再在后台加载jieba词典，不拖慢启动
+        if not self.jieba_warmup_started:
+            QTimer.singleShot(0, self.start_jieba_warmup)
+            # 继续上次退出时未完成的后台索引更新
+            QTimer.singleShot(0, self.start_index_update)
 
     def closeEvent(self, event):
         print("[窗口事件] 窗口关闭")
@@ -3949,6 +7396,13 @@ class TextManager(QMainWindow):
         
         # 原有清理逻辑
         self.auto_save_timer.stop()
+        self.index_update_pending = False
+        for worker in (self.findChildren(SearchWorker) + self.findChildren(AnalysisWorker)
+                       + self.findChildren(PreviewWorker) + self.findChildren(BatchAnalysisWorker)
+                       + self.findChildren(AutoTagWorker) + self.findChildren(JiebaWarmupWorker)
+                       + self.findChildren(IndexUpdateWorker) + self.findChildren(MinHashRefreshWorker)):
+            worker.cancel()
+            worker.wait()
         self.conn.close()
         event.accept()
 
@@ -3962,9 +7416,9 @@ class TextManager(QMainWindow):
         return super().eventFilter(obj, event)
 
 
-
-
 if __name__ == '__main__':
+    # 打包为可执行文件后，批量分析的子进程从这里进入
+    multiprocessing.freeze_support()
     print("[主程序] 1. 应用启动")
     app = QApplication(sys.argv)
 